@@ -1,8 +1,7 @@
-from llama_index.llms.deepseek import DeepSeek
-
 from schemas.agent_response import FiltersGenerateAgentResponse
 
 from utils.logger import logger
+from utils.model_provider import ModelProvider
 
 
 class FiltersGenerateAgent:
@@ -10,7 +9,7 @@ class FiltersGenerateAgent:
     过滤条件生成Agent
     生成过滤条件
     """
-    _llm = DeepSeek("deepseek-chat", temperature=0)
+    _llm = ModelProvider.get_llm(temperature=0)
     _structured_llm = _llm.as_structured_llm(FiltersGenerateAgentResponse)
 
     _prompt = (
@@ -1,11 +1,16 @@
-from llama_index.llms.deepseek import DeepSeek
+from typing import Optional
+
+from llama_index.core.workflow import Context
+
+from utils.model_provider import ModelProvider
+from workflow.events import TokenEvent
 
 
 class MetadataSummaryAgent:
     """
     元数据总结Agent，针对已经检索的元数据，结合用户问题进行总结。
     """
-    _llm = DeepSeek("deepseek-chat", temperature=0)
+    _llm = ModelProvider.get_llm(temperature=0)
 
     _prompt = (
         "你是元数据总结助手，你精通根据用户提出的有关文档查询的问题来分析用户的意图，从提供的元数据中精准提取所需信息并组织成自然语言回答。"
@@ -28,6 +33,20 @@ class MetadataSummaryAgent:
     )
 
     @classmethod
-    async def run(cls, metadata, query):
-        summary_result = await cls._llm.acomplete(cls._prompt.format(metadata=metadata, query_text=query))
-        return summary_result.text
+    async def run(cls, metadata, query, ctx: Optional[Context] = None):
+        """
+        :param metadata: 检索到的元数据
+        :param query: 用户问题
+        :param ctx: 工作流上下文，传入时把生成的token写入事件流
+        """
+        prompt = cls._prompt.format(metadata=metadata, query_text=query)
+        if ctx is None:
+            summary_result = await cls._llm.acomplete(prompt)
+            return summary_result.text
+
+        text = ""
+        async for chunk in await cls._llm.astream_complete(prompt):
+            if chunk.delta:
+                ctx.write_event_to_stream(TokenEvent(delta=chunk.delta))
+            text = chunk.text
+        return text
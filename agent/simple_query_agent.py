@@ -1,7 +1,11 @@
-from llama_index.core.agent.workflow import FunctionAgent
-from llama_index.llms.deepseek import DeepSeek
+from typing import Optional
+
+from llama_index.core.agent.workflow import FunctionAgent, AgentStream
+from llama_index.core.workflow import Context
 
 from tools.simple_query import SqliteQueryTool
+from utils.model_provider import ModelProvider
+from workflow.events import TokenEvent
 
 
 class SimpleQueryAgent:
@@ -9,7 +13,7 @@ class SimpleQueryAgent:
     简单查询的Agent
     适用于不查询文档具体内容的查询
     """
-    _llm = DeepSeek("deepseek-chat", temperature=0)
+    _llm = ModelProvider.get_llm(temperature=0)
 
     _workflow = FunctionAgent(
         tools=[
@@ -26,6 +30,15 @@ class SimpleQueryAgent:
     )
 
     @classmethod
-    async def run(cls, query):
-        response = await cls._workflow.run(user_msg=query)
+    async def run(cls, query, ctx: Optional[Context] = None):
+        """
+        :param query: 用户问题
+        :param ctx: 工作流上下文，传入时把生成的token写入事件流
+        """
+        handler = cls._workflow.run(user_msg=query)
+        if ctx is not None:
+            async for event in handler.stream_events():
+                if isinstance(event, AgentStream) and event.delta:
+                    ctx.write_event_to_stream(TokenEvent(delta=event.delta))
+        response = await handler
         return response
@@ -1,29 +1,52 @@
-from utils.db_helper import DBHelper
-from schemas.response import ResponseModel
+import asyncio
+
+from utils.async_db_helper import AsyncDBHelper
+from schemas.response import ResponseModel, ResponseCode
 from fastapi import APIRouter
 
+from utils.corpus_version import CorpusVersion
 from utils.document_query import DocumentQueryEngine
+from utils.logger import logger
 
 router = APIRouter(prefix="/classification")
 
 
 @router.get("/list")
 async def list_classification() -> ResponseModel:
-    result = DBHelper.query_all("classification")
+    result = await AsyncDBHelper.query_all("classification")
     return ResponseModel(data=result)
 
 
 @router.post("")
 async def add_classification(name: str) -> ResponseModel:
-    DBHelper.insert("classification", {'name': name})
+    await AsyncDBHelper.insert("classification", {'name': name})
+    await CorpusVersion.abump()
     return ResponseModel()
 
 
 @router.put("")
 async def update_classification(classification_id: int, name: str) -> ResponseModel:
-    old_name = DBHelper.query_one("classification", f"id={classification_id}")
-    DocumentQueryEngine.update_metadata(old_name['name'], name)
-
-    DBHelper.update("classification", {'name': name}, f"id={classification_id}")
-
-    return ResponseModel()
+    old_name = await AsyncDBHelper.query_one("classification", "id=?", (classification_id,))
+    if not old_name:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.NotFound,
+            message="分类不存在",
+        )
+    if old_name['name'] == name:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.BadRequest,
+            message="新分类名与原分类名相同",
+        )
+
+    def report(updated: int, total: int):
+        logger.info(f"分类 {old_name['name']} 重命名为 {name}：已更新 {updated}/{total} 个文本块")
+
+    # 先改向量库再改数据库，中途失败时数据库仍是原分类名，重新提交同一请求即可继续更新剩余的文本块
+    updated = await asyncio.to_thread(DocumentQueryEngine.update_metadata, old_name['name'], name, progress=report)
+
+    await AsyncDBHelper.update("classification", {'name': name}, "id=?", (classification_id,))
+    await CorpusVersion.abump()
+
+    return ResponseModel(data={"updated_chunks": updated})
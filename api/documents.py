@@ -1,27 +1,36 @@
+import asyncio
 import os
-import tempfile
+import shutil
+from typing import Optional
 
 from fastapi import APIRouter, UploadFile, File
+from pydantic import ValidationError
 
+from schemas.hnsw_profile import HnswProfile, HNSW_PROFILES
 from schemas.response import ResponseModel, ResponseCode
+from utils.async_db_helper import AsyncDBHelper
+from utils.bulk_ingest import BulkIngestor
+from utils.corpus_version import CorpusVersion
 from utils.db_helper import DBHelper
 from utils.document_query import DocumentQueryEngine
-from utils.document_embedding import DocumentEmbedding
+from utils.index_rebuilder import IndexRebuilder
+from utils.ingest_job_manager import IngestJobManager
 from utils.logger import logger
+from utils.upload_file_helper import UploadFileHelper, UploadTooLargeError
 
 router = APIRouter(prefix="/document")
 
 
 @router.post("/upload")
-async def upload_document(classification_id: int, file: UploadFile = File(...)) -> ResponseModel:
+async def upload_document(classification_id: int, file: UploadFile = File(...), update: bool = False) -> ResponseModel:
     """
-    文档上传
+    文档上传，文档落盘后提交后台入库任务，立即返回任务id
     :param file:上传的文档源文件
     :param classification_id:文档分类id
+    :param update:同名文档已存在时是否增量更新
     :return:
     """
-    temp_file_path = None
-    temp_dir = None
+    job_dir = None
     try:
         # 0. 校验
         if not classification_id:
@@ -30,49 +39,114 @@ async def upload_document(classification_id: int, file: UploadFile = File(...))
                 status_code=ResponseCode.BadRequest,
                 message="请选择分类",
             )
-        document_name = DBHelper.query_one("documents", f"name='{file.filename}'")
-        if document_name:
+        filename = UploadFileHelper.sanitize_filename(file.filename)
+        if not filename:
+            return ResponseModel(
+                success=False,
+                status_code=ResponseCode.BadRequest,
+                message="文件名不合法",
+            )
+        document_name = await AsyncDBHelper.query_one("documents", "name=?", (filename,))
+        if (document_name and not update) or await IngestJobManager.has_active_job(filename):
             return ResponseModel(
                 success=False,
                 status_code=ResponseCode.BadRequest,
                 message="文档已存在",
             )
+        if await IngestJobManager.is_full():
+            return ResponseModel(
+                success=False,
+                status_code=ResponseCode.TooManyRequests,
+                message="待处理的文档过多，请稍后再试",
+            )
 
-        # 1. 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        temp_file_path = os.path.join(temp_dir, file.filename)
-
-        # 2. 保存到临时目录
-        with open(temp_file_path, "wb") as f:
-            f.write(await file.read())
-
-        # 3. 存储数据库
-        insert_id = DBHelper.insert(
-            "documents",
-            {
-                'classification_id': classification_id,
-                'name': file.filename,
-            }
-        )
-        classification_name = DBHelper.query_one("classification", f"id={classification_id}")
+        # 1. 创建任务目录
+        job_id, job_dir = IngestJobManager.create_job_dir()
+        file_path = os.path.join(job_dir, filename)
+
+        # 2. 分块保存到任务目录
+        file_info = await UploadFileHelper.save(file, file_path)
 
-        # 4. 向量化存入Chroma
-        DocumentEmbedding.vectorize_document(insert_id, classification_name['name'], temp_file_path)
+        # 3. 提交入库任务，由后台完成向量化并存储数据库
+        await IngestJobManager.submit(job_id, classification_id, file_path, file_info)
 
-        return ResponseModel(message="上传成功")
+        return ResponseModel(message="上传成功，文档正在处理", data={"job_id": job_id})
+    except UploadTooLargeError as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.BadRequest,
+            message=f"文件过大，最大支持{e.max_size // 1024 // 1024}MB",
+        )
     except Exception as e:
         logger.error(f"上传失败: {e}")
+        if job_dir:
+            shutil.rmtree(job_dir, ignore_errors=True)
         return ResponseModel(
             success=False,
             status_code=ResponseCode.InternalServerError,
             message="服务器内部出错",
         )
-    finally:
-        # 5. 清理临时文件
-        if temp_file_path:
-            os.remove(temp_file_path)
-        if temp_dir:
-            os.rmdir(temp_dir)
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: str) -> ResponseModel:
+    """
+    查询文档入库任务的状态、文本块数量和各阶段耗时
+    :param job_id:任务id
+    :return:
+    """
+    job = await IngestJobManager.get_job(job_id)
+    if not job:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.NotFound,
+            message="任务不存在",
+        )
+    return ResponseModel(data=job)
+
+
+@router.post("/bulk_ingest")
+async def bulk_ingest(directory: str, file_concurrency: int = 4, embed_concurrency: int = 4) -> ResponseModel:
+    """
+    服务器目录批量入库，一级子目录名即文档分类，已入库的同名文档会跳过
+    :param directory:BULK_INGEST_ROOT之内的目录，相对路径相对于BULK_INGEST_ROOT
+    :param file_concurrency:同时处理的文档数量
+    :param embed_concurrency:同时进行的向量化请求数量
+    :return:
+    """
+    path = BulkIngestor.resolve(directory)
+    if not path:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.Forbidden,
+            message="目录不在允许批量入库的范围内",
+        )
+    if not path.is_dir():
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.BadRequest,
+            message="目录不存在",
+        )
+    progress = BulkIngestor.submit(path, file_concurrency, embed_concurrency)
+    return ResponseModel(message="批量入库已开始", data=progress)
+
+
+@router.get("/bulk_ingest/{task_id}")
+async def get_bulk_ingest(task_id: str) -> ResponseModel:
+    """
+    查询批量入库进度
+    :param task_id:任务id
+    :return:
+    """
+    progress = BulkIngestor.get_progress(task_id)
+    if not progress:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.NotFound,
+            message="任务不存在",
+        )
+    return ResponseModel(data=progress)
 
 
 @router.get("/list")
@@ -82,15 +156,105 @@ async def list_documents() -> ResponseModel:
           FROM documents
                    LEFT JOIN classification ON documents.classification_id = classification.id
           """
-    result = DBHelper.query_by_sql(sql)
+    result = await AsyncDBHelper.query_by_sql(sql)
     return ResponseModel(data=result)
 
 
 @router.delete("/delete")
 async def delete_document(document_id: int) -> ResponseModel:
-    document_name = DBHelper.query_one("documents", f"id={document_id}")
-    DocumentQueryEngine.delete_document(document_name['name'])
+    document = await AsyncDBHelper.query_one("documents", "id=?", (document_id,))
+    if not document:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.NotFound,
+            message="文档不存在",
+        )
+    await asyncio.to_thread(DocumentQueryEngine.delete_document, document["name"], document["classification_id"])
+
+    def delete_rows(conn):
+        DBHelper.delete("document_titles", "document_id=?", (document_id,), conn=conn)
+        DBHelper.delete("documents", "id=?", (document_id,), conn=conn)
 
-    DBHelper.delete("documents", f"id={document_id}")
+    await AsyncDBHelper.transaction(delete_rows)
+    await CorpusVersion.abump()
 
     return ResponseModel()
+
+
+@router.get("/index")
+async def get_index() -> ResponseModel:
+    """
+    文本块集合的数量、当前索引参数和可选的预设索引参数
+    :return:
+    """
+    collections = await asyncio.to_thread(IndexRebuilder.status)
+    return ResponseModel(data={
+        "collections": collections,
+        "profiles": {name: profile.model_dump() for name, profile in HNSW_PROFILES.items()},
+    })
+
+
+@router.post("/index/rebuild")
+async def rebuild_index(
+        profile: Optional[str] = None,
+        space: Optional[str] = None,
+        m: Optional[int] = None,
+        construction_ef: Optional[int] = None,
+        search_ef: Optional[int] = None
+) -> ResponseModel:
+    """
+    在后台把文本块集合复制到新集合后换入，重建期间查询和入库不中断
+    :param profile:预设索引参数名，为空且不指定参数时沿用原参数，只清理删除留下的碎片
+    :param space:距离函数，覆盖预设值
+    :param m:每个节点的邻居数，覆盖预设值
+    :param construction_ef:建索引时的候选数，覆盖预设值
+    :param search_ef:查询时的候选数，覆盖预设值
+    :return:
+    """
+    if profile and profile not in HNSW_PROFILES:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.BadRequest,
+            message=f"索引参数不存在，可选：{'、'.join(HNSW_PROFILES)}",
+        )
+    if IndexRebuilder.is_running():
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.BadRequest,
+            message="已有重建任务在运行",
+        )
+
+    overrides = {
+        key: value for key, value in
+        {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef}.items()
+        if value is not None
+    }
+    hnsw_profile = None
+    if profile or overrides:
+        try:
+            hnsw_profile = HnswProfile(**{**HNSW_PROFILES[profile or "default"].model_dump(), **overrides})
+        except ValidationError as e:
+            return ResponseModel(
+                success=False,
+                status_code=ResponseCode.BadRequest,
+                message=f"索引参数不合法：{e}",
+            )
+    progress = IndexRebuilder.submit(hnsw_profile)
+    return ResponseModel(message="向量索引重建已开始", data=progress)
+
+
+@router.get("/index/rebuild/{task_id}")
+async def get_index_rebuild(task_id: str) -> ResponseModel:
+    """
+    查询向量索引重建进度
+    :param task_id:任务id
+    :return:
+    """
+    progress = IndexRebuilder.get_progress(task_id)
+    if not progress:
+        return ResponseModel(
+            success=False,
+            status_code=ResponseCode.NotFound,
+            message="任务不存在",
+        )
+    return ResponseModel(data=progress)
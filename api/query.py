@@ -1,11 +1,20 @@
-from typing import List, Optional
+import json
+import time
+from typing import List, Optional, AsyncIterator, Tuple
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
 from agent.workflow_selection_agent import WorkflowSelectionAgent
 from schemas.response import ResponseModel, ResponseCode
-from utils.db_helper import DBHelper
+from schemas.retrieval_mode import RetrievalMode
+from schemas.workflow_mapping import workflow_mapping
+from utils.answer_cache import AnswerCache, Key, Scope
+from utils.async_db_helper import AsyncDBHelper
+from utils.corpus_version import CorpusVersion
+from utils.document_query import DocumentQueryEngine
 from utils.logger import logger
+from workflow.events import ProgressEvent, TokenEvent
 
 router = APIRouter(prefix="/query")
 
@@ -19,14 +28,13 @@ async def user_query(query_text: str, classification_ids: Optional[List[int]] =
     :return:
     """
     try:
-        classification_names = []
-        if classification_ids:
-            classification_data = DBHelper.query_one(
-                "classification",
-                f"id in ({','.join([str(x) for x in classification_ids])})"
-            )
-            if classification_data:
-                classification_names.append(classification_data["name"])
+        start = time.perf_counter()
+        classification_names = await _classification_names(classification_ids)
+
+        cache_key = await _cache_key(query_text, classification_names)
+        cached = AnswerCache.get(*cache_key)
+        if cached is not None:
+            return ResponseModel(message=cached)
 
         execute_workflow = await WorkflowSelectionAgent.run(query_text)
 
@@ -35,6 +43,7 @@ async def user_query(query_text: str, classification_ids: Optional[List[int]] =
         else:
             query_result = await execute_workflow(query_text=query_text)
 
+        AnswerCache.put(*cache_key, query_text, str(query_result), time.perf_counter() - start)
         return ResponseModel(message=str(query_result))
     except Exception as e:
         logger.error(f"查询失败: {e}")
@@ -43,3 +52,101 @@ async def user_query(query_text: str, classification_ids: Optional[List[int]] =
             status_code=ResponseCode.InternalServerError,
             message="服务器内部出错",
         )
+
+
+@router.post("/stream")
+async def user_query_stream(query_text: str, classification_ids: Optional[List[int]] = None) -> StreamingResponse:
+    """
+    用户自然语言查询（流式）
+    以Server-Sent Events推送：progress（选择的工作流、生成的过滤条件、检索到的片段数），
+    token（LLM逐个生成的内容），最后是done（完整回答）或error
+    :param query_text:查询文本
+    :param classification_ids:分类ID
+    :return:
+    """
+    return StreamingResponse(
+        _query_events(query_text, classification_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _query_events(query_text: str, classification_ids: Optional[List[int]]) -> AsyncIterator[str]:
+    """执行工作流并把事件流转换为SSE"""
+    handler = None
+    try:
+        start = time.perf_counter()
+        classification_names = await _classification_names(classification_ids)
+
+        cache_key = await _cache_key(query_text, classification_names)
+        cached = AnswerCache.get(*cache_key)
+        if cached is not None:
+            yield _sse("progress", {"stage": "cache", "message": "命中回答缓存", "data": {}})
+            yield _sse("token", {"delta": cached})
+            yield _sse("done", {"message": cached})
+            return
+
+        workflow_name = await WorkflowSelectionAgent.select(query_text)
+        yield _sse("progress", {"stage": "route", "message": "已选择工作流", "data": {"workflow": workflow_name}})
+
+        kwargs = {"query_text": query_text, "streaming": True}
+        if classification_names:
+            kwargs["classification_filters"] = classification_names
+        handler = workflow_mapping[workflow_name](**kwargs)
+
+        async for event in handler.stream_events():
+            if isinstance(event, TokenEvent):
+                yield _sse("token", {"delta": event.delta})
+            elif isinstance(event, ProgressEvent):
+                yield _sse("progress", event.model_dump())
+
+        query_result = await handler
+        AnswerCache.put(*cache_key, query_text, str(query_result), time.perf_counter() - start)
+        yield _sse("done", {"message": str(query_result)})
+    except Exception as e:
+        logger.error(f"流式查询失败: {e}")
+        yield _sse("error", {"message": "服务器内部出错"})
+    finally:
+        # 客户端断开时停止工作流
+        if handler is not None and not handler.done():
+            await handler.cancel_run()
+
+
+@router.get("/cache")
+async def answer_cache_stats() -> ResponseModel:
+    """
+    回答缓存的命中率和节省的耗时
+    :return:
+    """
+    return ResponseModel(data=AnswerCache.stats())
+
+
+async def _cache_key(query_text: str, classification_names: List[str]) -> Tuple[Key, Scope, int]:
+    """
+    回答缓存的查找条件：(查询向量或规范化文本, 分类范围, 文档库版本号)，版本号需在执行工作流之前读取。
+    只走关键词检索的查询本来不需要向量化，按规范化文本查找，不为查缓存多调用一次向量化接口；
+    其他查询的向量在检索时由查询向量缓存复用
+    """
+    version = await CorpusVersion.acurrent()
+    if DocumentQueryEngine.resolve_mode(query_text) == RetrievalMode.LEXICAL:
+        key = AnswerCache.normalize_text(query_text)
+    else:
+        key = await DocumentQueryEngine.aembed_query(query_text)
+    return key, AnswerCache.scope(classification_names), version
+
+
+async def _classification_names(classification_ids: Optional[List[int]]) -> List[str]:
+    """分类id转分类名"""
+    if not classification_ids:
+        return []
+    classification_data = await AsyncDBHelper.query_many(
+        "classification",
+        f"id in ({','.join(['?'] * len(classification_ids))})",
+        tuple(classification_ids)
+    )
+    return [x["name"] for x in classification_data]
+
+
+def _sse(event: str, data: dict) -> str:
+    """格式化一条SSE消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,120 @@
+"""
+/query 回答缓存基准测试
+
+离线环境下用少量基础问题及其改写（加“请问”、句末加问号、换标点）模拟用户重复提问，
+问题按幂律分布抽取。分别在关闭和开启回答缓存时调用 /query，统计命中率、命中与未命中的
+p50 延迟和节省的总耗时；最后上传一个新文档，确认文档库版本变化后缓存全部失效。
+LLM延迟用 --first-token-ms 和 --token-ms 模拟。
+
+用法：python -m benchmark.answer_cache_benchmark [--questions 20] [--requests 200] [--threshold 0.95]
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+_VARIANTS = [
+    lambda q: q,
+    lambda q: "请问" + q,
+    lambda q: q.rstrip("。") + "？",
+    lambda q: q.replace("，", " "),
+]
+
+
+async def _run(user_query, questions: list) -> list:
+    """返回每个请求的耗时（秒）"""
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        response = await user_query(question)
+        assert response.success, response.message
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _main(args, upload):
+    # Agent在导入时创建LLM，必须在setup之后导入
+    from api.query import user_query
+    from utils.answer_cache import AnswerCache
+
+    rng = random.Random(42)
+    bases = [offline_env.synthetic_paragraph(rng, 12) for _ in range(args.questions)]
+    weights = [1 / (i + 1) for i in range(len(bases))]
+    questions = [rng.choice(_VARIANTS)(rng.choices(bases, weights)[0]) for _ in range(args.requests)]
+
+    AnswerCache.configure(enabled=False)
+    baseline = await _run(user_query, questions)
+
+    AnswerCache.configure(enabled=True, threshold=args.threshold)
+    latencies, hits = [], []
+    for question in questions:
+        before = AnswerCache.stats()["hits"]
+        latencies.extend(await _run(user_query, [question]))
+        hits.append(AnswerCache.stats()["hits"] > before)
+    stats = AnswerCache.stats()
+
+    hit_latencies = [x for x, hit in zip(latencies, hits) if hit]
+    miss_latencies = [x for x, hit in zip(latencies, hits) if not hit]
+    print(f"{'case':<22}{'requests':>10}{'hit rate':>10}{'p50(ms)':>10}{'mean(ms)':>10}{'total(s)':>10}")
+    for label, values, rate in [
+        ("cache off", baseline, 0.0),
+        ("cache on", latencies, stats["hit_rate"]),
+        ("  hits", hit_latencies, 1.0),
+        ("  misses", miss_latencies, 0.0),
+    ]:
+        if not values:
+            continue
+        summary = offline_env.latency_summary(values)
+        print(f"{label:<22}{len(values):>10}{rate:>10.2f}{summary['p50']:>10.1f}{summary['mean']:>10.1f}"
+              f"{sum(values):>10.2f}")
+    print(f"distinct questions: {len(bases)}, saved_seconds: {stats['saved_seconds']}, "
+          f"entries: {stats['entries']}, version: {stats['version']}")
+
+    # 上传文档后文档库版本变化，之前缓存的回答都不能再命中
+    upload()
+    before = AnswerCache.stats()
+    await _run(user_query, questions[:1])
+    after = AnswerCache.stats()
+    print(f"after upload: version {before['version']} -> {after['version']}, "
+          f"hits +{after['hits'] - before['hits']}, invalidations {after['invalidations']}, "
+          f"entries {after['entries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/query 回答缓存基准测试")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=20, help="不同的基础问题数")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.95, help="视为同一问题的最低余弦相似度")
+    parser.add_argument("--first-token-ms", type=float, default=300, help="LLM首字延迟")
+    parser.add_argument("--token-ms", type=float, default=5, help="LLM每个token的延迟")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(
+            temp_dir,
+            first_token_ms=args.first_token_ms,
+            token_ms=args.token_ms,
+        )
+
+        from utils.document_embedding import DocumentEmbedding
+
+        paths = offline_env.generate_corpus(temp_dir, args.files + 1, 10)
+        name = offline_env.CLASSIFICATIONS[0]
+        for path in paths[:-1]:
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        asyncio.run(_main(args, lambda: DocumentEmbedding.vectorize_document(classification_ids[name], name, paths[-1])))
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+AsyncDBHelper 事件循环阻塞测试
+
+模拟 /health 的心跳协程每 10ms 运行一次，同时并发执行若干慢查询，
+分别使用同步 DBHelper 和 AsyncDBHelper，统计心跳的最大延迟。
+同步调用会让心跳停顿到慢查询结束，异步调用下心跳延迟应保持在毫秒级。
+
+用法：python -m benchmark.async_db_benchmark [--slow-queries 4] [--rows 3000000]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
+
+_SLOW_SQL = """
+            WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < ?)
+            SELECT count(*) AS total FROM counter
+            """
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """模拟健康检查，返回最大调度延迟（秒）"""
+    max_lag = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - start - interval)
+    return max_lag
+
+
+async def _sync_slow_query(rows: int):
+    return DBHelper.query_by_sql(_SLOW_SQL, (rows,))
+
+
+async def _async_slow_query(rows: int):
+    return await AsyncDBHelper.query_by_sql(_SLOW_SQL, (rows,))
+
+
+async def _measure(query, slow_queries: int, rows: int):
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[query(rows) for _ in range(slow_queries)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return await heartbeat, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="AsyncDBHelper 事件循环阻塞测试")
+    parser.add_argument("--slow-queries", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=3000000)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        DBHelper.configure(db_path=os.path.join(temp_dir, "benchmark.db"))
+        for name, query in (("DBHelper", _sync_slow_query), ("AsyncDBHelper", _async_slow_query)):
+            max_lag, elapsed = await _measure(query, args.slow_queries, args.rows)
+            print(f"{name:<16}慢查询总耗时 {elapsed * 1000:>8.1f}ms  心跳最大延迟 {max_lag * 1000:>8.1f}ms")
+    finally:
+        AsyncDBHelper.close()
+        DBHelper.close()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
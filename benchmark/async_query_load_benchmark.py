@@ -0,0 +1,120 @@
+"""
+检索工作流并发负载测试
+
+离线环境下固定选中 general_query 或 metadata_query 工作流，以不同并发调用 /query 的处理函数，
+对比工作流步骤中调用同步查询方法（旧实现，阻塞事件循环）和异步查询方法时的吞吐量与延迟。
+每个请求的查询文本都不同，查询向量不会命中缓存。
+
+用法：python -m benchmark.async_query_load_benchmark [--requests 64] [--concurrency 1 4 16]
+      [--first-token-ms 200] [--token-ms 5] [--embed-latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from benchmark import offline_env
+
+_WORKFLOWS = ["general_query", "metadata_query"]
+
+
+@contextmanager
+def _blocking_queries():
+    """把异步查询方法替换为直接调用同步方法，还原旧实现的行为"""
+    from utils.document_query import DocumentQueryEngine
+
+    asimple_query, aquery_metadatas = DocumentQueryEngine.asimple_query, DocumentQueryEngine.aquery_metadatas
+
+    async def blocking_simple_query(*args, **kwargs):
+        return DocumentQueryEngine.simple_query(*args, **kwargs)
+
+    async def blocking_query_metadatas(*args, **kwargs):
+        return DocumentQueryEngine.query_metadatas(*args, **kwargs)
+
+    DocumentQueryEngine.asimple_query = blocking_simple_query
+    DocumentQueryEngine.aquery_metadatas = blocking_query_metadatas
+    try:
+        yield
+    finally:
+        DocumentQueryEngine.asimple_query = asimple_query
+        DocumentQueryEngine.aquery_metadatas = aquery_metadatas
+
+
+async def _load(user_query, questions: list, concurrency: int) -> tuple:
+    """返回 (各请求耗时, 总耗时)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(question: str):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await user_query(question)
+            assert response.success, response.message
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(x) for x in questions))
+    return latencies, time.perf_counter() - start
+
+
+async def _main(args):
+    # Agent在导入时创建LLM，必须在setup之后导入
+    from agent.workflow_selection_agent import WorkflowSelectionAgent
+    from api.query import user_query
+
+    rng = random.Random(42)
+    print(f"{'workflow':<16}{'mode':<10}{'concurrency':>12}{'p50(ms)':>10}{'p99(ms)':>10}{'req/s':>8}")
+    for workflow in _WORKFLOWS:
+        WorkflowSelectionAgent._llm.rules = [("工作流选择专家", workflow)]
+        await user_query("预热")
+        for concurrency in args.concurrency:
+            for mode in ("blocking", "async"):
+                questions = [offline_env.synthetic_paragraph(rng, 6) for _ in range(args.requests)]
+                if mode == "blocking":
+                    with _blocking_queries():
+                        latencies, elapsed = await _load(user_query, questions, concurrency)
+                else:
+                    latencies, elapsed = await _load(user_query, questions, concurrency)
+                summary = offline_env.latency_summary(latencies)
+                print(f"{workflow:<16}{mode:<10}{concurrency:>12}{summary['p50']:>10.1f}{summary['p99']:>10.1f}"
+                      f"{len(latencies) / elapsed:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检索工作流并发负载测试")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=64, help="每种情形的请求数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--first-token-ms", type=float, default=200, help="LLM首字延迟")
+    parser.add_argument("--token-ms", type=float, default=5, help="LLM每个token的延迟")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="查询向量化的模拟延迟")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(
+            temp_dir,
+            embed_latency_ms=args.embed_latency_ms,
+            first_token_ms=args.first_token_ms,
+            token_ms=args.token_ms,
+        )
+
+        from utils.document_embedding import DocumentEmbedding
+
+        for i, path in enumerate(offline_env.generate_corpus(temp_dir, args.files, args.chapters)):
+            name = offline_env.CLASSIFICATIONS[i % len(offline_env.CLASSIFICATIONS)]
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        asyncio.run(_main(args))
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
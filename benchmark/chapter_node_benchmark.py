@@ -0,0 +1,100 @@
+"""
+多章节文本块的节点数对比
+
+在章节密集的合成文档上，对比旧实现（文本块跨越多个章节时复制节点）与当前实现
+（一个节点在元数据中记录全部章节）的向量数量、解析耗时，以及按批次延迟估算的向量化耗时。
+
+用法：python -m benchmark.chapter_node_benchmark [--chapters 400] [--lines 4] [--embed-latency 0.3]
+"""
+
+import argparse
+import copy
+import math
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.node_parser import SentenceSplitter
+
+from utils.chapter_extractor import ChapterExtractor
+from utils.document_embedding import DocumentEmbedding
+
+_EMBED_BATCH_SIZE = 5
+
+
+def _legacy_process(nodes, classification_name: str, file_ext: str):
+    """旧实现：跨章节的文本块为每个额外章节复制一个节点"""
+    chapter_extractor = ChapterExtractor.for_file_type(file_ext)
+    chapter_title = None
+    need_append_nodes = []
+
+    for node in nodes:
+        chapter_titles = [x.title for x in chapter_extractor.extract(node.text)]
+
+        if chapter_titles:
+            if chapter_title:
+                temp_node = copy.deepcopy(node)
+                node.node_id = str(uuid.uuid4())
+                temp_node.metadata["chapter_title"] = chapter_title
+                temp_node.metadata["classification"] = classification_name
+                need_append_nodes.append(temp_node)
+
+            chapter_title = chapter_titles.pop()
+
+        node.metadata["chapter_title"] = chapter_title
+        node.metadata["classification"] = classification_name
+
+        while chapter_titles:
+            temp_chapter_title = chapter_titles.pop()
+            temp_node = copy.deepcopy(node)
+            node.node_id = str(uuid.uuid4())
+            temp_node.metadata["chapter_title"] = temp_chapter_title
+            temp_node.metadata["classification"] = classification_name
+            need_append_nodes.append(temp_node)
+            chapter_title = temp_chapter_title
+
+    return nodes + need_append_nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多章节文本块的节点数对比")
+    parser.add_argument("--chapters", type=int, default=400)
+    parser.add_argument("--lines", type=int, default=4, help="每章的段落数，越小章节越密集")
+    parser.add_argument("--embed-latency", type=float, default=0.3, help="每批向量化请求的估计耗时（秒）")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_path = Path(os.path.join(temp_dir, "handbook.md"))
+        with open(file_path, "w", encoding="utf-8") as f:
+            for c in range(1, args.chapters + 1):
+                f.write(f"## {c} 操作规范第{c}部分\n")
+                for _ in range(args.lines):
+                    f.write("设备启动前需检查电源、气压与安全联锁状态，确认无误后方可进入下一步操作。\n")
+
+        node_parser = SentenceSplitter(chunk_size=512, chunk_overlap=50, include_metadata=True)
+
+        start = time.perf_counter()
+        nodes, _ = DocumentEmbedding._process_generic("benchmark", file_path, node_parser)
+        current_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        documents = SimpleDirectoryReader(input_files=[str(file_path)]).load_data()
+        legacy_nodes = _legacy_process(node_parser.get_nodes_from_documents(documents), "benchmark", ".md")
+        legacy_seconds = time.perf_counter() - start
+
+        print(f"{'':<10}{'vectors':>10}{'parse(s)':>10}{'embed est.(s)':>16}")
+        for name, count, seconds in (("before", len(legacy_nodes), legacy_seconds),
+                                     ("after", len(nodes), current_seconds)):
+            embed_seconds = math.ceil(count / _EMBED_BATCH_SIZE) * args.embed_latency
+            print(f"{name:<10}{count:>10}{seconds:>10.2f}{embed_seconds:>16.1f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
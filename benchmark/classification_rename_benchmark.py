@@ -0,0 +1,89 @@
+"""
+分类重命名基准测试
+
+在临时向量集合中写入 --chunks 个属于同一分类的文本块（随机向量，不经过向量化），
+统计 DocumentQueryEngine.update_metadata 批量重命名的耗时；
+逐个文本块读取和更新的旧实现只在 --legacy-chunks 个文本块上运行，并按比例推算全量耗时。
+
+用法：python -m benchmark.classification_rename_benchmark [--chunks 100000] [--legacy-chunks 2000]
+      [--batch-size 5000] [--dimension 64]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+_ADD_BATCH = 5000
+
+
+def _fill(collection, classification: str, count: int, dimension: int, rng: random.Random):
+    """写入count个属于classification的文本块"""
+    for start in range(0, count, _ADD_BATCH):
+        ids = [f"{classification}-{i}" for i in range(start, min(start + _ADD_BATCH, count))]
+        collection.add(
+            ids=ids,
+            embeddings=[[rng.random() for _ in range(dimension)] for _ in ids],
+            documents=[f"文本块{x}" for x in ids],
+            metadatas=[{"classification": classification, "file_name": f"{x.rsplit('-', 1)[1][:-3] or 0}.txt",
+                        "chapter_title": "第一章"} for x in ids],
+        )
+
+
+def _legacy_update_metadata(collection, old: str, new: str):
+    """旧实现：逐个文本块读取和更新"""
+    wait_update_node = collection.get(where={"classification": old})
+    for node_id in wait_update_node["ids"]:
+        node_data = collection.get(ids=node_id)
+        node_data["metadatas"][0]["classification"] = new
+        collection.update(ids=node_id, metadatas=node_data["metadatas"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分类重命名基准测试")
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--legacy-chunks", type=int, default=2000, help="旧实现实际运行的文本块数量")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=64)
+    args = parser.parse_args()
+
+    from utils.document_query import DocumentQueryEngine
+    from utils.model_provider import ModelProvider
+
+    ModelProvider.configure(embed_provider="hashing", llm_provider="scripted")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        DocumentQueryEngine.initialize(collection_name="rename_benchmark", persist_dir=temp_dir)
+        collection = DocumentQueryEngine._collection
+        rng = random.Random(42)
+
+        start = time.perf_counter()
+        _fill(collection, "legacy", args.legacy_chunks, args.dimension, rng)
+        _fill(collection, "小说", args.chunks, args.dimension, rng)
+        print(f"build: {collection.count()} chunks in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        _legacy_update_metadata(collection, "legacy", "legacy_renamed")
+        legacy = time.perf_counter() - start
+        print(f"{'per-chunk (legacy)':<22}{args.legacy_chunks:>8} chunks {legacy:>8.2f}s"
+              f"  -> {legacy / args.legacy_chunks * args.chunks:.1f}s estimated for {args.chunks}")
+
+        def report(updated: int, total: int):
+            print(f"  progress {updated}/{total}  {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        updated = DocumentQueryEngine.update_metadata("小说", "网络小说", batch_size=args.batch_size, progress=report)
+        batched = time.perf_counter() - start
+        print(f"{'batched':<22}{updated:>8} chunks {batched:>8.2f}s")
+
+        remaining = len(collection.get(where={"classification": "小说"}, include=[])["ids"])
+        renamed = len(collection.get(where={"classification": "网络小说"}, include=[])["ids"])
+        print(f"check: remaining={remaining} renamed={renamed}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+分类分片基准测试
+
+在临时目录中按 --classifications 个分类写入 --chunks 个随机向量，分别放在一个集合中（用classification
+元数据过滤）和按分类分片的集合中，通过 DocumentQueryEngine 的向量检索器对比：
+- 只查1个分类（过滤条件选择性高）、查3个分类、不限分类时的 p50/p99 延迟和 recall@k
+  （与按过滤条件精确计算的前k个结果比较）
+- 分类改名的耗时：单集合改写该分类的全部文本块，分片只修改文档级索引
+
+用法：python -m benchmark.classification_shard_benchmark [--classifications 20] [--chunks 50000] [--dim 256]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark import offline_env
+
+
+def _exact_top_k(vectors: np.ndarray, labels: np.ndarray, query: np.ndarray, allowed: list, top_k: int) -> set:
+    """允许的分类中与查询距离最近的前k个文本块下标"""
+    candidates = np.flatnonzero(np.isin(labels, allowed)) if allowed else np.arange(len(vectors))
+    distances = np.sum((vectors[candidates] - query) ** 2, axis=1)
+    return set(candidates[np.argsort(distances)[:top_k]].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分类分片基准测试")
+    parser.add_argument("--classifications", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        offline_env.setup(temp_dir)
+
+        from llama_index.core.schema import QueryBundle
+
+        from schemas.agent_schemas import DocumentMetadataFilters
+        from utils.classification_shards import ClassificationShards
+        from utils.db_helper import DBHelper
+        from utils.document_query import DocumentQueryEngine
+
+        names = [f"分类{i}" for i in range(args.classifications)]
+        with DBHelper.transaction() as conn:
+            DBHelper.delete("classification", conn=conn)
+            classification_ids = [DBHelper.insert("classification", {"name": name}, conn=conn) for name in names]
+
+        rng = np.random.default_rng(42)
+        vectors = rng.standard_normal((args.chunks, args.dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        # 分类大小不均匀，最小的分类只占很小的比例
+        weights = 1 / np.arange(1, args.classifications + 1)
+        labels = rng.choice(args.classifications, size=args.chunks, p=weights / weights.sum())
+
+        batch_size = DocumentQueryEngine._client.get_max_batch_size()
+        for start in range(0, args.chunks, batch_size):
+            end = min(start + batch_size, args.chunks)
+            ids = [f"chunk_{i}" for i in range(start, end)]
+            metadatas = [{"classification": names[labels[i]], "file_name": f"doc_{i % 500}.txt"}
+                         for i in range(start, end)]
+            DocumentQueryEngine._collection.add(ids=ids, embeddings=vectors[start:end],
+                                                documents=ids, metadatas=metadatas)
+            for label in set(labels[start:end].tolist()):
+                indexes = [i for i in range(start, end) if labels[i] == label]
+                ClassificationShards.handle(classification_ids[label]).collection.add(
+                    ids=[f"chunk_{i}" for i in indexes], embeddings=vectors[indexes],
+                    documents=[f"chunk_{i}" for i in indexes], metadatas=[metadatas[i - start] for i in indexes])
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        cases = [
+            ("1 classification", [args.classifications - 1]),
+            ("3 classifications", [0, args.classifications // 2, args.classifications - 1]),
+            ("all", []),
+        ]
+
+        print(f"{'case':<20}{'layout':<10}{'p50(ms)':>10}{'p99(ms)':>10}{f'recall@{args.top_k}':>11}")
+        for label, allowed in cases:
+            filters = DocumentQueryEngine._assembly_metadata_filters(
+                DocumentMetadataFilters(classification=[names[x] for x in allowed]) if allowed else None
+            )
+            for layout, sharded in (("single", False), ("sharded", True)):
+                ClassificationShards.configure(enabled=sharded)
+                retriever = DocumentQueryEngine._get_vector_retriever(args.top_k, filters)
+                retriever.retrieve(QueryBundle(query_str="预热", embedding=queries[0].tolist()))
+
+                latencies, recall = [], 0.0
+                for query in queries:
+                    start = time.perf_counter()
+                    nodes = retriever.retrieve(QueryBundle(query_str="q", embedding=query.tolist()))
+                    latencies.append(time.perf_counter() - start)
+                    found = {int(x.node.node_id.split("_")[1]) for x in nodes}
+                    recall += len(found & _exact_top_k(vectors, labels, query, allowed, args.top_k)) / args.top_k
+                summary = offline_env.latency_summary(latencies)
+                print(f"{label:<20}{layout:<10}{summary['p50']:>10.2f}{summary['p99']:>10.2f}"
+                      f"{recall / args.queries:>11.2f}")
+
+        for layout, sharded in (("single", False), ("sharded", True)):
+            ClassificationShards.configure(enabled=sharded)
+            start = time.perf_counter()
+            updated = DocumentQueryEngine.update_metadata(names[0], f"{names[0]}_{layout}")
+            print(f"rename {names[0]} ({layout}): {time.perf_counter() - start:.2f}s, rewritten chunks: {updated}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+DBHelper 连接池基准测试
+
+对比每次调用新建连接并提交（旧实现）与连接池复用连接的吞吐量（ops/sec）。
+在数据库副本上运行，不会修改 document.db。
+
+用法：python -m benchmark.db_helper_benchmark [--ops 2000] [--threads 8]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db_helper import DBHelper
+
+_LIST_SQL = """
+            SELECT documents.id, documents.name, classification.name AS classification_name
+            FROM documents
+                     LEFT JOIN classification ON documents.classification_id = classification.id
+            """
+
+
+def _legacy_query(db_path: str, sql: str, params: tuple = ()):
+    """旧实现：每次调用新建连接，查询后也提交"""
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        conn.commit()
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def _run(fn, ops: int, threads: int) -> float:
+    """并发执行 ops 次 fn，返回 ops/sec"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: fn(), range(ops)))
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DBHelper 连接池基准测试")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(temp_dir, "document.db")
+        shutil.copy(DBHelper._db_path, db_path)
+
+        cases = {
+            "query_one": (
+                lambda: _legacy_query(db_path, "SELECT * FROM documents WHERE id=? LIMIT 1", (1,)),
+                lambda: DBHelper.query_one("documents", "id=?", (1,)),
+            ),
+            "document_list": (
+                lambda: _legacy_query(db_path, _LIST_SQL),
+                lambda: DBHelper.query_by_sql(_LIST_SQL),
+            ),
+        }
+
+        legacy_results = {name: _run(legacy, args.ops, args.threads) for name, (legacy, _) in cases.items()}
+
+        DBHelper.configure(db_path=db_path, pool_size=args.threads)
+        pooled_results = {name: _run(pooled, args.ops, args.threads) for name, (_, pooled) in cases.items()}
+        DBHelper.close()
+
+        print(f"{'case':<16}{'before(ops/s)':>16}{'after(ops/s)':>16}{'speedup':>10}")
+        for name in cases:
+            before, after = legacy_results[name], pooled_results[name]
+            print(f"{name:<16}{before:>16.0f}{after:>16.0f}{after / before:>9.1f}x")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
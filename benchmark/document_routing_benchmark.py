@@ -0,0 +1,144 @@
+"""
+文档级路由基准测试
+
+离线环境下生成按主题区分的合成语料（每个文档有自己的主题词，另混入公共词），语料逐步扩大到
+--sizes 指定的文档数，每个规模下对比：
+- 文本块检索：直接检索全部文本块（flat）与先在文档级选出候选文档再检索（routed）的 p50 延迟、
+  命中率（前k个文本块中包含提问来源文档）以及 routed 结果与 flat 结果的重合率
+- 元数据查询：query_metadatas(top_k=100) 汇总文本块元数据与 query_documents 只查文档级的
+  p50 延迟和命中率（结果中包含提问来源文档）
+查询向量预先缓存，两种方式的向量化开销相同。
+
+用法：python -m benchmark.document_routing_benchmark [--sizes 100,400,1200] [--queries 100] [--route 20]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+# 主题词从这个范围的汉字中随机组合
+_TOPIC_CHARS = [chr(x) for x in range(0x4e00, 0x4e00 + 3000)]
+
+
+def _topic_paragraph(rng: random.Random, topic: list, words: int = 40) -> str:
+    """主题词与公共词混合的一段文本"""
+    return "".join(rng.choice(topic) if rng.random() < 0.6 else rng.choice(offline_env.WORDS)
+                   for _ in range(words)) + "。"
+
+
+def _generate(target_dir: str, start: int, count: int, topics: dict, rng: random.Random,
+              chapters: int, paragraphs: int) -> list:
+    """生成第start个起的count个文档，返回文件路径列表"""
+    paths = []
+    for i in range(start, start + count):
+        topic = topics[i] = ["".join(rng.sample(_TOPIC_CHARS, 2)) for _ in range(8)]
+        lines = []
+        for c in range(1, chapters + 1):
+            lines.append(f"第{offline_env.chapter_number(c)}章 {rng.choice(topic)}")
+            lines.extend(_topic_paragraph(rng, topic) for _ in range(paragraphs))
+        path = os.path.join(target_dir, f"doc_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def _measure(func, queries: list) -> tuple:
+    """返回 (p50延迟, 每个查询的结果)"""
+    latencies, results = [], []
+    for question, _ in queries:
+        start = time.perf_counter()
+        results.append(func(question))
+        latencies.append(time.perf_counter() - start)
+    return offline_env.latency_summary(latencies)["p50"], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档级路由基准测试")
+    parser.add_argument("--sizes", default="100,400,1200", help="逐步扩大的文档数")
+    parser.add_argument("--chapters", type=int, default=4)
+    parser.add_argument("--paragraphs", type=int, default=15, help="每章的段落数")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--route", type=int, default=20, help="文档级选出的候选文档数")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(temp_dir)
+
+        from utils.document_embedding import DocumentEmbedding
+        from utils.document_index import DocumentIndex
+        from utils.document_query import DocumentQueryEngine
+
+        name = offline_env.CLASSIFICATIONS[0]
+        rng = random.Random(42)
+        topics = {}
+        print(f"{'docs':>6}{'chunks':>8}  {'case':<22}{'p50(ms)':>10}{'hit rate':>10}{'overlap':>10}")
+        for size in [int(x) for x in args.sizes.split(",")]:
+            paths = _generate(temp_dir, len(topics), size - len(topics), topics, rng, args.chapters, args.paragraphs)
+            for path in paths:
+                DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+                os.remove(path)
+
+            queries = []
+            for _ in range(args.queries):
+                document = rng.randrange(size)
+                queries.append((_topic_paragraph(rng, topics[document], 12), f"doc_{document}.txt"))
+            for question, _ in queries:
+                DocumentQueryEngine._query_embed_model.get_query_embedding(question)
+
+            def retrieve(route):
+                DocumentQueryEngine._route_documents = route
+                retriever = DocumentQueryEngine._get_vector_retriever(args.top_k)
+                return lambda q: [x.node.node_id for x in retriever.retrieve(q)]
+
+            # 第一个规模之前预热，排除首次查询的初始化开销
+            if size == len(paths):
+                retrieve(args.route)(queries[0][0])
+
+            file_names = {}
+
+            def hit_rate(results, to_names):
+                return sum(truth in to_names(result) for result, (_, truth) in zip(results, queries)) / len(queries)
+
+            def chunk_names(node_ids):
+                missing = [x for x in node_ids if x not in file_names]
+                if missing:
+                    stored = DocumentQueryEngine._collection.get(ids=missing, include=["metadatas"])
+                    file_names.update((i, m["file_name"]) for i, m in zip(stored["ids"], stored["metadatas"]))
+                return {file_names[x] for x in node_ids}
+
+            chunks = DocumentQueryEngine._collection.count()
+            flat_p50, flat = _measure(retrieve(0), queries)
+            routed_p50, routed = _measure(retrieve(args.route), queries)
+            overlap = sum(len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(flat, routed)) / len(queries)
+
+            DocumentQueryEngine._route_documents = 0
+            chunk_meta_p50, chunk_meta = _measure(
+                lambda q: DocumentQueryEngine.query_metadatas(q, top_k=100, mode="vector"), queries)
+            doc_meta_p50, doc_meta = _measure(DocumentQueryEngine.query_documents, queries)
+
+            rows = [
+                ("chunks flat", flat_p50, hit_rate(flat, chunk_names), 1.0),
+                (f"chunks routed({args.route})", routed_p50, hit_rate(routed, chunk_names), overlap),
+                ("metadata chunks(100)", chunk_meta_p50, hit_rate(chunk_meta, lambda r: {x["file_name"] for x in r}),
+                 None),
+                ("metadata documents", doc_meta_p50, hit_rate(doc_meta, lambda r: {x["file_name"] for x in r}),
+                 None),
+            ]
+            for label, p50, rate, overlap_rate in rows:
+                overlap_text = f"{overlap_rate:>10.2f}" if overlap_rate is not None else f"{'-':>10}"
+                print(f"{DocumentIndex.count():>6}{chunks:>8}  {label:<22}{p50:>10.2f}{rate:>10.2f}{overlap_text}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
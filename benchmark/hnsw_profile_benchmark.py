@@ -0,0 +1,115 @@
+"""
+HNSW索引参数基准测试
+
+在临时目录中生成 --chunks 个聚类分布的合成向量（--clusters 个簇中心加 --noise 倍的噪声，接近
+真实语料中同一主题的文本块彼此相近的分布），对 HNSW_PROFILES 中的每组参数：
+- 建索引：按该参数新建集合并写入全部向量的耗时
+- 查询：--queries 个查询的 p50/p99 延迟和 recall@k（与numpy精确计算的前k个结果比较）
+- 删除后：随机删除 --delete-ratio 比例的向量后再查询，以及 VectorStoreRegistry.rebuild
+  按原参数重建（清理碎片）后再查询
+
+用法：python -m benchmark.hnsw_profile_benchmark [--chunks 50000] [--noise 1.0] [--profiles fast,default,balanced,recall]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark import offline_env
+
+
+def _measure(collection, queries: np.ndarray, truth: list, top_k: int) -> tuple:
+    """返回 (p50延迟, p99延迟, recall@k)"""
+    collection.query(query_embeddings=queries[:1], n_results=top_k, include=[])
+    latencies, recall = [], 0.0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=top_k, include=[])
+        latencies.append(time.perf_counter() - start)
+        recall += len(expected.intersection(int(x) for x in result["ids"][0])) / top_k
+    summary = offline_env.latency_summary(latencies)
+    return summary["p50"], summary["p99"], recall / len(queries)
+
+
+def _exact_top_k(vectors: np.ndarray, alive: np.ndarray, queries: np.ndarray, top_k: int) -> list:
+    """每个查询在未删除的向量中按l2距离精确计算的前k个下标"""
+    candidates = np.flatnonzero(alive)
+    truth = []
+    for query in queries:
+        distances = np.sum((vectors[candidates] - query) ** 2, axis=1)
+        truth.append(set(candidates[np.argpartition(distances, top_k)[:top_k]].tolist()))
+    return truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW索引参数基准测试")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=1.0, help="噪声与簇中心的尺度之比，越大簇越分散，越难检索")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--delete-ratio", type=float, default=0.3)
+    parser.add_argument("--profiles", default="fast,default,balanced,recall")
+    args = parser.parse_args()
+
+    from schemas.hnsw_profile import HNSW_PROFILES
+    from utils.vector_store_registry import VectorStoreRegistry
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(42)
+        centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+        vectors = centers[rng.integers(args.clusters, size=args.chunks)] \
+            + args.noise * rng.standard_normal((args.chunks, args.dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        # 查询取自簇中心附近，与语料同分布
+        queries = centers[rng.integers(args.clusters, size=args.queries)] \
+            + args.noise * rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        alive = np.ones(args.chunks, dtype=bool)
+        truth = _exact_top_k(vectors, alive, queries, args.top_k)
+        deleted = rng.choice(args.chunks, size=int(args.chunks * args.delete_ratio), replace=False)
+        alive[deleted] = False
+        truth_after_delete = _exact_top_k(vectors, alive, queries, args.top_k)
+
+        batch_size = VectorStoreRegistry.open(temp_dir).get_max_batch_size()
+        print(f"{'profile':<10}{'M':>4}{'c_ef':>6}{'s_ef':>6}{'build(s)':>10}  {'case':<16}"
+              f"{'p50(ms)':>9}{'p99(ms)':>9}{f'recall@{args.top_k}':>11}")
+        for name in args.profiles.split(","):
+            profile = HNSW_PROFILES[name]
+            VectorStoreRegistry.configure(hnsw_profile=name)
+            collection = VectorStoreRegistry.get(f"profile_{name}", temp_dir).collection
+
+            start = time.perf_counter()
+            for offset in range(0, args.chunks, batch_size):
+                end = min(offset + batch_size, args.chunks)
+                collection.add(ids=[str(i) for i in range(offset, end)], embeddings=vectors[offset:end])
+            build_seconds = time.perf_counter() - start
+
+            rows = [("full", *_measure(collection, queries, truth, args.top_k))]
+            for offset in range(0, len(deleted), batch_size):
+                collection.delete(ids=[str(i) for i in deleted[offset:offset + batch_size]])
+            rows.append(("after delete", *_measure(collection, queries, truth_after_delete, args.top_k)))
+
+            start = time.perf_counter()
+            collection = VectorStoreRegistry.rebuild(f"profile_{name}", temp_dir).collection
+            rebuild_seconds = time.perf_counter() - start
+            rows.append((f"rebuilt({rebuild_seconds:.1f}s)",
+                         *_measure(collection, queries, truth_after_delete, args.top_k)))
+
+            for i, (case, p50, p99, recall) in enumerate(rows):
+                prefix = (f"{name:<10}{profile.m:>4}{profile.construction_ef:>6}{profile.search_ef:>6}"
+                          f"{build_seconds:>10.1f}") if i == 0 else " " * 36
+                print(f"{prefix}  {case:<16}{p50:>9.2f}{p99:>9.2f}{recall:>11.3f}")
+    finally:
+        VectorStoreRegistry.close()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
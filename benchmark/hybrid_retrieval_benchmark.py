@@ -0,0 +1,96 @@
+"""
+混合检索基准测试
+
+离线环境下在合成语料中随机插入若干唯一的型号编码（如 XK-4821），分别用关键词式查询（只有编码）
+和问句（“XK-4821是做什么用的？”）检索，对比向量、关键词、混合和auto四种检索方式的
+命中率（前k个片段中包含该编码）、p50/p99 延迟和向量化接口调用次数。
+--embed-latency-ms 模拟向量化接口的往返耗时，每种检索方式都从空的查询向量缓存开始。
+
+用法：python -m benchmark.hybrid_retrieval_benchmark [--files 8] [--codes 100] [--top-k 3] [--embed-latency-ms 50]
+"""
+
+import argparse
+import random
+import shutil
+import string
+import tempfile
+import time
+
+from benchmark import offline_env
+
+
+def _insert_codes(paths: list, count: int, rng: random.Random) -> list:
+    """在随机文件的随机段落后插入唯一编码，返回编码列表"""
+    codes = []
+    while len(codes) < count:
+        code = f"{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}-{rng.randint(1000, 9999)}"
+        if code not in codes:
+            codes.append(code)
+
+    contents = {path: open(path, encoding="utf-8").read().split("\n") for path in paths}
+    for code in codes:
+        lines = contents[rng.choice(paths)]
+        index = rng.randrange(1, len(lines))
+        lines[index] += f"{rng.choice(offline_env.WORDS)}的编号是{code}。"
+    for path, lines in contents.items():
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+    return codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="混合检索基准测试")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--codes", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="查询向量化的模拟延迟")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(temp_dir, embed_latency_ms=args.embed_latency_ms)
+
+        from schemas.retrieval_mode import RetrievalMode
+        from utils.document_embedding import DocumentEmbedding
+        from utils.document_query import DocumentQueryEngine
+        from utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+        rng = random.Random(42)
+        paths = offline_env.generate_corpus(temp_dir, args.files, args.chapters)
+        codes = _insert_codes(paths, args.codes, rng)
+        name = offline_env.CLASSIFICATIONS[0]
+        for path in paths:
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        query_sets = [
+            ("keyword", [(code, code) for code in codes]),
+            ("question", [(f"{code}是做什么用的？", code) for code in codes]),
+        ]
+        modes = [RetrievalMode.VECTOR, RetrievalMode.LEXICAL, RetrievalMode.HYBRID, RetrievalMode.AUTO]
+        print(f"{'queries':<10}{'mode':<10}{'hit@k':>8}{'p50(ms)':>10}{'p99(ms)':>10}{'embed_calls':>13}")
+        for label, queries in query_sets:
+            for mode in modes:
+                # 每种检索方式都从空的查询向量缓存开始
+                EmbeddingCache.close()
+                EmbeddingCache.configure(db_path=f"{temp_dir}/embedding_cache_{label}_{mode}.db")
+                QueryEmbeddingCache.configure()
+                before = EmbeddingCache.stats()["misses"]
+
+                hits = 0
+                latencies = []
+                for query_text, code in queries:
+                    start = time.perf_counter()
+                    result = DocumentQueryEngine.simple_retriever(query_text, top_k=args.top_k, mode=mode)
+                    latencies.append(time.perf_counter() - start)
+                    hits += code in result
+                summary = offline_env.latency_summary(latencies)
+                print(f"{label:<10}{mode:<10}{hits / len(queries):>8.2f}{summary['p50']:>10.1f}"
+                      f"{summary['p99']:>10.1f}{EmbeddingCache.stats()['misses'] - before:>13}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
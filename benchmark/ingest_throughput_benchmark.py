@@ -0,0 +1,80 @@
+"""
+端到端入库吞吐量基准测试
+
+离线环境下生成合成文档，按入库任务的方式并发执行 解析 → 向量化 → 写入，
+统计 docs/sec、chunks/sec 以及各阶段的累计耗时。向量化延迟用 --embed-latency-ms 模拟。
+
+用法：python -m benchmark.ingest_throughput_benchmark [--files 16] [--chapters 20] [--workers 1 2 4]
+      [--embed-latency-ms 50] [--parse-workers 0]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import offline_env
+
+
+def _ingest(paths: list, classification_id: int, classification_name: str, workers: int) -> tuple:
+    """返回 (耗时秒, 文本块总数, 各阶段累计耗时)"""
+    from utils.document_embedding import DocumentEmbedding
+
+    stages = defaultdict(float)
+    lock = threading.Lock()
+
+    def record(stats: dict):
+        with lock:
+            for key, value in stats.items():
+                stages[key] += value
+
+    def run(path: str):
+        DocumentEmbedding.vectorize_document(classification_id, classification_name, path, stage_callback=record)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(run, paths))
+    return time.perf_counter() - start, int(stages["chunk_count"]), stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端入库吞吐量基准测试")
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="同时处理的文档数量")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="每批向量化请求的模拟延迟")
+    parser.add_argument("--parse-workers", type=int, default=0, help="文档解析进程数，0为在当前进程中解析")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(
+            temp_dir, embed_latency_ms=args.embed_latency_ms, parse_workers=args.parse_workers
+        )
+        classification_name = offline_env.CLASSIFICATIONS[0]
+
+        print(f"{'workers':<10}{'seconds':>10}{'docs/s':>10}{'chunks/s':>12}"
+              f"{'parse(s)':>10}{'embed(s)':>10}{'write(s)':>10}")
+        for workers in sorted(set(args.workers)):
+            # 每轮使用新的文档，避免命中上一轮的向量缓存和增量更新
+            corpus_dir = os.path.join(temp_dir, f"corpus_{workers}")
+            os.makedirs(corpus_dir)
+            paths = offline_env.generate_corpus(corpus_dir, args.files, args.chapters, seed=workers)
+            paths = [shutil.move(path, os.path.join(corpus_dir, f"w{workers}_{os.path.basename(path)}"))
+                     for path in paths]
+
+            elapsed, chunks, stages = _ingest(paths, classification_ids[classification_name], classification_name,
+                                              workers)
+            print(f"{workers:<10}{elapsed:>10.2f}{len(paths) / elapsed:>10.2f}{chunks / elapsed:>12.0f}"
+                  f"{stages['parse_seconds']:>10.2f}{stages['embed_seconds']:>10.2f}{stages['write_seconds']:>10.2f}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
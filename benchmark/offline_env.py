@@ -0,0 +1,147 @@
+"""
+离线基准测试环境
+
+切换到本地的哈希向量模型和脚本化LLM，并把数据库、向量缓存和向量库都放到临时目录，
+基准测试不访问任何外部服务，也不会改动项目中的数据。
+
+Agent在导入时创建LLM，使用本模块的基准测试需要先调用setup，再导入Agent和工作流。
+"""
+
+import os
+import random
+import shutil
+import statistics
+from typing import List, Dict
+
+from utils.model_provider import ModelProvider
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHINESE_NUMBERS = "一二三四五六七八九十"
+WORDS = ["山门", "长老", "弟子", "剑气", "云海", "灵石", "秘境", "宗门", "丹药", "阵法", "少年", "师尊"]
+CLASSIFICATIONS = ["网络小说", "工作文档", "学习笔记"]
+
+
+def setup(temp_dir: str, embed_latency_ms: float = 0, first_token_ms: float = 0, token_ms: float = 0,
+          parse_workers: int = 0, answer_cache: bool = False, shard_by_classification: bool = False,
+          hnsw_profile: str = "default") -> Dict[str, int]:
+    """
+    初始化离线环境
+
+    参数:
+        temp_dir: 临时目录
+        embed_latency_ms: 每次向量化调用注入的延迟
+        first_token_ms: LLM首字延迟
+        token_ms: LLM每个token的延迟
+        parse_workers: 文档解析进程数
+        answer_cache: 是否启用/query的回答缓存，默认关闭以测量工作流本身的耗时
+        shard_by_classification: 是否按分类分片存放文本块
+        hnsw_profile: 新建文本块集合时的索引参数名
+
+    返回:
+        分类名到分类id的映射
+    """
+    ModelProvider.configure(
+        embed_provider="hashing",
+        llm_provider="scripted",
+        embed_latency_ms=embed_latency_ms,
+        first_token_ms=first_token_ms,
+        token_ms=token_ms,
+    )
+
+    from utils.answer_cache import AnswerCache
+    from utils.db_helper import DBHelper
+    from utils.document_embedding import DocumentEmbedding
+    from utils.document_query import DocumentQueryEngine
+    from utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+    from utils.vector_store_registry import VectorStoreRegistry
+
+    # 复制项目数据库得到表结构，清空其中的数据
+    db_path = os.path.join(temp_dir, "document.db")
+    shutil.copy(os.path.join(_PROJECT_DIR, "document.db"), db_path)
+    DBHelper.configure(db_path=db_path)
+    DBHelper.initialize()
+    with DBHelper.transaction() as conn:
+        for table in ("document_titles", "documents", "classification", "ingest_jobs", "chunks"):
+            DBHelper.delete(table, conn=conn)
+        classification_ids = {
+            name: DBHelper.insert("classification", {"name": name}, conn=conn) for name in CLASSIFICATIONS
+        }
+
+    EmbeddingCache.configure(db_path=os.path.join(temp_dir, "embedding_cache.db"))
+    QueryEmbeddingCache.configure()
+    AnswerCache.configure(enabled=answer_cache)
+
+    persist_dir = os.path.join(temp_dir, "chroma_db")
+    VectorStoreRegistry.configure(hnsw_profile=hnsw_profile)
+    DocumentEmbedding.initialize(persist_dir=persist_dir, parse_workers=parse_workers)
+    DocumentQueryEngine.initialize(persist_dir=persist_dir, shard_by_classification=shard_by_classification)
+    return classification_ids
+
+
+def teardown() -> None:
+    """关闭离线环境打开的连接和进程"""
+    from utils.async_db_helper import AsyncDBHelper
+    from utils.db_helper import DBHelper
+    from utils.document_embedding import DocumentEmbedding
+    from utils.embedding_cache import EmbeddingCache
+    from utils.vector_store_registry import VectorStoreRegistry
+
+    DocumentEmbedding.shutdown()
+    VectorStoreRegistry.close()
+    EmbeddingCache.close()
+    AsyncDBHelper.close()
+    DBHelper.close()
+
+
+def chapter_number(n: int) -> str:
+    """1~99 转中文数字"""
+    tens, ones = divmod(n, 10)
+    result = ""
+    if tens:
+        result += ("" if tens == 1 else _CHINESE_NUMBERS[tens - 1]) + "十"
+    if ones:
+        result += _CHINESE_NUMBERS[ones - 1]
+    return result
+
+
+def synthetic_paragraph(rng: random.Random, words: int = 40) -> str:
+    """生成一段合成文本"""
+    return "".join(rng.choice(WORDS) for _ in range(words)) + "。"
+
+
+def generate_corpus(target_dir: str, files: int, chapters: int, paragraphs: int = 30, seed: int = 42) -> List[str]:
+    """
+    生成合成的小说体文本文件
+
+    参数:
+        target_dir: 存放目录
+        files: 文件数量
+        chapters: 每个文件的章节数
+        paragraphs: 每个章节的段落数
+
+    返回:
+        文件路径列表
+    """
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        lines = []
+        for c in range(1, chapters + 1):
+            lines.append(f"第{chapter_number(c)}章 {rng.choice(WORDS)}{rng.choice(WORDS)}")
+            for _ in range(paragraphs):
+                lines.append(synthetic_paragraph(rng))
+        path = os.path.join(target_dir, f"novel_{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """延迟统计（毫秒）"""
+    values = sorted(x * 1000 for x in seconds)
+    if len(values) < 2:
+        return {"p50": values[0], "p99": values[0], "mean": values[0]} if values else {}
+    percentiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": percentiles[49], "p99": percentiles[98], "mean": statistics.fmean(values)}
@@ -0,0 +1,84 @@
+"""
+查询向量进程内缓存基准测试
+
+离线环境下按Zipf分布抽取热门问题（同一问题的空白和全半角写法随机变化），
+对比只使用持久化缓存和同时使用进程内LRU缓存时，simple_retriever 的 p50/p99 延迟与命中率。
+--embed-latency-ms 模拟向量化接口的往返耗时。
+
+用法：python -m benchmark.query_embedding_cache_benchmark [--queries 2000] [--distinct 200]
+      [--embed-latency-ms 50] [--max-bytes 1048576]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+
+def _variant(rng: random.Random, question: str) -> str:
+    """同一问题的不同写法：首尾空白、全角问号"""
+    if rng.random() < 0.5:
+        question = f"  {question} "
+    if rng.random() < 0.5:
+        question = question.replace("?", "？")
+    return question
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询向量进程内缓存基准测试")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200, help="不同问题的数量")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="查询向量化的模拟延迟")
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024, help="进程内缓存的内存上限")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(temp_dir, embed_latency_ms=args.embed_latency_ms)
+
+        from utils.document_embedding import DocumentEmbedding
+        from utils.document_query import DocumentQueryEngine
+        from utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+        name = offline_env.CLASSIFICATIONS[0]
+        for path in offline_env.generate_corpus(temp_dir, args.files, 10):
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        rng = random.Random(42)
+        distinct = [offline_env.synthetic_paragraph(rng, 4) + "?" for _ in range(args.distinct)]
+        weights = [1 / (i + 1) for i in range(args.distinct)]
+        questions = [_variant(rng, q) for q in rng.choices(distinct, weights=weights, k=args.queries)]
+
+        print(f"{'case':<24}{'p50(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}{'hit_rate':>10}{'embed_calls':>13}")
+        for label, memory_cache in (("sqlite cache only", False), ("memory LRU + sqlite", True)):
+            # 每种情形都从空缓存开始
+            EmbeddingCache.close()
+            EmbeddingCache.configure(db_path=f"{temp_dir}/embedding_cache_{label[:6]}.db")
+            QueryEmbeddingCache.configure(max_bytes=args.max_bytes)
+            DocumentQueryEngine.initialize(persist_dir=f"{temp_dir}/chroma_db")
+            DocumentQueryEngine._query_embed_model._memory_cache = memory_cache
+            before = EmbeddingCache.stats()["misses"]
+
+            latencies = []
+            for question in questions:
+                start = time.perf_counter()
+                DocumentQueryEngine.simple_retriever(question)
+                latencies.append(time.perf_counter() - start)
+            summary = offline_env.latency_summary(latencies)
+            embed_calls = EmbeddingCache.stats()["misses"] - before
+            # 命中率按未调用向量化接口的查询比例计算，两种情形可比
+            hit_rate = 1 - embed_calls / len(questions)
+            print(f"{label:<24}{summary['p50']:>10.2f}{summary['p99']:>10.2f}{summary['mean']:>10.2f}"
+                  f"{hit_rate:>10.2f}{embed_calls:>13}")
+        print(f"memory cache: {QueryEmbeddingCache.stats()}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
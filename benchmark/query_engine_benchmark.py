@@ -0,0 +1,150 @@
+"""
+查询引擎复用基准测试
+
+在本地启动一个兼容OpenAI接口的模拟LLM服务（固定延迟），离线环境下对比：
+- 旧实现：每次查询新建DeepSeek客户端和查询引擎
+- 当前实现：DocumentQueryEngine.simple_query 复用查询引擎和共用的LLM连接池
+统计 p50/p99 延迟以及模拟服务收到的TCP连接数。本地连接没有TLS握手，
+新连接的建立开销用 --handshake-ms 模拟。
+
+用法：python -m benchmark.query_engine_benchmark [--queries 100] [--llm-latency-ms 20] [--handshake-ms 50]
+      [--filtered]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark import offline_env
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    """模拟 /chat/completions 接口，保持长连接"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    handshake = 0.0
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _StubLLMHandler._lock:
+            _StubLLMHandler.connections += 1
+        time.sleep(self.handshake)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "deepseek-chat",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "这是本地模拟服务的回答。"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _legacy_simple_query(query_text: str, filters, top_k: int = 5) -> str:
+    """旧实现：每次查询新建LLM客户端和查询引擎"""
+    from llama_index.llms.deepseek import DeepSeek
+
+    from utils.document_query import DocumentQueryEngine
+
+    _llm = DeepSeek("deepseek-chat", api_base=DocumentQueryEngine._llm.api_base, temperature=0.1)
+    query_engine = DocumentQueryEngine._index.as_query_engine(
+        llm=_llm,
+        similarity_top_k=top_k,
+        filters=DocumentQueryEngine._assembly_metadata_filters(filters)
+    )
+    return query_engine.query(query_text).response
+
+
+def _measure(func, questions: list, filters) -> tuple:
+    """返回 (延迟统计, 新建的TCP连接数)"""
+    connections = _StubLLMHandler.connections
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        func(question, filters)
+        latencies.append(time.perf_counter() - start)
+    return offline_env.latency_summary(latencies), _StubLLMHandler.connections - connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询引擎复用基准测试")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--llm-latency-ms", type=float, default=20, help="模拟LLM服务的响应延迟")
+    parser.add_argument("--handshake-ms", type=float, default=50, help="模拟建立新连接（TCP+TLS握手）的耗时")
+    parser.add_argument("--filtered", action="store_true", help="每次查询都带分类过滤")
+    args = parser.parse_args()
+
+    _StubLLMHandler.latency = args.llm_latency_ms / 1000
+    _StubLLMHandler.handshake = args.handshake_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(temp_dir)
+        # 检索使用离线向量模型，LLM使用真实的DeepSeek客户端访问本地模拟服务
+        from utils.model_provider import ModelProvider
+
+        ModelProvider.configure(llm_provider="deepseek", llm_api_base=f"http://127.0.0.1:{server.server_port}")
+        os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+        from schemas.agent_schemas import DocumentMetadataFilters
+        from utils.document_embedding import DocumentEmbedding
+        from utils.document_query import DocumentQueryEngine
+
+        name = offline_env.CLASSIFICATIONS[0]
+        for path in offline_env.generate_corpus(temp_dir, args.files, 10):
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+        DocumentQueryEngine.initialize(persist_dir=f"{temp_dir}/chroma_db")
+
+        rng = random.Random(42)
+        questions = [offline_env.synthetic_paragraph(rng, 4) for _ in range(args.queries)]
+        # 先缓存全部查询向量，两种情形的检索开销相同
+        for question in questions:
+            DocumentQueryEngine._query_embed_model.get_query_embedding(question)
+        filters = DocumentMetadataFilters(classification=[name]) if args.filtered else None
+
+        cases = [
+            ("per-call engine (legacy)", _legacy_simple_query),
+            ("engine registry", lambda q, f: DocumentQueryEngine.simple_query(q, f)),
+        ]
+        print(f"{'case':<28}{'p50(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}{'connections':>13}")
+        for label, func in cases:
+            # 预热，排除首次调用的初始化开销
+            func(questions[0], filters)
+            summary, connections = _measure(func, questions, filters)
+            print(f"{label:<28}{summary['p50']:>10.1f}{summary['p99']:>10.1f}{summary['mean']:>10.1f}"
+                  f"{connections:>13}")
+    finally:
+        server.shutdown()
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+/query 各工作流延迟基准测试
+
+离线环境下入库一批合成文档，依次让流程选择Agent固定选中每个工作流，
+以给定并发调用 /query 的处理函数，统计每个工作流的 p50/p99 延迟和吞吐量。
+LLM延迟用 --first-token-ms 和 --token-ms 模拟，设为0即只测量本项目自身的开销。
+
+用法：python -m benchmark.query_latency_benchmark [--requests 50] [--concurrency 1 8]
+      [--first-token-ms 300] [--token-ms 20] [--embed-latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+_WORKFLOWS = ["simple_query", "metadata_query", "general_query"]
+_QUESTIONS = ["{0}和{1}之间发生了什么？", "哪些文档提到了{0}？", "{0}在{1}中做了什么？", "总结一下关于{0}的内容"]
+
+
+async def _run_workflow(user_query, questions: list, concurrency: int) -> tuple:
+    """返回 (各请求耗时, 总耗时, 失败数)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(question: str):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await user_query(question)
+            latencies.append(time.perf_counter() - start)
+            if not response.success:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(x) for x in questions))
+    return latencies, time.perf_counter() - start, failures
+
+
+async def _main(args):
+    # Agent在导入时创建LLM，必须在setup之后导入
+    from agent.workflow_selection_agent import WorkflowSelectionAgent
+    from api.query import user_query
+
+    rng = random.Random(42)
+    questions = [
+        rng.choice(_QUESTIONS).format(rng.choice(offline_env.WORDS), rng.choice(offline_env.WORDS))
+        for _ in range(args.requests)
+    ]
+
+    print(f"{'workflow':<16}{'concurrency':>12}{'p50(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}{'req/s':>8}"
+          f"{'failed':>8}")
+    for workflow in _WORKFLOWS:
+        WorkflowSelectionAgent._llm.rules = [("工作流选择专家", workflow)]
+        for concurrency in args.concurrency:
+            # 预热，排除首次调用的初始化开销
+            await user_query(questions[0])
+            latencies, elapsed, failures = await _run_workflow(user_query, questions, concurrency)
+            summary = offline_env.latency_summary(latencies)
+            print(f"{workflow:<16}{concurrency:>12}{summary['p50']:>10.1f}{summary['p99']:>10.1f}"
+                  f"{summary['mean']:>10.1f}{len(latencies) / elapsed:>8.1f}{failures:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/query 各工作流延迟基准测试")
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--chapters", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="每个工作流每种并发下的请求数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--first-token-ms", type=float, default=300, help="LLM首字延迟")
+    parser.add_argument("--token-ms", type=float, default=20, help="LLM每个token的延迟")
+    parser.add_argument("--embed-latency-ms", type=float, default=50, help="查询向量化的模拟延迟")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(
+            temp_dir,
+            embed_latency_ms=args.embed_latency_ms,
+            first_token_ms=args.first_token_ms,
+            token_ms=args.token_ms,
+        )
+
+        from utils.document_embedding import DocumentEmbedding
+
+        for i, path in enumerate(offline_env.generate_corpus(temp_dir, args.files, args.chapters)):
+            name = offline_env.CLASSIFICATIONS[i % len(offline_env.CLASSIFICATIONS)]
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        asyncio.run(_main(args))
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
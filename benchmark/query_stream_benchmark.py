@@ -0,0 +1,97 @@
+"""
+/query 流式输出基准测试
+
+离线环境下依次固定选中每个工作流，对比 /query（等待完整回答）和 /query/stream（SSE）的
+首个事件、首个token和完整回答的 p50 延迟。LLM延迟用 --first-token-ms 和 --token-ms 模拟。
+
+用法：python -m benchmark.query_stream_benchmark [--requests 20] [--first-token-ms 300] [--token-ms 20]
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+_WORKFLOWS = ["simple_query", "metadata_query", "general_query"]
+
+
+async def _stream_once(query_events, question: str) -> dict:
+    """返回各阶段的耗时（秒）及收到的事件数"""
+    start = time.perf_counter()
+    timings = {"events": {}}
+    async for message in query_events(question, None):
+        event = message.split("\n", 1)[0].removeprefix("event: ")
+        elapsed = time.perf_counter() - start
+        timings.setdefault("first_event", elapsed)
+        if event == "token":
+            timings.setdefault("first_token", elapsed)
+        timings["events"][event] = timings["events"].get(event, 0) + 1
+        assert event != "error", message
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+async def _main(args):
+    # Agent在导入时创建LLM，必须在setup之后导入
+    from agent.workflow_selection_agent import WorkflowSelectionAgent
+    from api.query import user_query, _query_events
+
+    rng = random.Random(42)
+    print(f"{'workflow':<16}{'blocking total':>16}{'first event':>14}{'first token':>14}{'stream total':>14}"
+          f"  events")
+    for workflow in _WORKFLOWS:
+        WorkflowSelectionAgent._llm.rules = [("工作流选择专家", workflow)]
+        blocking, first_event, first_token, total = [], [], [], []
+        events = {}
+        for _ in range(args.requests):
+            question = offline_env.synthetic_paragraph(rng, 6)
+            start = time.perf_counter()
+            await user_query(question)
+            blocking.append(time.perf_counter() - start)
+
+            timings = await _stream_once(_query_events, offline_env.synthetic_paragraph(rng, 6))
+            first_event.append(timings["first_event"])
+            first_token.append(timings.get("first_token", timings["total"]))
+            total.append(timings["total"])
+            events = timings["events"]
+        print(f"{workflow:<16}{offline_env.latency_summary(blocking)['p50']:>16.1f}"
+              f"{offline_env.latency_summary(first_event)['p50']:>14.1f}"
+              f"{offline_env.latency_summary(first_token)['p50']:>14.1f}"
+              f"{offline_env.latency_summary(total)['p50']:>14.1f}  {events}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/query 流式输出基准测试")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=20, help="每个工作流的请求数")
+    parser.add_argument("--first-token-ms", type=float, default=300, help="LLM首字延迟")
+    parser.add_argument("--token-ms", type=float, default=20, help="LLM每个token的延迟")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        classification_ids = offline_env.setup(
+            temp_dir,
+            first_token_ms=args.first_token_ms,
+            token_ms=args.token_ms,
+        )
+
+        from utils.document_embedding import DocumentEmbedding
+
+        for i, path in enumerate(offline_env.generate_corpus(temp_dir, args.files, args.chapters)):
+            name = offline_env.CLASSIFICATIONS[i % len(offline_env.CLASSIFICATIONS)]
+            DocumentEmbedding.vectorize_document(classification_ids[name], name, path)
+
+        asyncio.run(_main(args))
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
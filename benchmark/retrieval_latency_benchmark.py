@@ -0,0 +1,94 @@
+"""
+检索延迟与语料规模基准测试
+
+离线环境下为每种规模生成合成文本块（带分类和章节元数据）写入独立的向量集合，
+统计 simple_retriever 和 query_metadatas 在不同语料规模下、有无元数据过滤时的 p50/p99 延迟。
+
+用法：python -m benchmark.retrieval_latency_benchmark [--sizes 1000 10000 50000] [--queries 100]
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from benchmark import offline_env
+
+_BATCH_SIZE = 1000
+
+
+def _build_collection(collection_name: str, persist_dir: str, size: int):
+    """生成size个文本块并写入新的向量集合"""
+    from llama_index.core.schema import TextNode
+
+    from utils.chapter_extractor import chapter_titles_to_metadata
+    from utils.document_embedding import DocumentEmbedding
+
+    DocumentEmbedding.initialize(collection_name=collection_name, persist_dir=persist_dir, parse_workers=0)
+    rng = random.Random(size)
+    for start in range(0, size, _BATCH_SIZE):
+        nodes = []
+        for i in range(start, min(start + _BATCH_SIZE, size)):
+            metadata = {
+                "file_name": f"novel_{i // 200}.txt",
+                "classification": offline_env.CLASSIFICATIONS[i % len(offline_env.CLASSIFICATIONS)],
+                **chapter_titles_to_metadata([f"第{offline_env.chapter_number(i % 99 + 1)}章"]),
+            }
+            nodes.append(TextNode(text=offline_env.synthetic_paragraph(rng, 120), metadata=metadata))
+        DocumentEmbedding._vector_store.add(DocumentEmbedding.embed_nodes(nodes))
+
+
+def _measure(func, questions: list) -> dict:
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        func(question)
+        latencies.append(time.perf_counter() - start)
+    return offline_env.latency_summary(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检索延迟与语料规模基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="文本块数量")
+    parser.add_argument("--queries", type=int, default=100, help="每种情形的查询次数")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        offline_env.setup(temp_dir)
+
+        from schemas.agent_schemas import DocumentMetadataFilters
+        from utils.document_query import DocumentQueryEngine
+
+        persist_dir = f"{temp_dir}/chroma_db"
+        rng = random.Random(42)
+        # 每次查询的文本都不同，避免命中查询向量缓存
+        questions = [offline_env.synthetic_paragraph(rng, 6) for _ in range(args.queries)]
+        filters = DocumentMetadataFilters(classification=[offline_env.CLASSIFICATIONS[0]])
+
+        print(f"{'chunks':<10}{'case':<28}{'p50(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}")
+        for size in args.sizes:
+            start = time.perf_counter()
+            collection_name = f"benchmark_{size}"
+            _build_collection(collection_name, persist_dir, size)
+            DocumentQueryEngine.initialize(collection_name=collection_name, persist_dir=persist_dir)
+            print(f"{size:<10}{'build(s)':<28}{time.perf_counter() - start:>10.1f}")
+
+            cases = [
+                ("simple_retriever", lambda q: DocumentQueryEngine.simple_retriever(q, top_k=args.top_k)),
+                ("simple_retriever+filter",
+                 lambda q: DocumentQueryEngine.simple_retriever(q, filters, top_k=args.top_k)),
+                ("query_metadatas(top_k=100)", lambda q: DocumentQueryEngine.query_metadatas(q, top_k=100)),
+            ]
+            for name, func in cases:
+                summary = _measure(func, [f"{question}{name}{size}" for question in questions])
+                print(f"{size:<10}{name:<28}{summary['p50']:>10.1f}{summary['p99']:>10.1f}{summary['mean']:>10.1f}")
+    finally:
+        offline_env.teardown()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+流式读取内存占用测试
+
+生成不同大小的JSON数组、HTML和xlsx文件，用 tracemalloc 统计读取过程中的 Python 内存峰值，
+对比一次性读取整个文件（json.load / 整体解析）与 utils.stream_readers 的流式读取。
+
+用法：python -m benchmark.stream_reader_benchmark [--sizes 8 32 128]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+
+from utils.stream_readers import iter_json_text, iter_html_text, iter_xlsx_text, _json_to_text
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def _write_json(path: str, size: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        i = 0
+        while f.tell() < size:
+            f.write(("," if i else "") + json.dumps({"id": i, "标题": f"记录{i}", "内容": "文本" * 50},
+                                                    ensure_ascii=False))
+            i += 1
+        f.write("]")
+
+
+def _write_html(path: str, size: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body>")
+        i = 0
+        while f.tell() < size:
+            f.write(f"<h2>第{i}节</h2><p>{'段落内容' * 50}</p>")
+            i += 1
+        f.write("</body></html>")
+
+
+def _write_xlsx(path: str, size: int):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("xl/workbook.xml",
+                   f'<workbook {_NS} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                   f'<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>')
+        with z.open("xl/worksheets/sheet1.xml", "w") as f:
+            f.write(f"<worksheet {_NS}><sheetData>".encode())
+            written, i = 0, 0
+            while written < size:
+                row = (f'<row r="{i + 1}"><c r="A{i + 1}" t="inlineStr"><is><t>名称{i}</t></is></c>'
+                       f'<c r="B{i + 1}"><v>{i}</v></c>'
+                       f'<c r="C{i + 1}" t="inlineStr"><is><t>{"说明" * 40}</t></is></c></row>').encode()
+                f.write(row)
+                written += len(row)
+                i += 1
+            f.write(b"</sheetData></worksheet>")
+
+
+def _load_json(path: Path):
+    """一次性读取：整个数组载入内存后展开"""
+    with open(path, encoding="utf-8") as f:
+        return ["\n".join(_json_to_text(x)) for x in json.load(f)]
+
+
+def _load_html(path: Path):
+    """一次性读取：整个文件读入后解析"""
+    parser = HTMLParser()
+    parser.feed(Path(path).read_text(encoding="utf-8"))
+    parser.close()
+
+
+def _load_xlsx(path: Path):
+    """一次性读取：解压后整体解析工作表"""
+    from xml.etree.ElementTree import fromstring
+    with zipfile.ZipFile(path) as z:
+        return fromstring(z.read("xl/worksheets/sheet1.xml"))
+
+
+def _measure(func) -> tuple:
+    """返回内存峰值（MB）和耗时（秒）"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式读取内存占用测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128], help="文件大小（MB，xlsx为解压后大小）")
+    args = parser.parse_args()
+
+    cases = [
+        (".json", _write_json, _load_json, iter_json_text),
+        (".html", _write_html, _load_html, iter_html_text),
+        (".xlsx", _write_xlsx, _load_xlsx, iter_xlsx_text),
+    ]
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'format':<8}{'size(MB)':<10}{'load peak(MB)':>15}{'stream peak(MB)':>17}"
+              f"{'load(s)':>10}{'stream(s)':>11}")
+        for ext, write, load, stream in cases:
+            for size in args.sizes:
+                path = Path(temp_dir) / f"source_{size}{ext}"
+                write(str(path), size * 1024 * 1024)
+
+                load_peak, load_seconds = _measure(lambda: load(path))
+                stream_peak, stream_seconds = _measure(lambda: sum(len(x) for x in stream(path)))
+                print(f"{ext:<8}{size:<10}{load_peak:>15.1f}{stream_peak:>17.1f}"
+                      f"{load_seconds:>10.2f}{stream_seconds:>11.2f}")
+                os.remove(path)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+上传落盘内存占用测试
+
+用 tracemalloc 统计不同大小文件落盘时的 Python 内存峰值，
+对比一次性读取（旧实现）与 UploadFileHelper 分块写入。
+
+用法：python -m benchmark.upload_memory_benchmark [--sizes 8 32 128]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from fastapi import UploadFile
+
+from utils.upload_file_helper import UploadFileHelper
+
+
+async def _read_all(file: UploadFile, target_path: str):
+    """旧实现：整个文件读入内存后写入"""
+    with open(target_path, "wb") as f:
+        f.write(await file.read())
+
+
+async def _measure(save, source_path: str, target_path: str) -> int:
+    """返回落盘过程中的内存峰值（字节）"""
+    with open(source_path, "rb") as source:
+        file = UploadFile(file=source, filename=os.path.basename(source_path), size=os.path.getsize(source_path))
+        tracemalloc.start()
+        await save(file, target_path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="上传落盘内存占用测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 32, 128], help="文件大小（MB）")
+    args = parser.parse_args()
+
+    UploadFileHelper.configure(max_size=max(args.sizes) * 1024 * 1024)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'size(MB)':<10}{'read_all peak(MB)':>20}{'streamed peak(MB)':>20}")
+        for size in args.sizes:
+            source_path = os.path.join(temp_dir, f"source_{size}.bin")
+            with open(source_path, "wb") as f:
+                for _ in range(size):
+                    f.write(os.urandom(1024 * 1024))
+
+            target_path = os.path.join(temp_dir, "target.bin")
+            read_all_peak = await _measure(_read_all, source_path, target_path)
+            streamed_peak = await _measure(UploadFileHelper.save, source_path, target_path)
+            print(f"{size:<10}{read_all_peak / 1024 / 1024:>20.1f}{streamed_peak / 1024 / 1024:>20.1f}")
+            os.remove(source_path)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
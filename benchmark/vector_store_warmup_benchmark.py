@@ -0,0 +1,73 @@
+"""
+向量库预热基准测试
+
+在临时目录中写入 --chunks 个随机向量，然后多轮关闭并重新打开向量库，对比：
+- cold：打开后直接查询
+- warm：打开后先调用 VectorStoreRegistry.warm 再查询
+统计打开、预热的耗时，首个查询的延迟和之后查询的 p50 延迟。
+
+用法：python -m benchmark.vector_store_warmup_benchmark [--chunks 50000] [--dim 1024] [--rounds 3]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark import offline_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量库预热基准测试")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    from utils.vector_store_registry import VectorStoreRegistry
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(42)
+        collection = VectorStoreRegistry.get_collection("documents", temp_dir)
+        batch_size = VectorStoreRegistry.open(temp_dir).get_max_batch_size()
+        for start in range(0, args.chunks, batch_size):
+            count = min(batch_size, args.chunks - start)
+            collection.add(
+                ids=[f"chunk_{i}" for i in range(start, start + count)],
+                embeddings=rng.standard_normal((count, args.dim), dtype=np.float32),
+                metadatas=[{"file_name": f"doc_{i % 1000}.txt"} for i in range(start, start + count)],
+            )
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+        print(f"{'case':<8}{'open(ms)':>10}{'warm(ms)':>10}{'first query(ms)':>17}{'p50(ms)':>10}")
+        for _ in range(args.rounds):
+            for warm in (False, True):
+                VectorStoreRegistry.close()
+
+                start = time.perf_counter()
+                collection = VectorStoreRegistry.get_collection("documents", temp_dir)
+                open_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                if warm:
+                    VectorStoreRegistry.warm()
+                warm_ms = (time.perf_counter() - start) * 1000
+
+                latencies = []
+                for query in queries:
+                    start = time.perf_counter()
+                    collection.query(query_embeddings=[query], n_results=5, include=[])
+                    latencies.append(time.perf_counter() - start)
+                print(f"{'warm' if warm else 'cold':<8}{open_ms:>10.1f}{warm_ms:>10.1f}{latencies[0] * 1000:>17.1f}"
+                      f"{offline_env.latency_summary(latencies[1:])['p50']:>10.2f}")
+    finally:
+        VectorStoreRegistry.close()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
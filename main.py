@@ -8,19 +8,32 @@ from api.classification import router as classification_router
 from api.documents import router as documents_router
 from api.query import router as query_router
 from schemas.response import ResponseCode, ResponseModel
+from utils.answer_cache import AnswerCache
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
 from utils.document_query import DocumentQueryEngine
 from utils.document_embedding import DocumentEmbedding
+from utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from utils.ingest_job_manager import IngestJobManager
 from utils.logger import logger
+from utils.model_provider import ModelProvider
+from utils.vector_store_registry import VectorStoreRegistry
 
 
 # 应用生命周期管理
 @asynccontextmanager
 async def lifespan(fast_api_app: FastAPI):
     # 启动时执行
+    DBHelper.initialize()
+    logger.info("数据库初始化完成。")
+    VectorStoreRegistry.open()
     DocumentEmbedding.initialize()
     logger.info("文档向量工具初始化完成。")
     DocumentQueryEngine.initialize()
     logger.info("文档查询引擎初始化完成。")
+    logger.info(f"向量库预热完成：{VectorStoreRegistry.warm()}")
+    IngestJobManager.initialize()
+    logger.info("文档入库任务初始化完成。")
 
     logger.info("应用已启动...")
 
@@ -30,7 +43,20 @@ async def lifespan(fast_api_app: FastAPI):
     logger.info("应用退出...")
 
     # 在这里可以清理资源
-    logger.info("")
+    IngestJobManager.shutdown()
+    logger.info("文档入库任务已停止。")
+    DocumentEmbedding.shutdown()
+    logger.info("文档解析进程已关闭。")
+    VectorStoreRegistry.close()
+    logger.info(f"向量缓存统计：{EmbeddingCache.stats()}")
+    logger.info(f"查询向量缓存统计：{QueryEmbeddingCache.stats()}")
+    logger.info(f"回答缓存统计：{AnswerCache.stats()}")
+    EmbeddingCache.close()
+    await ModelProvider.aclose()
+    logger.info("LLM连接池已关闭。")
+    AsyncDBHelper.close()
+    DBHelper.close()
+    logger.info("数据库连接池已关闭。")
 
 
 # 创建FastAPI应用
@@ -0,0 +1,20 @@
+from typing import Optional, Dict
+
+from pydantic import BaseModel, Field
+
+
+class BulkIngestProgress(BaseModel):
+    """
+    批量入库进度
+    """
+    task_id: str = Field(description="任务id")
+    directory: str = Field(description="入库目录")
+    status: str = Field(description="任务状态", default="running")
+    total: int = Field(description="待处理文件数", default=0)
+    succeeded: int = Field(description="入库成功文件数", default=0)
+    skipped: int = Field(description="已存在或无法归类而跳过的文件数", default=0)
+    failed: int = Field(description="入库失败文件数", default=0)
+    chunk_count: int = Field(description="已入库的文本块数量", default=0)
+    errors: Dict[str, str] = Field(description="失败文件及原因", default_factory=dict)
+    started_at: Optional[str] = Field(description="开始时间", default=None)
+    finished_at: Optional[str] = Field(description="结束时间", default=None)
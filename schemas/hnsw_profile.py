@@ -0,0 +1,59 @@
+from typing import Optional, Dict, Any, Literal
+
+from pydantic import BaseModel, Field
+
+
+class HnswProfile(BaseModel):
+    """
+    HNSW索引参数，只在创建集合时生效，修改已有集合的参数需要重建集合
+    """
+    space: Literal["l2", "cosine", "ip"] = Field(
+        description="距离函数，检索得分和相似度阈值按l2距离设定，改用其他距离时需相应调整", default="l2"
+    )
+    m: int = Field(description="每个节点的邻居数，越大召回率越高，占用内存和写入耗时也越多", default=16, ge=2)
+    construction_ef: int = Field(description="建索引时的候选数，越大图质量越好，写入越慢", default=100, ge=1)
+    search_ef: int = Field(description="查询时的候选数，越大召回率越高，查询越慢", default=100, ge=1)
+
+    def metadata(self) -> Dict[str, Any]:
+        """创建Chroma集合时的元数据"""
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.m,
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef,
+        }
+
+    @classmethod
+    def from_configuration(cls, configuration: Optional[Dict[str, Any]]) -> "HnswProfile":
+        """从Chroma集合的configuration_json读取当前参数"""
+        hnsw = (configuration or {}).get("hnsw") or {}
+        default = cls()
+        return cls(
+            space=hnsw.get("space") or default.space,
+            m=hnsw.get("max_neighbors") or default.m,
+            construction_ef=hnsw.get("ef_construction") or default.construction_ef,
+            search_ef=hnsw.get("ef_search") or default.search_ef,
+        )
+
+
+# 预设的索引参数，default与Chroma的默认值相同，其余按benchmark/hnsw_profile_benchmark.py的结果选取
+HNSW_PROFILES: Dict[str, HnswProfile] = {
+    "fast": HnswProfile(m=12, construction_ef=100, search_ef=32),
+    "default": HnswProfile(),
+    "balanced": HnswProfile(m=24, construction_ef=200, search_ef=160),
+    "recall": HnswProfile(m=32, construction_ef=400, search_ef=256),
+}
+
+
+class IndexRebuildProgress(BaseModel):
+    """
+    向量索引重建进度
+    """
+    task_id: str = Field(description="任务id")
+    collections: Dict[str, int] = Field(description="重建的集合及其文本块数量", default_factory=dict)
+    profile: Optional[HnswProfile] = Field(description="新集合的索引参数，为空时沿用原集合的参数", default=None)
+    status: str = Field(description="任务状态", default="running")
+    copied: int = Field(description="已复制的文本块数量", default=0)
+    error: Optional[str] = Field(description="失败原因", default=None)
+    started_at: Optional[str] = Field(description="开始时间", default=None)
+    finished_at: Optional[str] = Field(description="结束时间", default=None)
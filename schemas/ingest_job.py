@@ -0,0 +1,7 @@
+class IngestJobStatus:
+    PENDING = "pending"  # 等待处理
+    RUNNING = "running"  # 处理中
+    SUCCEEDED = "succeeded"  # 处理成功
+    FAILED = "failed"  # 处理失败
+
+    ACTIVE = (PENDING, RUNNING)
@@ -8,6 +8,7 @@ class ResponseCode:
     Unauthorized = 401  # 未授权
     Forbidden = 403  # 无权限
     NotFound = 404  # 未找到
+    TooManyRequests = 429  # 请求过多
     InternalServerError = 500  # 服务器内部错误
 
 T = TypeVar("T")
@@ -0,0 +1,7 @@
+class RetrievalMode:
+    VECTOR = "vector"  # 只使用向量检索
+    LEXICAL = "lexical"  # 只使用关键词检索，不调用向量化接口
+    HYBRID = "hybrid"  # 向量检索和关键词检索融合排序
+    AUTO = "auto"  # 关键词式查询使用关键词检索（要求包含全部查询词项，无结果时退回混合检索），其他查询使用混合检索
+
+    ALL = (VECTOR, LEXICAL, HYBRID, AUTO)
@@ -1,3 +1,5 @@
+from functools import partial
+
 from workflow.document_metadata_retrieval_workflow import document_metadata_retrieval_workflow
 from workflow.general_query_workflow import general_query_workflow
 from workflow.simple_query_workflow import simple_query_workflow
@@ -5,5 +7,7 @@ from workflow.simple_query_workflow import simple_query_workflow
 workflow_mapping = {
     "simple_query": simple_query_workflow.run,
     "metadata_query": document_metadata_retrieval_workflow.run,
+    # 只按文件属性查文档，由文档级索引回答
+    "document_query": partial(document_metadata_retrieval_workflow.run, document_level=True),
     "general_query": general_query_workflow.run,
 }
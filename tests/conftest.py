@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# 以项目根目录为模块搜索路径，与 python -m uvicorn main:app 的运行方式一致
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.async_db_helper import AsyncDBHelper  # noqa: E402
+from utils.db_helper import DBHelper  # noqa: E402
+
+# 随项目提供的document.db中的表，其余数据库对象由DBHelper.initialize创建
+_BASE_TABLES = """
+    CREATE TABLE classification (id integer not null primary key autoincrement, name TEXT);
+    CREATE TABLE documents (
+        id integer not null primary key autoincrement,
+        classification_id integer not null,
+        name TEXT not null,
+        upload_time TEXT default (datetime('now', 'localtime')) not null
+    );
+    CREATE TABLE document_titles (
+        id integer not null primary key autoincrement,
+        document_id integer not null,
+        title text not null
+    );
+"""
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """使用临时数据库，结束后恢复原配置"""
+    db_path, pool_size = DBHelper._db_path, DBHelper._pool_size
+    DBHelper.configure(db_path=str(tmp_path / "test.db"), pool_size=4)
+    with DBHelper.transaction() as conn:
+        conn.executescript(_BASE_TABLES)
+    DBHelper.initialize()
+    yield DBHelper
+    AsyncDBHelper.close()
+    DBHelper.configure(db_path=db_path, pool_size=pool_size)
+    DBHelper.close()
+
+
+@pytest.fixture
+def offline(tmp_path):
+    """离线环境：本地哈希向量模型、脚本化LLM，数据库和向量库位于临时目录"""
+    from benchmark import offline_env
+
+    classification_ids = offline_env.setup(str(tmp_path))
+    yield classification_ids
+    offline_env.teardown()
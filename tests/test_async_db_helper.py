@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
+
+_SLOW_SQL = """
+            WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < ?)
+            SELECT count(*) AS total FROM counter
+            """
+
+
+def test_results_match_db_helper(temp_db):
+    async def run():
+        first = await AsyncDBHelper.insert("classification", {"name": "合同"})
+        await AsyncDBHelper.insert_many("classification", [{"name": "制度"}, {"name": "报告"}])
+        assert await AsyncDBHelper.query_one("classification", "id=?", (first,)) == \
+               DBHelper.query_one("classification", "id=?", (first,))
+        assert await AsyncDBHelper.query_all("classification") == DBHelper.query_all("classification")
+
+        assert await AsyncDBHelper.update("classification", {"name": "合同2"}, "id=?", (first,)) == 1
+        assert DBHelper.query_one("classification", "id=?", (first,))["name"] == "合同2"
+        assert await AsyncDBHelper.delete("classification", "name=?", ("报告",)) == 1
+        assert [x["name"] for x in DBHelper.query_all("classification")] == ["合同2", "制度"]
+
+    asyncio.run(run())
+
+
+def test_transaction_rolls_back_on_error(temp_db):
+    def insert_then_fail(conn):
+        DBHelper.insert("classification", {"name": "合同"}, conn=conn)
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncDBHelper.transaction(insert_then_fail))
+
+    assert DBHelper.query_all("classification") == []
+
+
+def test_query_many_returns_every_selected_classification(temp_db):
+    ids = [DBHelper.insert("classification", {"name": name}) for name in ("合同", "制度", "报告")]
+    selected = [ids[0], ids[2]]
+
+    rows = asyncio.run(AsyncDBHelper.query_many(
+        "classification", f"id in ({','.join(['?'] * len(selected))})", tuple(selected)
+    ))
+
+    assert sorted(x["name"] for x in rows) == ["合同", "报告"]
+
+
+def test_slow_query_does_not_block_event_loop(temp_db):
+    rows = 3_000_000
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(heartbeat())
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        result = await AsyncDBHelper.query_by_sql(_SLOW_SQL, (rows,))
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        return result, elapsed, ticks
+
+    result, elapsed, ticks = asyncio.run(run())
+
+    assert result == [{"total": rows}]
+    # 查询期间心跳照常运行，同步调用时心跳会停顿到查询结束
+    assert ticks >= elapsed / 0.01 * 0.5
@@ -0,0 +1,54 @@
+import pytest
+
+from benchmark import offline_env
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    classification_ids = offline_env.setup(str(tmp_path), shard_by_classification=True)
+    yield classification_ids
+    offline_env.teardown()
+
+
+def _ingest(tmp_path, classification_ids, classification: str, name: str, text: str) -> None:
+    from utils.document_embedding import DocumentEmbedding
+
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    DocumentEmbedding.vectorize_document(classification_ids[classification], classification, path)
+
+
+def test_document_index_keeps_renamed_classification(tmp_path, sharded):
+    from utils.classification_shards import ClassificationShards
+    from utils.db_helper import DBHelper
+    from utils.document_index import DocumentIndex
+    from utils.document_query import DocumentQueryEngine
+
+    _ingest(tmp_path, sharded, "工作文档", "report.txt", "第一章 总结\n" + "季度报告阵法灵石。" * 50)
+    DocumentQueryEngine.update_metadata("工作文档", "周报")
+    DBHelper.update("classification", {"name": "周报"}, "id=?", (sharded["工作文档"],))
+
+    # 重建和单个文档刷新都从文本块重新聚合文档级元数据
+    DocumentIndex.rebuild(DocumentQueryEngine._chunk_collections())
+    assert DocumentIndex._collection.get(ids=["report.txt"])["metadatas"][0]["classification"] == "周报"
+    DocumentIndex.refresh(ClassificationShards.handle(sharded["工作文档"]).collection, "report.txt")
+    assert DocumentIndex._collection.get(ids=["report.txt"])["metadatas"][0]["classification"] == "周报"
+
+
+def test_lexical_search_filters_classification_in_index(tmp_path, sharded):
+    from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterOperator
+
+    from utils.document_query import DocumentQueryEngine
+
+    # 大分类中的文本块关键词密集，全局BM25排名都在小分类之前
+    for i in range(30):
+        _ingest(tmp_path, sharded, "网络小说", f"novel_{i}.txt", f"第一章 开端\n{'灵石' * 50}{i}")
+    _ingest(tmp_path, sharded, "学习笔记", "note.txt", "第一章 笔记\n" + "阵法山门云海。" * 40 + "灵石")
+
+    filters = MetadataFilters(filters=[
+        MetadataFilter(key="classification", value=["学习笔记"], operator=FilterOperator.IN)
+    ])
+    nodes = DocumentQueryEngine._get_lexical_retriever(2, filters).retrieve("灵石")
+
+    assert [x.node.metadata["file_name"] for x in nodes] == ["note.txt"]
+    assert nodes[0].node.metadata["classification"] == "学习笔记"
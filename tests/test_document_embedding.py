@@ -0,0 +1,43 @@
+import pytest
+
+from benchmark import offline_env
+
+
+def _write_document(tmp_path, suffix: str) -> str:
+    paragraphs = [f"第{offline_env.chapter_number(i)}章\n" + "山门弟子云海秘境。" * 60 for i in range(1, 6)]
+    path = tmp_path / f"novel{suffix}"
+    if suffix == ".html":
+        path.write_text("<html><body>" + "".join(f"<p>{x}</p>" for x in paragraphs) + "</body></html>",
+                        encoding="utf-8")
+    else:
+        path.write_text("\n".join(paragraphs), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("suffix", [".txt", ".html"])
+def test_rerun_after_crash_does_not_duplicate_chunks(tmp_path, offline, monkeypatch, suffix):
+    from utils.db_helper import DBHelper
+    from utils.document_embedding import DocumentEmbedding
+    from utils.lexical_index import LexicalIndex
+
+    classification_id = offline["网络小说"]
+    file_path = _write_document(tmp_path, suffix)
+    stats = {}
+
+    def crash(*args, **kwargs):
+        # 进程在向量写入之后、文档记录提交之前被终止，不会执行异常清理
+        raise SystemExit
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DocumentEmbedding, "_insert_document", crash)
+        with pytest.raises(SystemExit):
+            DocumentEmbedding.vectorize_document(classification_id, "网络小说", file_path)
+    assert DocumentEmbedding._collection.count() > 0
+    assert not DBHelper.query_all("documents")
+
+    # 任务恢复后重新执行
+    DocumentEmbedding.vectorize_document(classification_id, "网络小说", file_path, stage_callback=stats.update)
+
+    assert len(DBHelper.query_all("documents")) == 1
+    assert DocumentEmbedding._collection.count() == stats["chunk_count"]
+    assert LexicalIndex.count() == stats["chunk_count"]
@@ -0,0 +1,42 @@
+import asyncio
+
+
+def test_document_level_metadata_without_dates(offline, monkeypatch):
+    from agent.filters_generate_agent import FiltersGenerateAgent
+    from agent.metadata_summary_agent import MetadataSummaryAgent
+    from schemas.agent_response import FiltersGenerateAgentResponse
+    from schemas.workflow_mapping import workflow_mapping
+    from utils.document_query import DocumentQueryEngine
+    from utils.metadata_filters_handler import MetadataFiltersHandler
+
+    async def generate_filters(query_text):
+        return FiltersGenerateAgentResponse()
+
+    async def handle(filters):
+        return filters
+
+    async def query_documents(**kwargs):
+        # DocumentIndex写入文档级元数据时跳过值为空的键
+        return [
+            {"file_name": "a.txt", "classification": "网络小说", "chunk_count": 3},
+            {"file_name": "b.txt", "classification": "网络小说", "creation_date": "2025-01-01", "chunk_count": 1},
+        ]
+
+    summarized = []
+
+    async def summarize(metadata, query_text, ctx=None):
+        summarized.append(metadata)
+        return "ok"
+
+    monkeypatch.setattr(FiltersGenerateAgent, "run", generate_filters)
+    monkeypatch.setattr(MetadataFiltersHandler, "handle", handle)
+    monkeypatch.setattr(DocumentQueryEngine, "aquery_documents", query_documents)
+    monkeypatch.setattr(MetadataSummaryAgent, "run", summarize)
+
+    async def run():
+        return await workflow_mapping["document_query"](query_text="有哪些文档")
+
+    assert str(asyncio.run(run())) == "ok"
+    assert summarized[0]["file_name"] == {"a.txt", "b.txt"}
+    assert summarized[0]["creation_date"] == {"2025-01-01"}
+    assert summarized[0]["last_modified_date"] == set()
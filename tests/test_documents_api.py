@@ -0,0 +1,37 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(offline):
+    from api import documents
+
+    app = FastAPI()
+    app.include_router(documents.router)
+    return TestClient(app)
+
+
+def test_delete_unknown_document_returns_404(client):
+    response = client.delete("/document/delete", params={"document_id": 12345}).json()
+
+    assert response["status_code"] == 404
+
+
+def test_delete_document_removes_rows_and_chunks(tmp_path, client, offline):
+    from utils.db_helper import DBHelper
+    from utils.document_embedding import DocumentEmbedding
+    from utils.lexical_index import LexicalIndex
+
+    path = tmp_path / "novel.txt"
+    path.write_text("第一章 山门\n" + "山门弟子云海秘境。" * 100, encoding="utf-8")
+    document_id = DocumentEmbedding.vectorize_document(offline["网络小说"], "网络小说", path)
+    assert DBHelper.query_many("document_titles", "document_id=?", (document_id,))
+
+    response = client.delete("/document/delete", params={"document_id": document_id}).json()
+
+    assert response["success"]
+    assert DBHelper.query_one("documents", "id=?", (document_id,)) is None
+    assert DBHelper.query_many("document_titles", "document_id=?", (document_id,)) == []
+    assert DocumentEmbedding._collection.count() == 0
+    assert LexicalIndex.count() == 0
@@ -0,0 +1,79 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils.embedding_cache import EmbeddingCache, CachedEmbedding, QueryEmbeddingCache
+from utils.offline_models import HashingEmbedding
+
+
+@pytest.fixture
+def cache(tmp_path):
+    db_path, touched_at = EmbeddingCache._db_path, EmbeddingCache._touched_at
+    EmbeddingCache.configure(db_path=str(tmp_path / "embedding_cache.db"))
+    QueryEmbeddingCache.configure()
+    yield tmp_path / "embedding_cache.db"
+    EmbeddingCache.configure(db_path=db_path)
+    EmbeddingCache._touched_at = touched_at
+
+
+def _last_used(db_path) -> float:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT last_used FROM embedding_cache").fetchone()[0]
+
+
+def test_hits_update_last_used_in_batches(cache):
+    EmbeddingCache.put_many("ns", ["问题"], [[0.5, 0.25]])
+    stored = _last_used(cache)
+    EmbeddingCache._touched_at = time.time()
+
+    assert EmbeddingCache.get_many("ns", ["问题"]) == [[0.5, 0.25]]
+    # 命中时不单独提交写事务
+    assert _last_used(cache) == stored
+
+    EmbeddingCache.put_many("ns", ["另一个问题"], [[0.125, 0.0]])
+    assert _last_used(cache) > stored
+
+
+def test_close_flushes_pending_last_used(cache):
+    EmbeddingCache.put_many("ns", ["问题"], [[0.5]])
+    stored = _last_used(cache)
+    EmbeddingCache._touched_at = time.time()
+    EmbeddingCache.get_many("ns", ["问题"])
+
+    EmbeddingCache.close()
+
+    assert _last_used(cache) > stored
+
+
+def test_async_query_path_uses_cache_off_event_loop(cache, monkeypatch):
+    threads = []
+    get_many, put_many = EmbeddingCache.get_many.__func__, EmbeddingCache.put_many.__func__
+
+    def record_get(cls, *args):
+        threads.append(threading.current_thread())
+        return get_many(cls, *args)
+
+    def record_put(cls, *args):
+        threads.append(threading.current_thread())
+        return put_many(cls, *args)
+
+    monkeypatch.setattr(EmbeddingCache, "get_many", classmethod(record_get))
+    monkeypatch.setattr(EmbeddingCache, "put_many", classmethod(record_put))
+    model = CachedEmbedding(HashingEmbedding(dimension=16), memory_cache=True)
+
+    async def run():
+        loop_thread = threading.current_thread()
+        first = await model.aget_query_embedding("山门在哪里")
+        QueryEmbeddingCache.configure()
+        second = await model.aget_query_embedding("山门在哪里")
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(run())
+
+    assert first == pytest.approx(second)
+    # 未命中：查询和写入持久化缓存；清空进程内缓存后：命中持久化缓存
+    assert len(threads) == 3
+    assert loop_thread not in threads
@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import pytest
+
+from schemas.ingest_job import IngestJobStatus
+from utils.db_helper import DBHelper
+from utils.ingest_job_manager import IngestJobManager
+
+
+class _InlineExecutor:
+    """在当前线程中直接执行提交的任务"""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+@pytest.fixture
+def job_manager(temp_db, tmp_path, monkeypatch):
+    DBHelper.insert("classification", {"name": "合同"})
+    monkeypatch.setattr(IngestJobManager, "_upload_dir", str(tmp_path / "uploads"), raising=False)
+    monkeypatch.setattr(IngestJobManager, "_executor", _InlineExecutor())
+    os.makedirs(IngestJobManager._upload_dir)
+    return IngestJobManager
+
+
+def test_run_removes_only_job_dir(job_manager, monkeypatch):
+    from utils.document_embedding import DocumentEmbedding
+
+    monkeypatch.setattr(DocumentEmbedding, "vectorize_document", lambda *args, **kwargs: 1)
+    other_id, other_dir = job_manager.create_job_dir()
+    job_id, job_dir = job_manager.create_job_dir()
+    file_path = os.path.join(job_dir, "合同.txt")
+    with open(file_path, "w") as f:
+        f.write("content")
+
+    asyncio.run(job_manager.submit(job_id, 1, file_path))
+
+    job = DBHelper.query_one("ingest_jobs", "id=?", (job_id,))
+    assert job["status"] == IngestJobStatus.SUCCEEDED
+    assert job["job_dir"] == job_dir
+    assert not os.path.exists(job_dir)
+    assert os.path.isdir(other_dir)
+
+
+def test_submit_rejects_file_outside_job_dir(job_manager):
+    job_id, job_dir = job_manager.create_job_dir()
+    file_path = os.path.join(job_dir, "..", "x.txt")
+    with open(file_path, "w") as f:
+        f.write("content")
+
+    with pytest.raises(ValueError):
+        asyncio.run(job_manager.submit(job_id, 1, file_path))
+
+    assert DBHelper.query_one("ingest_jobs", "id=?", (job_id,)) is None
+    assert os.path.isdir(job_manager._upload_dir)
+
+
+def test_recover_fails_job_outside_job_dir(job_manager):
+    job_id, job_dir = job_manager.create_job_dir()
+    file_path = os.path.join(job_dir, "..", "x.txt")
+    with open(file_path, "w") as f:
+        f.write("content")
+    DBHelper.insert("ingest_jobs", {
+        "id": job_id, "classification_id": 1, "document_name": "x.txt",
+        "file_path": file_path, "status": IngestJobStatus.PENDING,
+    })
+
+    job_manager._recover()
+
+    assert DBHelper.query_one("ingest_jobs", "id=?", (job_id,))["status"] == IngestJobStatus.FAILED
+    assert os.path.exists(file_path)
+
+
+def test_initialize_adds_job_dir_column(temp_db):
+    # 旧版本创建的任务表没有job_dir列
+    with DBHelper.transaction() as conn:
+        conn.execute("DROP TABLE ingest_jobs")
+        conn.execute("CREATE TABLE ingest_jobs (id TEXT primary key, file_path TEXT)")
+
+    DBHelper.initialize()
+
+    assert "job_dir" in DBHelper.get_table_columns("ingest_jobs")
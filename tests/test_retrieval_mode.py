@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from schemas.retrieval_mode import RetrievalMode
+
+
+@pytest.mark.skipif("RETRIEVAL_MODE" in os.environ, reason="已通过环境变量指定检索方式")
+def test_default_mode_is_vector():
+    from utils.document_query import DocumentQueryEngine
+
+    assert DocumentQueryEngine._retrieval_mode == RetrievalMode.VECTOR
+
+
+@pytest.fixture
+def corpus(tmp_path, offline):
+    from utils.document_embedding import DocumentEmbedding
+
+    path = tmp_path / "novel.txt"
+    path.write_text("第一章 山门\n" + "山门弟子在云海中修炼剑气。" * 20, encoding="utf-8")
+    DocumentEmbedding.vectorize_document(offline["网络小说"], "网络小说", path)
+
+
+@pytest.fixture
+def hybrid_calls(monkeypatch):
+    from utils.hybrid_retriever import HybridRetriever
+
+    calls = []
+    retrieve = HybridRetriever._retrieve
+
+    def record(self, query_bundle):
+        calls.append(query_bundle.query_str)
+        return retrieve(self, query_bundle)
+
+    monkeypatch.setattr(HybridRetriever, "_retrieve", record)
+    return calls
+
+
+def test_auto_accepts_lexical_answer_only_when_all_terms_match(corpus, hybrid_calls):
+    from utils.document_query import DocumentQueryEngine
+
+    assert DocumentQueryEngine._get_retriever("山门弟子", 3, mode=RetrievalMode.AUTO).retrieve("山门弟子")
+    assert hybrid_calls == []
+
+    # 只有部分二元组（山门）命中，不作为关键词检索的结果，退回混合检索
+    nodes = DocumentQueryEngine._get_retriever("山门灵药", 3, mode=RetrievalMode.AUTO).retrieve("山门灵药")
+    assert nodes
+    assert hybrid_calls == ["山门灵药"]
+
+
+def test_resolve_mode():
+    from utils.document_query import DocumentQueryEngine
+
+    assert DocumentQueryEngine.resolve_mode("山门 弟子", RetrievalMode.AUTO) == RetrievalMode.LEXICAL
+    assert DocumentQueryEngine.resolve_mode("山门弟子是怎么修炼的？", RetrievalMode.AUTO) == RetrievalMode.HYBRID
+    assert DocumentQueryEngine.resolve_mode("山门 弟子", RetrievalMode.VECTOR) == RetrievalMode.VECTOR
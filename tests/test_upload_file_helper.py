@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+
+from utils.upload_file_helper import UploadFileHelper, UploadTooLargeError
+
+_CHUNK_SIZE = 64 * 1024
+
+
+@pytest.fixture
+def small_chunks():
+    """缩小分块大小，让小文件也覆盖多块和不足一块的情况"""
+    chunk_size, max_size = UploadFileHelper._chunk_size, UploadFileHelper._max_size
+    UploadFileHelper.configure(chunk_size=_CHUNK_SIZE)
+    yield
+    UploadFileHelper._chunk_size, UploadFileHelper._max_size = chunk_size, max_size
+
+
+def _upload(content: bytes, size_known: bool = True) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="doc.txt", size=len(content) if size_known else None)
+
+
+async def _save_read_all(file: UploadFile, target_path: str) -> None:
+    """分块保存之前的实现：一次读入整个文件再写入"""
+    with open(target_path, "wb") as f:
+        f.write(await file.read())
+
+
+@pytest.mark.parametrize("size", [0, 1, _CHUNK_SIZE - 1, _CHUNK_SIZE, _CHUNK_SIZE + 1, 3 * _CHUNK_SIZE + 7])
+def test_save_matches_read_all(tmp_path, small_chunks, size):
+    content = os.urandom(size)
+    streamed, read_all = tmp_path / "streamed", tmp_path / "read_all"
+
+    file_info = asyncio.run(UploadFileHelper.save(_upload(content), str(streamed)))
+    asyncio.run(_save_read_all(_upload(content), str(read_all)))
+
+    assert streamed.read_bytes() == read_all.read_bytes() == content
+    assert file_info == {"file_size": size, "content_hash": hashlib.sha256(content).hexdigest()}
+
+
+@pytest.mark.parametrize("size_known", [True, False])
+def test_save_rejects_oversized_upload(tmp_path, small_chunks, size_known):
+    UploadFileHelper.configure(max_size=2 * _CHUNK_SIZE)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(UploadFileHelper.save(_upload(os.urandom(2 * _CHUNK_SIZE + 1), size_known), str(tmp_path / "f")))
+
+    assert asyncio.run(UploadFileHelper.save(_upload(b"x" * 2 * _CHUNK_SIZE), str(tmp_path / "g"))) \
+        ["file_size"] == 2 * _CHUNK_SIZE
+
+
+@pytest.fixture
+def upload_client(tmp_path, monkeypatch, small_chunks):
+    """上传接口，跳过数据库校验，记录提交的入库任务"""
+    from api import documents
+    from utils.ingest_job_manager import IngestJobManager
+
+    async def no_document(*args):
+        return None
+
+    async def inactive(*args):
+        return False
+
+    submitted = []
+
+    async def submit(job_id, classification_id, file_path, file_info=None):
+        submitted.append((file_path, file_info))
+        return job_id
+
+    monkeypatch.setattr(documents.AsyncDBHelper, "query_one", no_document)
+    monkeypatch.setattr(IngestJobManager, "has_active_job", inactive)
+    monkeypatch.setattr(IngestJobManager, "is_full", inactive)
+    monkeypatch.setattr(IngestJobManager, "submit", submit)
+    monkeypatch.setattr(IngestJobManager, "_upload_dir", str(tmp_path), raising=False)
+
+    app = FastAPI()
+    app.include_router(documents.router)
+    return TestClient(app), submitted
+
+
+def test_upload_saves_same_file(tmp_path, upload_client):
+    client, submitted = upload_client
+    content = os.urandom(3 * _CHUNK_SIZE + 7)
+
+    response = client.post("/document/upload", params={"classification_id": 1},
+                           files={"file": ("doc.txt", content)}).json()
+
+    assert response["success"]
+    file_path, file_info = submitted[0]
+    assert file_path == os.path.join(tmp_path, response["data"]["job_id"], "doc.txt")
+    with open(file_path, "rb") as f:
+        assert f.read() == content
+    assert file_info == {"file_size": len(content), "content_hash": hashlib.sha256(content).hexdigest()}
+
+
+@pytest.mark.parametrize("filename", ["../x.pdf", "a/b.pdf", "..\\x.pdf", "..", "."])
+def test_upload_rejects_unsafe_filename(tmp_path, upload_client, filename):
+    client, submitted = upload_client
+
+    response = client.post("/document/upload", params={"classification_id": 1},
+                           files={"file": (filename, b"content")}).json()
+
+    assert response["status_code"] == 400
+    assert not submitted
+    assert not os.listdir(tmp_path)
+
+
+def test_sanitize_filename():
+    assert UploadFileHelper.sanitize_filename("合同.pdf") == "合同.pdf"
+    for filename in (None, "", ".", "..", "../x.pdf", "/etc/passwd", "a/b.pdf", "a\\b.pdf"):
+        assert UploadFileHelper.sanitize_filename(filename) is None
+
+
+def test_upload_rejects_oversized_file(tmp_path, upload_client):
+    client, submitted = upload_client
+    UploadFileHelper.configure(max_size=_CHUNK_SIZE)
+
+    response = client.post("/document/upload", params={"classification_id": 1},
+                           files={"file": ("doc.txt", os.urandom(_CHUNK_SIZE + 1))}).json()
+
+    assert response["status_code"] == 400
+    assert not submitted
+    assert not os.listdir(tmp_path)
+
+
+async def _peak_memory_of_save(source_path: str, target_path: str) -> int:
+    """分块保存过程中tracemalloc统计的内存峰值（字节）"""
+    with open(source_path, "rb") as source:
+        file = UploadFile(file=source, filename="doc.bin", size=os.path.getsize(source_path))
+        tracemalloc.start()
+        try:
+            await UploadFileHelper.save(file, target_path)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def test_save_peak_memory_does_not_grow_with_file_size(tmp_path):
+    chunk_size, max_size = UploadFileHelper._chunk_size, UploadFileHelper._max_size
+    UploadFileHelper.configure(max_size=128 * 1024 * 1024, chunk_size=1024 * 1024)
+    try:
+        peaks = {}
+        for size_mb in (8, 64):
+            source_path = tmp_path / f"source_{size_mb}.bin"
+            with open(source_path, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
+            peaks[size_mb] = asyncio.run(_peak_memory_of_save(str(source_path), str(tmp_path / "target.bin")))
+            assert os.path.getsize(tmp_path / "target.bin") == size_mb * 1024 * 1024
+            source_path.unlink()
+    finally:
+        UploadFileHelper._chunk_size, UploadFileHelper._max_size = chunk_size, max_size
+
+    # 峰值只与分块大小有关：不超过几个分块，且文件大8倍时基本不变
+    assert peaks[8] < 4 * 1024 * 1024
+    assert peaks[64] < 4 * 1024 * 1024
+    assert peaks[64] - peaks[8] < 1024 * 1024
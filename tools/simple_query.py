@@ -1,12 +1,12 @@
 from datetime import datetime
 from typing import List, Dict, Any
 
-from utils.db_helper import DBHelper
+from utils.async_db_helper import AsyncDBHelper
 
 
 class SqliteQueryTool:
     @staticmethod
-    def get_all_documents() -> List[Dict[str, Any]]:
+    async def get_all_documents() -> List[Dict[str, Any]]:
         """
         获取所有的文档和其分类
 
@@ -19,12 +19,12 @@ class SqliteQueryTool:
             "ON documents.classification_id = classification.id"
         )
 
-        db_result = DBHelper.query_by_sql(sql)
+        db_result = await AsyncDBHelper.query_by_sql(sql)
 
         return db_result
 
     @staticmethod
-    def get_documents_by_classification(classification: str) -> List[Dict[str, Any]]:
+    async def get_documents_by_classification(classification: str) -> List[Dict[str, Any]]:
         """
         根据分类获取所有的文档
 
@@ -39,12 +39,12 @@ class SqliteQueryTool:
             "WHERE classification.name == ?"
         )
 
-        db_result = DBHelper.query_by_sql(sql, params=(classification,))
+        db_result = await AsyncDBHelper.query_by_sql(sql, params=(classification,))
 
         return db_result
 
     @staticmethod
-    def get_all_classification() -> List[Dict[str, Any]]:
+    async def get_all_classification() -> List[Dict[str, Any]]:
         """
         获取所有分类
 
@@ -55,12 +55,12 @@ class SqliteQueryTool:
             "SELECT classification.name FROM classification "
         )
 
-        db_result = DBHelper.query_by_sql(sql)
+        db_result = await AsyncDBHelper.query_by_sql(sql)
 
         return db_result
 
     @staticmethod
-    def get_documents_by_date(start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    async def get_documents_by_date(start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """
         根据上传时间获取所有的文档
 
@@ -73,12 +73,12 @@ class SqliteQueryTool:
             "SELECT documents.name FROM documents WHERE upload_time BETWEEN ? AND ?"
         )
 
-        db_result = DBHelper.query_by_sql(sql, params=(start_date, end_date))
+        db_result = await AsyncDBHelper.query_by_sql(sql, params=(start_date, end_date))
 
         return db_result
 
     @staticmethod
-    def get_documents_by_classification_and_date(classification: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    async def get_documents_by_classification_and_date(classification: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """
         根据分类和上传时间获取所有的文档
 
@@ -95,6 +95,6 @@ class SqliteQueryTool:
             "WHERE classification.name == ? AND upload_time BETWEEN ? AND ?"
         )
 
-        db_result = DBHelper.query_by_sql(sql, params=(classification, start_date, end_date))
+        db_result = await AsyncDBHelper.query_by_sql(sql, params=(classification, start_date, end_date))
 
         return db_result
@@ -0,0 +1,226 @@
+import itertools
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, List, Union
+
+import numpy as np
+from llama_index.core.base.embeddings.base import Embedding
+
+Scope = Tuple[str, ...]
+# 查询向量，或不需要向量化的查询规范化后的文本
+Key = Union[Embedding, str]
+
+
+@dataclass
+class _Entry:
+    """缓存的回答"""
+    scope: Scope
+    query_text: str
+    answer: str
+    vector: Optional[np.ndarray]
+    text: Optional[str]
+    cost_seconds: float
+    expires_at: float
+
+
+class AnswerCache:
+    """
+    /query 的语义回答缓存
+    以查询向量的余弦相似度匹配意思相同、措辞不同的问题，按分类过滤范围隔离；
+    只走关键词检索、本来不需要向量化的查询按规范化后的文本精确匹配，不为查缓存而调用向量化接口。
+    缓存只对一个文档库版本有效，版本号变化后全部失效；超过有效期的回答视为未命中，
+    超过容量时淘汰最久未命中的回答
+    """
+
+    _enabled = True
+    _threshold = 0.95
+    _max_entries = 1000
+    _ttl = 24 * 3600.0
+
+    _entries: "OrderedDict[int, _Entry]" = OrderedDict()
+    _ids = itertools.count()
+    _version: Optional[int] = None
+    # 每个分类范围的(缓存id列表, 向量矩阵)，写入或淘汰时重建
+    _matrices: Dict[Scope, Tuple[List[int], np.ndarray]] = {}
+    # (分类范围, 规范化文本) -> 缓存id
+    _texts: Dict[Tuple[Scope, str], int] = {}
+    _lock = threading.Lock()
+    # 规范化文本时去掉的首尾标点，C++、C#等关键词中的符号保留
+    _edge_punctuation = re.compile(r"^[\s,.!?;:、。，！？；：…]+|[\s,.!?;:、。，！？；：…]+$")
+
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+    _invalidations = 0
+    _saved_seconds = 0.0
+
+    @classmethod
+    def configure(cls, enabled: Optional[bool] = None, threshold: Optional[float] = None,
+                  max_entries: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        """
+        修改缓存配置并清空缓存
+        :param enabled: 是否启用
+        :param threshold: 视为同一问题的最低余弦相似度
+        :param max_entries: 最多缓存的回答数量
+        :param ttl: 回答的有效期（秒）
+        """
+        with cls._lock:
+            if enabled is not None:
+                cls._enabled = enabled
+            if threshold:
+                cls._threshold = threshold
+            if max_entries:
+                cls._max_entries = max_entries
+            if ttl:
+                cls._ttl = ttl
+            cls._entries = OrderedDict()
+            cls._matrices = {}
+            cls._texts = {}
+
+    @classmethod
+    def normalize_text(cls, query_text: str) -> str:
+        """文本匹配用的规范化：全半角统一、小写、合并空白、去掉首尾的句读标点"""
+        text = " ".join(unicodedata.normalize("NFKC", query_text).lower().split())
+        return cls._edge_punctuation.sub("", text) or text
+
+    @staticmethod
+    def scope(classification_names: Optional[List[str]]) -> Scope:
+        """分类过滤范围，与顺序无关"""
+        return tuple(sorted(set(classification_names or [])))
+
+    @classmethod
+    def get(cls, key: Key, scope: Scope, version: int) -> Optional[str]:
+        """
+        查找相似问题的回答
+        :param key: 查询向量，或normalize_text规范化后的查询文本
+        :param scope: 分类过滤范围
+        :param version: 当前文档库版本号
+        :return: 缓存的回答，未命中时为None
+        """
+        if not cls._enabled:
+            return None
+        with cls._lock:
+            cls._sync_version(version)
+            if isinstance(key, str):
+                entry_id = cls._text_match(key, scope)
+            else:
+                entry_id = cls._best_match(cls._normalize(key), scope)
+            if entry_id is None:
+                cls._misses += 1
+                return None
+            entry = cls._entries[entry_id]
+            cls._entries.move_to_end(entry_id)
+            cls._hits += 1
+            cls._saved_seconds += entry.cost_seconds
+            return entry.answer
+
+    @classmethod
+    def put(cls, key: Key, scope: Scope, version: int, query_text: str, answer: str,
+            cost_seconds: float) -> None:
+        """
+        缓存回答
+        :param key: 查询向量，或normalize_text规范化后的查询文本
+        :param scope: 分类过滤范围
+        :param version: 计算回答前读取的文档库版本号
+        :param query_text: 查询文本
+        :param answer: 回答
+        :param cost_seconds: 计算回答的耗时，命中时计入节省的时间
+        """
+        if not cls._enabled:
+            return
+        text = key if isinstance(key, str) else None
+        vector = None if text is not None else cls._normalize(key)
+        entry = _Entry(scope, query_text, answer, vector, text, cost_seconds, time.monotonic() + cls._ttl)
+        with cls._lock:
+            cls._sync_version(version)
+            # 计算期间文档库已变化，回答可能基于旧数据，不缓存
+            if cls._version != version:
+                return
+            entry_id = next(cls._ids)
+            if text is not None:
+                replaced = cls._texts.get((scope, text))
+                if replaced is not None:
+                    cls._entries.pop(replaced, None)
+                cls._texts[(scope, text)] = entry_id
+            else:
+                cls._matrices.pop(scope, None)
+            cls._entries[entry_id] = entry
+            while len(cls._entries) > cls._max_entries:
+                evicted_id, evicted = cls._entries.popitem(last=False)
+                if evicted.text is not None:
+                    cls._texts.pop((evicted.scope, evicted.text), None)
+                else:
+                    cls._matrices.pop(evicted.scope, None)
+                cls._evictions += 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = cls._hits + cls._misses
+        return {
+            "enabled": cls._enabled,
+            "entries": len(cls._entries),
+            "max_entries": cls._max_entries,
+            "version": cls._version,
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "hit_rate": cls._hits / total if total else 0.0,
+            "evictions": cls._evictions,
+            "invalidations": cls._invalidations,
+            "saved_seconds": round(cls._saved_seconds, 3),
+        }
+
+    @staticmethod
+    def _normalize(embedding: Embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @classmethod
+    def _sync_version(cls, version: int) -> None:
+        """文档库版本号变大时清空缓存；调用方需持有锁"""
+        if cls._version is None or version > cls._version:
+            if cls._entries:
+                cls._invalidations += 1
+            cls._entries = OrderedDict()
+            cls._matrices = {}
+            cls._texts = {}
+            cls._version = version
+
+    @classmethod
+    def _text_match(cls, text: str, scope: Scope) -> Optional[int]:
+        """范围内文本相同且未过期的缓存id；调用方需持有锁"""
+        entry_id = cls._texts.get((scope, text))
+        if entry_id is None or cls._entries[entry_id].expires_at < time.monotonic():
+            return None
+        return entry_id
+
+    @classmethod
+    def _best_match(cls, vector: np.ndarray, scope: Scope) -> Optional[int]:
+        """范围内相似度最高且不低于阈值的缓存id；调用方需持有锁"""
+        matrix = cls._matrices.get(scope)
+        if matrix is None:
+            ids = [
+                entry_id for entry_id, entry in cls._entries.items()
+                if entry.scope == scope and entry.vector is not None
+            ]
+            if not ids:
+                return None
+            matrix = cls._matrices[scope] = (ids, np.stack([cls._entries[x].vector for x in ids]))
+
+        ids, vectors = matrix
+        if vectors.shape[1] != vector.shape[0]:
+            return None
+        similarities = vectors @ vector
+        now = time.monotonic()
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < cls._threshold:
+                return None
+            entry = cls._entries[ids[index]]
+            if entry.expires_at >= now:
+                return ids[index]
+        return None
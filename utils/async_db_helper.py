@@ -0,0 +1,108 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable, TypeVar
+
+from utils.db_helper import DBHelper
+
+T = TypeVar("T")
+
+
+class AsyncDBHelper:
+    """
+    DBHelper的异步版本
+    SQLite操作在专用线程池中执行，不阻塞事件循环
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """获取数据库专用线程池，线程数与连接池大小一致"""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=DBHelper._pool_size,
+                        thread_name_prefix="db",
+                    )
+        return cls._executor
+
+    @classmethod
+    async def _run(cls, func: Callable[..., T], *args, **kwargs) -> T:
+        """在数据库线程池中执行同步方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._get_executor(), functools.partial(func, *args, **kwargs))
+
+    @classmethod
+    def close(cls) -> None:
+        """关闭线程池"""
+        with cls._executor_lock:
+            if cls._executor:
+                cls._executor.shutdown(wait=True)
+                cls._executor = None
+
+    @classmethod
+    async def transaction(cls, func: Callable[[sqlite3.Connection], T]) -> T:
+        """在同一个事务中执行func(conn)，func中的写入需传入该连接，异常时整体回滚"""
+
+        def run() -> T:
+            with DBHelper.transaction() as conn:
+                return func(conn)
+
+        return await cls._run(run)
+
+    @classmethod
+    async def query_all(cls, table_name: str) -> List[Dict[str, Any]]:
+        """查询表中所有数据"""
+        return await cls._run(DBHelper.query_all, table_name)
+
+    @classmethod
+    async def query_one(cls, table_name: str, condition: str = "", params: tuple = ()) -> Optional[Dict[str, Any]]:
+        """查询单条数据"""
+        return await cls._run(DBHelper.query_one, table_name, condition, params)
+
+    @classmethod
+    async def query_many(cls, table_name: str, condition: str = "", params: tuple = (), limit: int = 100) -> List[
+        Dict[str, Any]]:
+        """查询多条数据"""
+        return await cls._run(DBHelper.query_many, table_name, condition, params, limit)
+
+    @classmethod
+    async def query_by_sql(cls, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """通过sql查询结果"""
+        return await cls._run(DBHelper.query_by_sql, sql, params)
+
+    @classmethod
+    async def insert(cls, table_name: str, data: Dict[str, Any]) -> int:
+        """插入数据"""
+        return await cls._run(DBHelper.insert, table_name, data)
+
+    @classmethod
+    async def update(cls, table_name: str, data: Dict[str, Any], condition: str = "", params: tuple = ()) -> int:
+        """更新数据"""
+        return await cls._run(DBHelper.update, table_name, data, condition, params)
+
+    @classmethod
+    async def delete(cls, table_name: str, condition: str = "", params: tuple = ()) -> int:
+        """删除数据"""
+        return await cls._run(DBHelper.delete, table_name, condition, params)
+
+    @classmethod
+    async def full_text_search(cls, table_name: str, column: str, keywords: List[str], limit: int = 100) -> List[
+        Dict[str, Any]]:
+        """基于全文索引的模糊匹配，按相关度排序"""
+        return await cls._run(DBHelper.full_text_search, table_name, column, keywords, limit)
+
+    @classmethod
+    async def insert_many(cls, table_name: str, data_list: List[Dict[str, Any]]) -> int:
+        """批量插入数据"""
+        return await cls._run(DBHelper.insert_many, table_name, data_list)
+
+    @classmethod
+    async def execute_many(cls, sql: str, params_list: List[tuple]) -> int:
+        """使用同一条SQL批量写入"""
+        return await cls._run(DBHelper.execute_many, sql, params_list)
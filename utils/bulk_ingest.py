@@ -0,0 +1,280 @@
+"""
+目录批量入库
+
+遍历目录，一级子目录名即文档分类（不存在时自动创建），子目录下的文档按
+解析切分 → 分批向量化 → 写入向量库和数据库 的流水线处理：
+多个文档同时解析，多批向量化请求同时进行（有并发上限，失败时指数退避重试）。
+已入库的同名文档会被跳过，中断后重新执行即可从断点继续。
+通过接口发起时，目录须位于 BULK_INGEST_ROOT（默认为项目下的 bulk_ingest 目录）之内。
+
+用法：python -m utils.bulk_ingest <目录> [--file-concurrency 4] [--embed-concurrency 4]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional
+
+from llama_index.core.schema import BaseNode
+
+from schemas.bulk_ingest import BulkIngestProgress
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
+from utils.document_embedding import DocumentEmbedding
+from utils.logger import logger
+from utils.vector_store_registry import VectorStoreRegistry
+
+
+class BulkIngestor:
+    """目录批量入库"""
+
+    # 每批向量化的文本块数量
+    _embed_batch_size = 25
+    # 向量化失败（如触发限流）时的重试次数与退避时间（秒）
+    _embed_max_retries = 6
+    _backoff_base = 1.0
+    _backoff_max = 60.0
+
+    # 接口发起的批量任务只能入库该目录之内的文档
+    _root = os.getenv(
+        "BULK_INGEST_ROOT",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bulk_ingest")
+    )
+    # 接口发起的批量任务，结束后保留一段时间（秒）供查询进度，并限制保留的数量
+    _tasks: Dict[str, BulkIngestProgress] = {}
+    _running: Dict[str, asyncio.Task] = {}
+    _task_ttl = 3600
+    _max_tasks = 100
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    def resolve(cls, directory: str) -> Optional[Path]:
+        """
+        把接口传入的目录解析为BULK_INGEST_ROOT之内的真实路径，相对路径相对于BULK_INGEST_ROOT
+
+        返回:
+            解析后的目录，目录不在BULK_INGEST_ROOT之内（含..和符号链接指向外部的情况）时返回None
+        """
+        root = Path(os.path.realpath(cls._root))
+        path = Path(os.path.realpath(os.path.join(root, directory)))
+        if path != root and root not in path.parents:
+            return None
+        return path
+
+    @classmethod
+    def scan(cls, directory: str, confine: bool = False) -> Tuple[List[Tuple[str, Path]], List[Path]]:
+        """
+        扫描目录
+
+        参数:
+            directory: 目录
+            confine: 是否跳过符号链接指向目录之外的文档
+
+        返回:
+            ([(分类名, 文档路径)], 无法归类的文档路径)
+        """
+        root = Path(directory)
+        if not root.is_dir():
+            raise NotADirectoryError(f"目录不存在: {directory}")
+        real_root = Path(os.path.realpath(root))
+
+        def accept(path: Path) -> bool:
+            if not path.is_file() or path.suffix.lower() not in supported:
+                return False
+            if confine and real_root not in Path(os.path.realpath(path)).parents:
+                logger.warning(f"文档指向入库目录之外，已跳过：{path}")
+                return False
+            return True
+
+        supported = set(DocumentEmbedding.get_supported_formats())
+        files, unclassified = [], []
+        for path in sorted(root.iterdir()):
+            if path.is_dir():
+                files.extend((path.name, x) for x in sorted(path.rglob("*")) if accept(x))
+            elif accept(path):
+                unclassified.append(path)
+        return files, unclassified
+
+    @classmethod
+    async def _ensure_classifications(cls, names: List[str]) -> Dict[str, int]:
+        """获取分类id，不存在的分类自动创建"""
+        result = {}
+        for name in dict.fromkeys(names):
+            classification = await AsyncDBHelper.query_one("classification", "name=?", (name,))
+            result[name] = classification["id"] if classification else \
+                await AsyncDBHelper.insert("classification", {"name": name})
+        return result
+
+    @classmethod
+    async def _embed_batch(cls, batch: List[BaseNode], semaphore: asyncio.Semaphore) -> None:
+        """向量化一批文本块，失败时指数退避重试"""
+        for attempt in range(1, cls._embed_max_retries + 1):
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(DocumentEmbedding.embed_nodes, batch)
+                    return
+                except Exception as e:
+                    if attempt == cls._embed_max_retries:
+                        raise
+                    error = e
+            # 退避期间释放并发名额
+            delay = min(cls._backoff_max, cls._backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.warning(f"向量化失败，{delay:.1f}秒后第{attempt}次重试: {error}")
+            await asyncio.sleep(delay)
+
+    @classmethod
+    async def _ingest_file(
+            cls,
+            classification_id: int,
+            classification_name: str,
+            file_path: Path,
+            file_semaphore: asyncio.Semaphore,
+            embed_semaphore: asyncio.Semaphore,
+            progress: BulkIngestProgress
+    ) -> None:
+        """单个文档的入库流水线"""
+        async with file_semaphore:
+            try:
+                if await AsyncDBHelper.query_one("documents", "name=?", (file_path.name,)):
+                    progress.skipped += 1
+                    return
+
+                nodes, chapter_titles = await asyncio.to_thread(
+                    DocumentEmbedding.load_nodes, classification_name, file_path
+                )
+                await asyncio.gather(*[
+                    cls._embed_batch(nodes[i:i + cls._embed_batch_size], embed_semaphore)
+                    for i in range(0, len(nodes), cls._embed_batch_size)
+                ])
+                await asyncio.to_thread(
+                    DocumentEmbedding.save_document, classification_id, file_path.name, nodes, chapter_titles
+                )
+
+                progress.succeeded += 1
+                progress.chunk_count += len(nodes)
+                logger.info(f"批量入库 [{progress.succeeded + progress.failed + progress.skipped}/{progress.total}]"
+                            f"：{file_path.name}，文本块{len(nodes)}个")
+            except Exception as e:
+                progress.failed += 1
+                progress.errors[str(file_path)] = str(e)
+                logger.error(f"批量入库失败：{file_path}，{e}")
+
+    @classmethod
+    async def run(
+            cls,
+            directory: str,
+            file_concurrency: int = 4,
+            embed_concurrency: int = 4,
+            progress: Optional[BulkIngestProgress] = None,
+            confine: bool = False
+    ) -> BulkIngestProgress:
+        """
+        批量入库目录下的文档
+
+        参数:
+            directory: 目录
+            file_concurrency: 同时处理的文档数量
+            embed_concurrency: 同时进行的向量化请求数量
+            progress: 进度对象，为空时新建
+            confine: 是否跳过符号链接指向目录之外的文档
+
+        返回:
+            入库进度
+        """
+        progress = progress or BulkIngestProgress(task_id=uuid.uuid4().hex, directory=directory)
+        progress.started_at = cls._now()
+        try:
+            files, unclassified = await asyncio.to_thread(cls.scan, directory, confine)
+            for path in unclassified:
+                logger.warning(f"文档不在分类子目录中，已跳过：{path}")
+            progress.total = len(files) + len(unclassified)
+            progress.skipped += len(unclassified)
+
+            classification_ids = await cls._ensure_classifications([name for name, _ in files])
+
+            file_semaphore = asyncio.Semaphore(file_concurrency)
+            embed_semaphore = asyncio.Semaphore(embed_concurrency)
+            await asyncio.gather(*[
+                cls._ingest_file(
+                    classification_ids[name], name, path, file_semaphore, embed_semaphore, progress
+                )
+                for name, path in files
+            ])
+            progress.status = "finished"
+        except Exception as e:
+            progress.status = "failed"
+            progress.errors[directory] = str(e)
+            logger.error(f"批量入库失败：{directory}，{e}")
+        finally:
+            progress.finished_at = cls._now()
+        return progress
+
+    @classmethod
+    def _prune(cls) -> None:
+        """清理结束超过保留时间的任务，保留的任务过多时再清理最早结束的任务"""
+        finished = sorted(
+            (progress.finished_at, task_id) for task_id, progress in cls._tasks.items()
+            if task_id not in cls._running and progress.finished_at
+        )
+        expire = (datetime.now() - timedelta(seconds=cls._task_ttl)).strftime("%Y-%m-%d %H:%M:%S")
+        excess = len(cls._tasks) - cls._max_tasks + 1
+        for i, (finished_at, task_id) in enumerate(finished):
+            if finished_at < expire or i < excess:
+                del cls._tasks[task_id]
+
+    @classmethod
+    def submit(cls, directory: Path, file_concurrency: int = 4, embed_concurrency: int = 4) -> BulkIngestProgress:
+        """
+        在后台发起批量入库，需在事件循环中调用
+
+        参数:
+            directory: 经resolve解析后的目录
+
+        返回:
+            入库进度
+        """
+        cls._prune()
+        progress = BulkIngestProgress(task_id=uuid.uuid4().hex, directory=str(directory))
+        cls._tasks[progress.task_id] = progress
+        task = asyncio.create_task(
+            cls.run(str(directory), file_concurrency, embed_concurrency, progress, confine=True)
+        )
+        cls._running[progress.task_id] = task
+        task.add_done_callback(lambda _: cls._running.pop(progress.task_id, None))
+        return progress
+
+    @classmethod
+    def get_progress(cls, task_id: str) -> Optional[BulkIngestProgress]:
+        """查询批量入库进度"""
+        return cls._tasks.get(task_id)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="目录批量入库，一级子目录名即文档分类")
+    parser.add_argument("directory")
+    parser.add_argument("--file-concurrency", type=int, default=4, help="同时处理的文档数量")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="同时进行的向量化请求数量")
+    args = parser.parse_args()
+
+    DBHelper.initialize()
+    DocumentEmbedding.initialize()
+    try:
+        progress = await BulkIngestor.run(args.directory, args.file_concurrency, args.embed_concurrency)
+        logger.info(f"批量入库结束：成功{progress.succeeded}，跳过{progress.skipped}，失败{progress.failed}，"
+                    f"文本块{progress.chunk_count}个")
+    finally:
+        DocumentEmbedding.shutdown()
+        VectorStoreRegistry.close()
+        AsyncDBHelper.close()
+        DBHelper.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
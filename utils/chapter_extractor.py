@@ -0,0 +1,139 @@
+import re
+from typing import List, NamedTuple, Dict, Callable, Sequence
+
+
+class Chapter(NamedTuple):
+    """章节标题"""
+    title: str
+    level: int
+
+
+class ChapterRule(NamedTuple):
+    """
+    章节识别规则
+    pattern匹配一整行（不含换行符），level根据匹配结果计算标题层级
+    """
+    name: str
+    pattern: str
+    level: Callable[[re.Match], int]
+
+
+# 行内空白与行内容，不使用\s和.，避免把Windows换行的\r算进标题
+_BLANK = r"[ \t　]+"
+_REST = r"[^\r\n]+"
+
+MARKDOWN_RULE = ChapterRule(
+    "markdown",
+    rf"(?P<markdown_level>#+){_BLANK}{_REST}",
+    lambda m: len(m.group("markdown_level"))
+)
+NUMBER_RULE = ChapterRule(
+    "number",
+    rf"(?P<number_level>\d+(?:\.\d+)*){_BLANK}{_REST}",
+    lambda m: m.group("number_level").count(".") + 1
+)
+UPPERCASE_RULE = ChapterRule(
+    "uppercase",
+    r"[A-Z][A-Z0-9 ]+",
+    lambda m: 1
+)
+CHINESE_CHAPTER_RULE = ChapterRule(
+    "chinese_chapter",
+    rf"第[一二三四五六七八九十]+章{_BLANK}{_REST}",
+    lambda m: 1
+)
+
+
+class ChapterExtractor:
+    """
+    章节标题识别
+    所有规则在创建时合并为一个正则，对文本只做一次逐行扫描，每行只匹配一次
+    """
+
+    def __init__(self, rules: Sequence[ChapterRule]):
+        """
+        :param rules: 识别规则，同一行命中多条规则时取靠前的规则
+        """
+        self._rules = {rule.name: rule for rule in rules}
+        self._pattern = re.compile(
+            "(?:" + "|".join(f"(?P<{rule.name}>{rule.pattern})" for rule in rules) + r")\r?$"
+        ) if rules else None
+
+    def extract(self, text: str) -> List[Chapter]:
+        """
+        从文本中提取章节标题
+        :param text: 文本
+        :return: 按出现顺序排列的章节标题及层级
+        """
+        chapters = []
+        if self._pattern is None:
+            return chapters
+        # 逐行match比多行模式下的finditer快，后者会在每个字符位置尝试^
+        for line in text.split("\n"):
+            match = self._pattern.match(line)
+            if not match:
+                continue
+            # 规则名所在的分组最后闭合，lastgroup即命中的规则
+            rule = self._rules[match.lastgroup]
+            chapters.append(Chapter(match.group(rule.name), rule.level(match)))
+        return chapters
+
+    # 按文件类型注册的识别器
+    _registry: Dict[str, "ChapterExtractor"] = {}
+
+    @classmethod
+    def register(cls, file_ext: str, extractor: "ChapterExtractor") -> None:
+        """
+        为文件类型注册识别器
+        :param file_ext: 文件后缀，如.md
+        :param extractor: 识别器
+        """
+        cls._registry[file_ext.lower()] = extractor
+
+    @classmethod
+    def for_file_type(cls, file_ext: str) -> "ChapterExtractor":
+        """
+        获取文件类型对应的识别器，未注册的类型使用默认识别器
+        :param file_ext: 文件后缀，如.md
+        """
+        return cls._registry.get(file_ext.lower(), DEFAULT_CHAPTER_EXTRACTOR)
+
+
+DEFAULT_CHAPTER_EXTRACTOR = ChapterExtractor([MARKDOWN_RULE, NUMBER_RULE, UPPERCASE_RULE, CHINESE_CHAPTER_RULE])
+
+# Markdown类文档以#标题为准，全大写的行多为代码或缩写，不作为章节
+_MARKDOWN_EXTRACTOR = ChapterExtractor([MARKDOWN_RULE, NUMBER_RULE, CHINESE_CHAPTER_RULE])
+ChapterExtractor.register(".md", _MARKDOWN_EXTRACTOR)
+ChapterExtractor.register(".ipynb", _MARKDOWN_EXTRACTOR)
+# 流式读取的格式：HTML的h1~h6和xlsx的工作表名已转为#标题，JSON记录没有章节结构
+ChapterExtractor.register(".html", ChapterExtractor([MARKDOWN_RULE, CHINESE_CHAPTER_RULE]))
+ChapterExtractor.register(".xlsx", ChapterExtractor([MARKDOWN_RULE]))
+ChapterExtractor.register(".json", ChapterExtractor([]))
+
+
+# 章节元数据：一个文本块可能跨越多个章节，向量库的元数据不支持列表，
+# 第一个章节存入chapter_title，其余依次存入chapter_title_1、chapter_title_2...
+CHAPTER_TITLE_KEY = "chapter_title"
+MAX_CHAPTER_TITLES = 16
+CHAPTER_TITLE_KEYS = [CHAPTER_TITLE_KEY] + [f"{CHAPTER_TITLE_KEY}_{i}" for i in range(1, MAX_CHAPTER_TITLES)]
+# 附加的章节键只用于过滤，不参与向量化和LLM上下文
+EXTRA_CHAPTER_TITLE_KEYS = CHAPTER_TITLE_KEYS[1:]
+
+
+def chapter_titles_to_metadata(titles: List[str]) -> Dict[str, str]:
+    """
+    将文本块的章节标题转为元数据，超过MAX_CHAPTER_TITLES的部分只保留在document_titles中
+    :param titles: 按出现顺序排列的章节标题
+    """
+    metadata = {CHAPTER_TITLE_KEY: titles[0] if titles else None}
+    for key, title in zip(EXTRA_CHAPTER_TITLE_KEYS, titles[1:]):
+        metadata[key] = title
+    return metadata
+
+
+def chapter_titles_from_metadata(metadata: Dict) -> List[str]:
+    """
+    从元数据中读取文本块的全部章节标题
+    :param metadata: 文本块元数据
+    """
+    return [metadata[key] for key in CHAPTER_TITLE_KEYS if metadata.get(key)]
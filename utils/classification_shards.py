@@ -0,0 +1,113 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from utils.db_helper import DBHelper
+from utils.logger import logger
+from utils.vector_store_registry import VectorStoreRegistry, VectorStoreHandle
+
+
+class ClassificationShards:
+    """
+    按分类分片
+    由环境变量 SHARD_BY_CLASSIFICATION=true 启用。启用后每个分类的文本块存放在单独的Chroma集合
+    <集合名>_c<分类id> 中，查询按分类过滤条件只检索对应的集合，不再使用classification元数据过滤；
+    没有或有多个分类时并行检索各集合后按得分合并。
+    集合按分类id命名，文本块所属的分类以所在集合为准，分类改名不需要改写文本块
+    """
+
+    _enabled = os.getenv("SHARD_BY_CLASSIFICATION", "false").lower() == "true"
+    _collection_name = "documents"
+    _persist_dir: Optional[str] = None
+
+    @classmethod
+    def configure(
+            cls,
+            enabled: Optional[bool] = None,
+            collection_name: Optional[str] = None,
+            persist_dir: Optional[str] = None
+    ) -> None:
+        """
+        修改分片配置
+        :param enabled: 是否按分类分片
+        :param collection_name: 未分片时的文本块集合名，分片集合名以此为前缀
+        :param persist_dir: 持久化目录
+        """
+        if enabled is not None:
+            cls._enabled = enabled
+        if collection_name:
+            cls._collection_name = collection_name
+        if persist_dir:
+            cls._persist_dir = persist_dir
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """是否按分类分片"""
+        return cls._enabled
+
+    @classmethod
+    def handle(cls, classification_id: int) -> VectorStoreHandle:
+        """分类的分片集合，不存在时创建"""
+        return VectorStoreRegistry.get(f"{cls._collection_name}_c{classification_id}", cls._persist_dir)
+
+    @classmethod
+    def classification_name(cls, collection) -> Optional[str]:
+        """
+        分片集合所属的分类名，分片中文本块元数据里的分类名在分类改名后不再更新，以此为准
+        :param collection: Chroma集合
+        :return: 分类名，不是分片集合或分类已不存在时为None
+        """
+        match = re.fullmatch(rf"{re.escape(cls._collection_name)}_c(\d+)", collection.name)
+        if not match:
+            return None
+        row = DBHelper.query_one("classification", "id=?", (int(match.group(1)),))
+        return row["name"] if row else None
+
+    @classmethod
+    def shards(cls, classification_names: Optional[List[str]] = None) -> List[Tuple[str, VectorStoreHandle]]:
+        """
+        查询要检索的分片
+        :param classification_names: 分类名，为空时返回全部分类
+        :return: (分类名, 分片集合)列表
+        """
+        if classification_names:
+            rows = DBHelper.query_by_sql(
+                f"SELECT id, name FROM classification WHERE name IN ({','.join('?' * len(classification_names))})",
+                tuple(classification_names)
+            )
+        else:
+            rows = DBHelper.query_by_sql("SELECT id, name FROM classification")
+        return [(row["name"], cls.handle(row["id"])) for row in rows]
+
+    @classmethod
+    def migrate(cls, collection, batch_size: int = 5000) -> int:
+        """
+        把未分片集合中的文本块按classification元数据移动到各分片集合
+        每批先写入分片再从原集合删除，中途失败后再次调用即可继续
+        :param collection: 未分片的文本块集合
+        :param batch_size: 每批移动的文本块数量
+        :return: 移动的文本块数量
+        """
+        ids = {row["name"]: row["id"] for row in DBHelper.query_by_sql("SELECT id, name FROM classification")}
+        moved = 0
+        while True:
+            batch = collection.get(limit=batch_size, include=["embeddings", "documents", "metadatas"])
+            if not batch["ids"]:
+                break
+            groups = {}
+            for index, metadata in enumerate(batch["metadatas"]):
+                groups.setdefault((metadata or {}).get("classification"), []).append(index)
+            for name, indexes in groups.items():
+                if name not in ids:
+                    raise ValueError(f"文本块的分类不存在: {name}")
+                cls.handle(ids[name]).collection.upsert(
+                    ids=[batch["ids"][i] for i in indexes],
+                    embeddings=[batch["embeddings"][i] for i in indexes],
+                    documents=[batch["documents"][i] for i in indexes],
+                    metadatas=[batch["metadatas"][i] for i in indexes],
+                )
+            collection.delete(ids=batch["ids"])
+            moved += len(batch["ids"])
+        if moved:
+            logger.info(f"已把{moved}个文本块移动到分类分片集合")
+        return moved
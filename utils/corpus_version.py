@@ -0,0 +1,32 @@
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
+
+
+class CorpusVersion:
+    """
+    文档库版本号
+    文本块写入、删除和元数据修改完成后加一，缓存的查询结果按版本号判断是否过期。
+    版本号存放在数据库中，批量导入命令行等其他进程的修改同样生效
+    """
+
+    _bump_sql = "UPDATE corpus_version SET version = version + 1 WHERE id = 1"
+
+    @classmethod
+    def bump(cls) -> None:
+        """版本号加一"""
+        DBHelper.execute_many(cls._bump_sql, [()])
+
+    @classmethod
+    async def abump(cls) -> None:
+        """版本号加一"""
+        await AsyncDBHelper.execute_many(cls._bump_sql, [()])
+
+    @staticmethod
+    def current() -> int:
+        """当前版本号"""
+        return DBHelper.query_one("corpus_version", "id=1")["version"]
+
+    @staticmethod
+    async def acurrent() -> int:
+        """当前版本号"""
+        return (await AsyncDBHelper.query_one("corpus_version", "id=1"))["version"]
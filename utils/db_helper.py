@@ -1,6 +1,100 @@
 import os
+import queue
 import sqlite3
-from typing import List, Dict, Optional, Any
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Iterator
+
+
+class ConnectionPool:
+    """SQLite连接池，复用连接并统一设置PRAGMA"""
+
+    # 连接级别的PRAGMA设置
+    _pragmas = (
+        "PRAGMA journal_mode=WAL",  # WAL模式下读写互不阻塞
+        "PRAGMA synchronous=NORMAL",  # WAL模式下NORMAL已能保证一致性
+        "PRAGMA cache_size=-16000",  # 页缓存约16MB
+        "PRAGMA mmap_size=268435456",  # 内存映射256MB
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 10.0):
+        """
+        :param db_path: 数据库文件路径
+        :param max_size: 最大连接数
+        :param timeout: 获取连接的最长等待时间（秒）
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=max_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """创建新连接"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # 使返回的行像字典一样可访问
+        for pragma in self._pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """获取连接，优先复用空闲连接，连接数达到上限时等待归还"""
+        if self._closed:
+            raise RuntimeError("连接池已关闭")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return self._create_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"获取数据库连接超时（{self.timeout}秒）")
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """归还连接，未结束的事务会被回滚"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """以上下文的方式借用连接"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """关闭连接池中所有空闲连接，借出的连接会在归还时关闭"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
 
 
 class DBHelper:
@@ -9,17 +103,229 @@ class DBHelper:
     _parent_dir = os.path.dirname(_current_dir)  # 获取上级目录
     _db_path = os.path.join(_parent_dir, "document.db")  # 拼接路径
 
+    _pool_size = 8
+    _pool: Optional[ConnectionPool] = None
+    _pool_lock = threading.Lock()
+
+    # 启动时需要确保存在的数据库对象：(对象名, 创建脚本)，对象不存在时执行
+    _schema = [
+        (
+            "documents_fts",
+            """
+            CREATE VIRTUAL TABLE documents_fts USING fts5(
+                name, content='documents', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TRIGGER documents_fts_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, name) VALUES (new.id, new.name);
+            END;
+            CREATE TRIGGER documents_fts_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            END;
+            CREATE TRIGGER documents_fts_au AFTER UPDATE OF name ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, name) VALUES ('delete', old.id, old.name);
+                INSERT INTO documents_fts(rowid, name) VALUES (new.id, new.name);
+            END;
+            INSERT INTO documents_fts(documents_fts) VALUES ('rebuild');
+            """
+        ),
+        (
+            "document_titles_fts",
+            """
+            CREATE VIRTUAL TABLE document_titles_fts USING fts5(
+                title, content='document_titles', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TRIGGER document_titles_fts_ai AFTER INSERT ON document_titles BEGIN
+                INSERT INTO document_titles_fts(rowid, title) VALUES (new.id, new.title);
+            END;
+            CREATE TRIGGER document_titles_fts_ad AFTER DELETE ON document_titles BEGIN
+                INSERT INTO document_titles_fts(document_titles_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            END;
+            CREATE TRIGGER document_titles_fts_au AFTER UPDATE OF title ON document_titles BEGIN
+                INSERT INTO document_titles_fts(document_titles_fts, rowid, title) VALUES ('delete', old.id, old.title);
+                INSERT INTO document_titles_fts(rowid, title) VALUES (new.id, new.title);
+            END;
+            INSERT INTO document_titles_fts(document_titles_fts) VALUES ('rebuild');
+            """
+        ),
+        (
+            "chunks_fts",
+            """
+            CREATE TABLE chunks
+            (
+                id            integer not null
+                    constraint chunks_pk
+                        primary key autoincrement,
+                node_id       TEXT    not null,
+                document_name TEXT    not null,
+                terms         TEXT    not null
+            );
+            CREATE INDEX chunks_node_id_index
+                on chunks (node_id);
+            CREATE INDEX chunks_document_name_index
+                on chunks (document_name);
+            CREATE VIRTUAL TABLE chunks_fts USING fts5(
+                terms, content='chunks', content_rowid='id', tokenize="unicode61 tokenchars '._-'"
+            );
+            CREATE TRIGGER chunks_fts_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts(rowid, terms) VALUES (new.id, new.terms);
+            END;
+            CREATE TRIGGER chunks_fts_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts(chunks_fts, rowid, terms) VALUES ('delete', old.id, old.terms);
+            END;
+            """
+        ),
+        (
+            "corpus_version",
+            """
+            CREATE TABLE corpus_version
+            (
+                id      integer not null
+                    constraint corpus_version_pk
+                        primary key,
+                version integer not null
+            );
+            INSERT INTO corpus_version (id, version) VALUES (1, 0);
+            """
+        ),
+        (
+            "ingest_jobs",
+            """
+            CREATE TABLE ingest_jobs
+            (
+                id                TEXT                                        not null
+                    constraint ingest_jobs_pk
+                        primary key,
+                classification_id integer                                     not null,
+                document_name     TEXT                                        not null,
+                file_path         TEXT                                        not null,
+                job_dir           TEXT,
+                file_size         integer,
+                content_hash      TEXT,
+                status            TEXT                                        not null,
+                document_id       integer,
+                chunk_count       integer,
+                embedded_count    integer,
+                removed_count     integer,
+                parse_seconds     REAL,
+                embed_seconds     REAL,
+                write_seconds     REAL,
+                error             TEXT,
+                created_at        TEXT default (datetime('now', 'localtime')) not null,
+                started_at        TEXT,
+                finished_at       TEXT
+            );
+            CREATE INDEX ingest_jobs_status_index
+                on ingest_jobs (status);
+            """
+        ),
+    ]
+
+    # 在已有的表上补充的列：(表名, 列名, 列定义)，表存在但缺少该列时添加
+    _columns = [
+        ("ingest_jobs", "job_dir", "TEXT"),
+    ]
+
+    # trigram分词器的最小匹配长度，更短的关键词退化为LIKE匹配
+    _trigram_min_length = 3
+
     @classmethod
-    def _get_connection(cls) -> sqlite3.Connection:
-        """获取数据库连接"""
-        conn = sqlite3.connect(cls._db_path)
-        conn.row_factory = sqlite3.Row  # 使返回的行像字典一样可访问
-        return conn
+    def initialize(cls) -> None:
+        """创建缺失的数据库对象（全文索引及其同步触发器）和缺失的列"""
+        with cls._get_connection() as conn:
+            existing = {
+                row["name"] for row in conn.execute("SELECT name FROM sqlite_master")
+            }
+            for name, script in cls._schema:
+                if name not in existing:
+                    conn.executescript(f"BEGIN;{script}COMMIT;")
+            for table_name, column, definition in cls._columns:
+                columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+                if columns and column not in columns:
+                    conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column} {definition}")
+                    conn.commit()
+
+    @classmethod
+    def configure(cls, db_path: Optional[str] = None, pool_size: Optional[int] = None) -> None:
+        """
+        修改数据库配置，已有的连接池会被关闭并在下次使用时按新配置重建
+        :param db_path: 数据库文件路径
+        :param pool_size: 连接池大小
+        """
+        with cls._pool_lock:
+            if db_path:
+                cls._db_path = db_path
+            if pool_size:
+                cls._pool_size = pool_size
+            if cls._pool:
+                cls._pool.close()
+                cls._pool = None
+
+    @classmethod
+    def close(cls) -> None:
+        """关闭连接池"""
+        with cls._pool_lock:
+            if cls._pool:
+                cls._pool.close()
+                cls._pool = None
+
+    @classmethod
+    def _get_pool(cls) -> ConnectionPool:
+        """获取连接池，首次使用时创建"""
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool(cls._db_path, max_size=cls._pool_size)
+        return cls._pool
+
+    @classmethod
+    def _get_connection(cls):
+        """获取数据库连接（上下文管理器，退出时归还连接池）"""
+        return cls._get_pool().connection()
+
+    @classmethod
+    def _query(cls, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """
+        执行只读SQL语句，不提交事务
+        :param sql: SQL语句
+        :param params: 参数元组
+        :return: 结果行
+        """
+        with cls._get_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @classmethod
+    @contextmanager
+    def transaction(cls) -> Iterator[sqlite3.Connection]:
+        """
+        开启事务，退出时提交，发生异常时回滚
+        事务内的写操作需将返回的连接通过conn参数传入insert/insert_many/update/delete等方法
+        """
+        with cls._get_connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @classmethod
+    def _write(cls, sql: str, params: tuple = (), conn: Optional[sqlite3.Connection] = None) -> sqlite3.Cursor:
+        """
+        执行写入SQL语句，未传入连接时使用独立连接并立即提交，传入连接时由外部事务负责提交
+        :param sql: SQL语句
+        :param params: 参数元组
+        :param conn: 外部事务的连接
+        :return: 游标对象
+        """
+        if conn is not None:
+            return conn.execute(sql, params)
+        with cls._get_connection() as conn:
+            return cls._execute(conn, sql, params)
 
     @staticmethod
     def _execute(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> sqlite3.Cursor:
         """
-        执行SQL语句
+        执行写入SQL语句并提交
         :param conn: 数据库连接
         :param sql: SQL语句
         :param params: 参数元组
@@ -37,17 +343,14 @@ class DBHelper:
     @classmethod
     def get_all_tables(cls) -> List[str]:
         """获取数据库中所有表名"""
-        with cls._get_connection() as conn:
-            cursor = cls._execute(conn,
-                                  "SELECT name FROM sqlite_master WHERE type='table' and name != 'sqlite_sequence'")
-            return [row['name'] for row in cursor.fetchall()]
+        rows = cls._query("SELECT name FROM sqlite_master WHERE type='table' and name != 'sqlite_sequence'")
+        return [row['name'] for row in rows]
 
     @classmethod
     def get_table_columns(cls, table_name: str) -> List[str]:
         """获取表的列名"""
-        with cls._get_connection() as conn:
-            cursor = cls._execute(conn, f"PRAGMA table_info({table_name})")
-            return [row['name'] for row in cursor.fetchall()]
+        rows = cls._query(f"PRAGMA table_info({table_name})")
+        return [row['name'] for row in rows]
 
     @classmethod
     def query_all(cls, table_name: str) -> List[Dict[str, Any]]:
@@ -56,9 +359,8 @@ class DBHelper:
         :param table_name: 表名
         :return: 包含所有行的列表，每行是一个字典
         """
-        with cls._get_connection() as conn:
-            cursor = cls._execute(conn, f"SELECT * FROM {table_name}")
-            return [dict(row) for row in cursor.fetchall()]
+        rows = cls._query(f"SELECT * FROM {table_name}")
+        return [dict(row) for row in rows]
 
     @classmethod
     def query_one(cls, table_name: str, condition: str = "", params: tuple = ()) -> Optional[Dict[str, Any]]:
@@ -69,14 +371,13 @@ class DBHelper:
         :param params: 条件参数
         :return: 单行数据字典或None
         """
-        with cls._get_connection() as conn:
-            sql = f"SELECT * FROM {table_name}"
-            if condition:
-                sql += f" WHERE {condition}"
-            sql += " LIMIT 1"
+        sql = f"SELECT * FROM {table_name}"
+        if condition:
+            sql += f" WHERE {condition}"
+        sql += " LIMIT 1"
 
-            cursor = cls._execute(conn, sql, params)
-            row = cursor.fetchone()
+        with cls._get_connection() as conn:
+            row = conn.execute(sql, params).fetchone()
             return dict(row) if row else None
 
     @classmethod
@@ -90,67 +391,103 @@ class DBHelper:
         :param limit: 返回的最大行数
         :return: 包含行的列表，每行是一个字典
         """
-        with cls._get_connection() as conn:
-            sql = f"SELECT * FROM {table_name}"
-            if condition:
-                sql += f" WHERE {condition}"
-            sql += f" LIMIT {limit}"
+        sql = f"SELECT * FROM {table_name}"
+        if condition:
+            sql += f" WHERE {condition}"
+        sql += f" LIMIT {limit}"
 
-            cursor = cls._execute(conn, sql, params)
-            return [dict(row) for row in cursor.fetchall()]
+        rows = cls._query(sql, params)
+        return [dict(row) for row in rows]
 
     @classmethod
-    def insert(cls, table_name: str, data: Dict[str, Any]) -> int:
+    def insert(cls, table_name: str, data: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> int:
         """
         插入数据
         :param table_name: 表名
         :param data: 要插入的数据字典
+        :param conn: 外部事务的连接，为空时单独提交
         :return: 插入行的ID
         """
-        with cls._get_connection() as conn:
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?'] * len(data))
-            sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        columns = ', '.join(data.keys())
+        placeholders = ', '.join(['?'] * len(data))
+        sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
 
-            cursor = cls._execute(conn, sql, tuple(data.values()))
-            return cursor.lastrowid
+        cursor = cls._write(sql, tuple(data.values()), conn)
+        return cursor.lastrowid
 
     @classmethod
-    def update(cls, table_name: str, data: Dict[str, Any], condition: str = "", params: tuple = ()) -> int:
+    def insert_many(cls, table_name: str, data_list: List[Dict[str, Any]],
+                    conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        批量插入数据，所有行在同一个事务中写入
+        :param table_name: 表名
+        :param data_list: 要插入的数据字典列表，每个字典的键需一致
+        :param conn: 外部事务的连接，为空时单独提交
+        :return: 插入的行数
+        """
+        if not data_list:
+            return 0
+
+        keys = list(data_list[0].keys())
+        columns = ', '.join(keys)
+        placeholders = ', '.join(['?'] * len(keys))
+        sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+
+        return cls.execute_many(sql, [tuple(data[key] for key in keys) for data in data_list], conn)
+
+    @classmethod
+    def execute_many(cls, sql: str, params_list: List[tuple], conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        使用同一条SQL批量写入，所有参数在同一个事务中执行
+        :param sql: SQL语句
+        :param params_list: 参数元组列表
+        :param conn: 外部事务的连接，为空时单独提交
+        :return: 影响的行数
+        """
+        if conn is not None:
+            return conn.executemany(sql, params_list).rowcount
+
+        with cls.transaction() as conn:
+            return conn.executemany(sql, params_list).rowcount
+
+    @classmethod
+    def update(cls, table_name: str, data: Dict[str, Any], condition: str = "", params: tuple = (),
+               conn: Optional[sqlite3.Connection] = None) -> int:
         """
         更新数据
         :param table_name: 表名
         :param data: 要更新的数据字典
         :param condition: WHERE条件语句（不包含WHERE关键字）
         :param params: 条件参数
+        :param conn: 外部事务的连接，为空时单独提交
         :return: 影响的行数
         """
-        with cls._get_connection() as conn:
-            set_clause = ', '.join([f"{key}=?" for key in data.keys()])
-            sql = f"UPDATE {table_name} SET {set_clause}"
-            if condition:
-                sql += f" WHERE {condition}"
+        set_clause = ', '.join([f"{key}=?" for key in data.keys()])
+        sql = f"UPDATE {table_name} SET {set_clause}"
+        if condition:
+            sql += f" WHERE {condition}"
 
-            values = tuple(data.values()) + params
-            cursor = cls._execute(conn, sql, values)
-            return cursor.rowcount
+        values = tuple(data.values()) + params
+        cursor = cls._write(sql, values, conn)
+        return cursor.rowcount
 
     @classmethod
-    def delete(cls, table_name: str, condition: str = "", params: tuple = ()) -> int:
+    def delete(cls, table_name: str, condition: str = "", params: tuple = (),
+               conn: Optional[sqlite3.Connection] = None) -> int:
         """
         删除数据
         :param table_name: 表名
         :param condition: WHERE条件语句（不包含WHERE关键字）
         :param params: 条件参数
+        :param conn: 外部事务的连接，为空时单独提交
         :return: 影响的行数
         """
-        with cls._get_connection() as conn:
-            sql = f"DELETE FROM {table_name}"
-            if condition:
-                sql += f" WHERE {condition}"
+        sql = f"DELETE FROM {table_name}"
+        if condition:
+            sql += f" WHERE {condition}"
 
-            cursor = cls._execute(conn, sql, params)
-            return cursor.rowcount
+        cursor = cls._write(sql, params, conn)
+        return cursor.rowcount
 
     @classmethod
     def query_by_sql(cls, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
@@ -160,6 +497,45 @@ class DBHelper:
         :param params: 条件参数
         :return: 包含行的列表，每行是一个字典
         """
-        with cls._get_connection() as conn:
-            cursor = cls._execute(conn, sql, params)
-            return [dict(row) for row in cursor.fetchall()]
+        rows = cls._query(sql, params)
+        return [dict(row) for row in rows]
+
+    @classmethod
+    def full_text_search(cls, table_name: str, column: str, keywords: List[str], limit: int = 100) -> List[
+        Dict[str, Any]]:
+        """
+        基于FTS5全文索引的模糊匹配，按相关度排序
+        :param table_name: 原表名，对应的全文索引表为 {table_name}_fts
+        :param column: 被索引的列名
+        :param keywords: 关键词列表，任意一个命中即可
+        :param limit: 返回的最大行数
+        :return: 包含id和被索引列的字典列表，相关度高的在前
+        """
+        keywords = [x.strip() for x in keywords if x and x.strip()]
+        if not keywords:
+            return []
+
+        fts_table = f"{table_name}_fts"
+        long_keywords = [x for x in keywords if len(x) >= cls._trigram_min_length]
+        short_keywords = [x for x in keywords if len(x) < cls._trigram_min_length]
+
+        result = {}
+        if long_keywords:
+            # 每个关键词作为FTS5字符串短语，避免其中的特殊字符被解析为查询语法
+            match_expression = " OR ".join('"' + x.replace('"', '""') + '"' for x in long_keywords)
+            sql = (f"SELECT rowid AS id, {column} FROM {fts_table} "
+                   f"WHERE {fts_table} MATCH ? ORDER BY rank LIMIT ?")
+            for row in cls._query(sql, (match_expression, limit)):
+                result[row["id"]] = dict(row)
+
+        if short_keywords and len(result) < limit:
+            condition = " OR ".join([f"{column} LIKE ? ESCAPE '\\'"] * len(short_keywords))
+            params = tuple(
+                "%" + x.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                for x in short_keywords
+            )
+            sql = f"SELECT rowid AS id, {column} FROM {fts_table} WHERE {condition} LIMIT ?"
+            for row in cls._query(sql, params + (limit,)):
+                result.setdefault(row["id"], dict(row))
+
+        return list(result.values())[:limit]
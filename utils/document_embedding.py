@@ -1,48 +1,81 @@
-import copy
+import hashlib
+import multiprocessing
 import os
-import re
-import uuid
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Union, Optional, Tuple, Callable, Any, Iterator
 
-import chromadb
-from llama_index.core import SimpleDirectoryReader, StorageContext, VectorStoreIndex
+from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import Document as LlamaindexDocument
-from llama_index.embeddings.dashscope import DashScopeEmbedding, DashScopeTextEmbeddingModels
-from llama_index.vector_stores.chroma import ChromaVectorStore
+from llama_index.core.readers.file.base import default_file_metadata_func
+from llama_index.core.schema import Document as LlamaindexDocument, BaseNode, TextNode, MetadataMode
 
+from utils.chapter_extractor import ChapterExtractor, chapter_titles_to_metadata, EXTRA_CHAPTER_TITLE_KEYS
+from utils.classification_shards import ClassificationShards
+from utils.corpus_version import CorpusVersion
 from utils.db_helper import DBHelper
+from utils.document_index import DocumentIndex
+from utils.lexical_index import LexicalIndex
 from utils.logger import logger
+from utils.model_provider import ModelProvider
+from utils.stream_readers import STREAM_READERS
+from utils.vector_store_registry import VectorStoreRegistry, VectorStoreHandle
+
+# 解析进程内的文本切分器，由进程池初始化时创建
+_worker_node_parser: Optional[SentenceSplitter] = None
+
+
+def _init_parse_worker(chunk_size: int, chunk_overlap: int):
+    """解析进程初始化"""
+    global _worker_node_parser
+    _worker_node_parser = SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        include_metadata=True
+    )
+
+
+def _parse_in_worker(classification_name: str, file_path: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """在解析进程中读取、切分文档并提取章节，返回序列化的节点和章节标题"""
+    nodes, chapter_titles = DocumentEmbedding._process_generic(
+        classification_name, Path(file_path), _worker_node_parser
+    )
+    return [node.to_dict() for node in nodes], chapter_titles
 
 
 class DocumentEmbedding:
     """多格式文档向量化存储工具类"""
 
+    # 流式读取时每积累这么多字符切分一批文本块
+    _stream_batch_chars = 200000
+    # 与SimpleDirectoryReader一致，文件属性不参与向量化和LLM上下文
+    _file_metadata_excluded_keys = [
+        "file_name", "file_type", "file_size", "creation_date", "last_modified_date", "last_accessed_date"
+    ]
+
     @classmethod
     def initialize(
             cls,
             collection_name: str = "documents",
             persist_dir: Optional[str] = None,
             chunk_size: int = 512,
-            chunk_overlap: int = 50
+            chunk_overlap: int = 50,
+            parse_workers: Optional[int] = None
     ):
-        """初始化向量存储配置(只需调用一次)"""
-
-        if not persist_dir:
-            # 获取当前文件的目录，然后返回上一级目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            persist_dir = os.path.join(parent_dir, "chroma_db")
-            cls._client = chromadb.PersistentClient(path=persist_dir)
-        else:
-            cls._client = chromadb.PersistentClient(path=persist_dir)
-
-        cls._collection = cls._client.get_or_create_collection(name=collection_name)
+        """
+        初始化向量存储配置(只需调用一次)
 
-        cls._vector_store = ChromaVectorStore(chroma_collection=cls._collection)
+        参数:
+            parse_workers: 文档解析切分的进程数，默认为CPU核数，为0时在当前进程中解析
+        """
 
-        cls._storage_context = StorageContext.from_defaults(vector_store=cls._vector_store)
+        # 与DocumentQueryEngine共用同一个客户端和向量存储
+        cls._bind(VectorStoreRegistry.get(collection_name, persist_dir))
+        DocumentIndex.initialize(collection_name, persist_dir)
+        ClassificationShards.configure(collection_name=collection_name, persist_dir=persist_dir)
 
         cls._node_parser = SentenceSplitter(
             chunk_size=chunk_size,
@@ -50,10 +83,17 @@ class DocumentEmbedding:
             include_metadata=True
         )
 
-        cls._embed_model = DashScopeEmbedding(
-            model_name=DashScopeTextEmbeddingModels.TEXT_EMBEDDING_V3,
-            embed_batch_size=5,
-        )
+        cls._embed_model = ModelProvider.get_embed_model()
+
+        # 解析切分是纯CPU计算，放到独立进程中执行，避免占用GIL阻塞API进程
+        if parse_workers is None:
+            parse_workers = os.cpu_count() or 1
+        cls._parse_executor = ProcessPoolExecutor(
+            max_workers=parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker,
+            initargs=(chunk_size, chunk_overlap)
+        ) if parse_workers > 0 else None
 
         # 默认支持的文档格式映射
         cls._default_ext = ['.csv', '.docx', '.pptx', '.epub', '.txt', '.md', '.pdf', '.mobx', '.ipynb']
@@ -61,17 +101,62 @@ class DocumentEmbedding:
         cls._custom_support_ext = ['.json', '.html', '.xlsx']
 
     @classmethod
-    def vectorize_document(cls, document_id: int, classification_name: str, file_path: Union[str, Path]) -> None:
+    def _bind(cls, handle: VectorStoreHandle) -> None:
+        """使用集合句柄写入，集合重建换入后重新调用"""
+        cls._handle = handle
+        cls._client = handle.client
+        cls._collection = handle.collection
+        cls._vector_store = handle.vector_store
+        cls._storage_context = handle.storage_context
+
+    @classmethod
+    def shutdown(cls):
+        """关闭解析进程池"""
+        if getattr(cls, '_parse_executor', None):
+            cls._parse_executor.shutdown(wait=True, cancel_futures=True)
+            cls._parse_executor = None
+
+    @classmethod
+    def parse_document(cls, classification_name: str, file_path: Path) -> Tuple[List[BaseNode], List[str]]:
         """
-        向量化单个文档并存储
+        读取并切分通用格式文档，提取章节信息
 
         参数:
-            document_id: 文档id
+            classification_name: 文档分类
             file_path: 文档路径
+
+        返回:
+            (待向量化的节点, 文档的全部章节标题)
+        """
+        if not cls._parse_executor:
+            return cls._process_generic(classification_name, file_path)
+
+        future = cls._parse_executor.submit(_parse_in_worker, classification_name, str(file_path))
+        node_dicts, chapter_titles = future.result()
+        return [TextNode.from_dict(x) for x in node_dicts], chapter_titles
+
+    @classmethod
+    def vectorize_document(
+            cls,
+            classification_id: int,
+            classification_name: str,
+            file_path: Union[str, Path],
+            max_retries: int = 3,
+            stage_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> int:
+        """
+        向量化单个文档并存储，文档记录、章节标题和向量作为一个整体写入
+        同名文档已存在时增量更新，只向量化新增或修改的文本块
+
+        参数:
+            classification_id: 文档分类id
             classification_name: 文档分类
+            file_path: 文档路径，文件名即文档名
+            max_retries: 写入失败时的最大尝试次数
+            stage_callback: 每个阶段完成后的回调，参数为该阶段的统计信息（文本块数量、耗时）
 
         返回:
-            插入的文本块数量
+            文档id
         """
         if not hasattr(cls, '_collection'):
             cls.initialize()
@@ -80,125 +165,424 @@ class DocumentEmbedding:
         if not file_path.exists():
             raise FileNotFoundError(f"文件不存在: {file_path}")
 
+        def report(stats: Dict[str, Any]):
+            if stage_callback:
+                stage_callback(stats)
+
+        document = DBHelper.query_one("documents", "name=?", (file_path.name,))
+        if not document and file_path.suffix.lower() in cls._custom_support_ext:
+            return cls._vectorize_streaming(classification_id, classification_name, file_path, max_retries, report)
+
+        start = time.perf_counter()
+        nodes, chapter_titles = cls.load_nodes(classification_name, file_path)
+        report({"chunk_count": len(nodes), "parse_seconds": time.perf_counter() - start})
+
+        if document:
+            return cls._update_document(document["id"], document["name"], classification_id,
+                                        document["classification_id"], nodes, chapter_titles, report)
+
+        # 向量化在写入之前完成，写入失败重试时无需再次调用向量化接口
+        start = time.perf_counter()
+        nodes = cls.embed_nodes(nodes)
+        report({"embed_seconds": time.perf_counter() - start, "embedded_count": len(nodes)})
+
+        start = time.perf_counter()
+        document_id = cls.save_document(classification_id, file_path.name, nodes, chapter_titles, max_retries)
+        report({"write_seconds": time.perf_counter() - start})
+        return document_id
+
+    @classmethod
+    def load_nodes(cls, classification_name: str, file_path: Path) -> Tuple[List[BaseNode], List[str]]:
+        """
+        按文件格式读取并切分文档
+
+        参数:
+            classification_name: 文档分类
+            file_path: 文档路径
+
+        返回:
+            (待向量化的节点, 文档的全部章节标题)
+        """
         file_ext = file_path.suffix.lower()
         if file_ext in cls._default_ext:
-            cls._process_generic(document_id, classification_name, file_path)
+            nodes, chapter_titles = cls.parse_document(classification_name, file_path)
         elif file_ext in cls._custom_support_ext:
-            pass
+            chapter_titles = []
+            nodes = [node for batch in cls.iter_custom_nodes(classification_name, file_path, chapter_titles)
+                     for node in batch]
+            return nodes, chapter_titles
         else:
             raise ValueError(f"不支持的文件格式: {file_ext}")
 
-    @classmethod
-    def get_supported_formats(cls) -> List[str]:
-        """获取支持的文档格式列表"""
-        return cls._default_ext + cls._custom_support_ext
+        cls._assign_content_hashes(nodes)
+        return nodes, chapter_titles
 
     @classmethod
-    def _process_generic(cls, document_id: int, classification_name: str, file_path: Path) -> None:
-        """处理默认的通用文档格式"""
-        reader = SimpleDirectoryReader(input_files=[str(file_path)])
-        documents = reader.load_data()
-        nodes = cls._node_parser.get_nodes_from_documents(documents)
-
-        chapter_title = None
-        all_chapter_title = set()
+    def iter_custom_nodes(cls, classification_name: str, file_path: Path,
+                          chapter_titles: List[str]) -> Iterator[List[BaseNode]]:
+        """
+        流式读取拓展格式的文档，按批产出切分好的节点，内存中只保留当前一批文本
 
-        # 声明一个待添加的node，当某个node有多个章节时，复制一个node修改其元数据的章节信息，并添加到need_append_nodes中
-        need_append_nodes = []
+        参数:
+            classification_name: 文档分类
+            file_path: 文档路径
+            chapter_titles: 读取完成后写入文档的全部章节标题
 
-        for node in nodes:
-            chapter_titles = cls._extract_chapters(node.text)
+        返回:
+            每批待向量化的节点
+        """
+        read_blocks = STREAM_READERS[file_path.suffix.lower()]
+        chapter_extractor = ChapterExtractor.for_file_type(file_path.suffix)
+        metadata = default_file_metadata_func(str(file_path))
+        # 章节状态跨批次延续
+        chapter_state = {"current": None, "all": dict.fromkeys(chapter_titles)}
+
+        def to_nodes(text: str) -> List[BaseNode]:
+            document = LlamaindexDocument(
+                text=text,
+                metadata=dict(metadata),
+                excluded_embed_metadata_keys=list(cls._file_metadata_excluded_keys),
+                excluded_llm_metadata_keys=list(cls._file_metadata_excluded_keys),
+            )
+            nodes = cls._node_parser.get_nodes_from_documents([document])
+            cls._annotate_chapters(nodes, classification_name, chapter_extractor, chapter_state)
+            cls._assign_content_hashes(nodes)
+            return nodes
+
+        buffer, size = [], 0
+        for block in read_blocks(file_path):
+            buffer.append(block)
+            size += len(block)
+            if size >= cls._stream_batch_chars:
+                yield to_nodes("".join(buffer))
+                buffer, size = [], 0
+        if size:
+            yield to_nodes("".join(buffer))
+        chapter_titles[:] = list(chapter_state["all"])
 
-            if chapter_titles:
-                if chapter_title:
-                    temp_node = copy.deepcopy(node)
-                    node.node_id = str(uuid.uuid4())
-                    temp_node.metadata["chapter_title"] = chapter_title
-                    temp_node.metadata["classification"] = classification_name
-                    need_append_nodes.append(temp_node)
+    @classmethod
+    def _vectorize_streaming(
+            cls,
+            classification_id: int,
+            classification_name: str,
+            file_path: Path,
+            max_retries: int,
+            report: Callable[[Dict[str, Any]], None]
+    ) -> int:
+        """
+        流式向量化新文档，每批节点切分后立即向量化并写入向量库，不在内存中保留整个文档
+        文档记录和章节标题在全部向量写入后提交，任何一步失败都会清理已写入的向量
 
-                chapter_title = chapter_titles.pop()
-                all_chapter_title.add(chapter_title)
+        返回:
+            文档id
+        """
+        chapter_titles = []
+        chunk_count = 0
+        parse_seconds = embed_seconds = write_seconds = 0.0
+        try:
+            # 清理上次入库中断（进程退出，未能执行下面的清理）时留下的文本块
+            cls._delete_document_nodes(file_path.name, classification_id)
+            start = time.perf_counter()
+            for nodes in cls.iter_custom_nodes(classification_name, file_path, chapter_titles):
+                parse_seconds += time.perf_counter() - start
+
+                start = time.perf_counter()
+                nodes = cls.embed_nodes(nodes)
+                embed_seconds += time.perf_counter() - start
+
+                start = time.perf_counter()
+                if nodes:
+                    cls._add_nodes(nodes, classification_id)
+                write_seconds += time.perf_counter() - start
+                chunk_count += len(nodes)
+                start = time.perf_counter()
+            parse_seconds += time.perf_counter() - start
+            report({"chunk_count": chunk_count, "parse_seconds": parse_seconds})
+            report({"embed_seconds": embed_seconds, "embedded_count": chunk_count})
+
+            start = time.perf_counter()
+            for attempt in range(1, max_retries + 1):
+                try:
+                    document_id = cls._insert_document(classification_id, file_path.name, chapter_titles)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        raise
+                    logger.warning(f"文档写入失败，第{attempt}次重试: {e}")
+            report({"write_seconds": write_seconds + time.perf_counter() - start})
+        except Exception:
+            cls._delete_document_nodes(file_path.name, classification_id)
+            raise
+        DocumentIndex.refresh(cls._store(classification_id).collection, file_path.name)
+        return document_id
 
-            node.metadata["chapter_title"] = chapter_title
-            node.metadata["classification"] = classification_name
+    @staticmethod
+    def _assign_content_hashes(nodes: List[BaseNode]) -> None:
+        """
+        计算每个文本块的内容哈希并写入元数据，增量更新时据此判断文本块是否变化
+        文件路径每次上传都不同，不参与向量化，以保证相同内容的文本块向量化输入一致
+        """
+        for node in nodes:
+            for keys in (node.excluded_embed_metadata_keys, node.excluded_llm_metadata_keys):
+                for key in ("file_path", "content_hash"):
+                    if key not in keys:
+                        keys.append(key)
+            content = node.get_content(metadata_mode=MetadataMode.EMBED)
+            node.metadata["content_hash"] = hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-            while chapter_titles:
-                temp_chapter_title = chapter_titles.pop()
-                all_chapter_title.add(temp_chapter_title)
+    @classmethod
+    def embed_nodes(cls, nodes: List[BaseNode]) -> List[BaseNode]:
+        """
+        向量化节点，向量写入node.embedding
 
-                temp_node = copy.deepcopy(node)
-                node.node_id = str(uuid.uuid4())
-                temp_node.metadata["chapter_title"] = temp_chapter_title
-                temp_node.metadata["classification"] = classification_name
-                need_append_nodes.append(temp_node)
+        参数:
+            nodes: 待向量化的节点
 
-                chapter_title = temp_chapter_title
+        返回:
+            向量化后的节点
+        """
+        return cls._embed_model(nodes)
 
-        nodes += need_append_nodes
+    @classmethod
+    def save_document(cls, classification_id: int, document_name: str, nodes: List[BaseNode],
+                      chapter_titles: List[str], max_retries: int = 3) -> int:
+        """
+        写入已向量化的文档，失败时整体回滚并重试
 
-        VectorStoreIndex(
-            nodes,
-            embed_model=cls._embed_model,
-            storage_context=cls._storage_context,
-            store_nodes_override=True
-        )
+        参数:
+            classification_id: 文档分类id
+            document_name: 文档名
+            nodes: 已向量化的节点
+            chapter_titles: 文档的全部章节标题
+            max_retries: 最大尝试次数
 
-        for title in all_chapter_title:
+        返回:
+            文档id
+        """
+        for attempt in range(1, max_retries + 1):
             try:
-                DBHelper.insert("document_titles", {"document_id": document_id, "title": title})
+                document_id = cls._persist(classification_id, document_name, nodes, chapter_titles)
+                break
             except Exception as e:
-                logger.error(f"插入文档标题失败: {e}")
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"文档写入失败，第{attempt}次重试: {e}")
+        DocumentIndex.refresh(cls._store(classification_id).collection, document_name)
+        return document_id
+
+    @classmethod
+    def _persist(cls, classification_id: int, document_name: str, nodes: List[BaseNode],
+                 chapter_titles: List[str]) -> int:
+        """
+        写入向量、文档记录和章节标题
+        数据库写入在同一个事务中完成，任何一步失败都会回滚事务并清理已写入的向量；
+        写入前先清理上次入库中断（进程退出，未能执行清理）时留下的文本块，重新入库不会产生重复
+        """
+        try:
+            cls._delete_document_nodes(document_name, classification_id)
+            if nodes:
+                cls._add_nodes(nodes, classification_id)
+            return cls._insert_document(classification_id, document_name, chapter_titles)
+        except Exception:
+            cls._delete_document_nodes(document_name, classification_id)
+            raise
 
     @classmethod
-    def _process_html(cls, file_path: Path, metadata: Dict) -> List[LlamaindexDocument]:
-        """处理HTML文件"""
-        from bs4 import BeautifulSoup
+    def _store(cls, classification_id: int) -> VectorStoreHandle:
+        """文本块所在的集合，按分类分片时为分类的分片集合"""
+        if ClassificationShards.enabled():
+            return ClassificationShards.handle(classification_id)
+        return cls._handle
+
+    @classmethod
+    def _add_nodes(cls, nodes: List[BaseNode], classification_id: int) -> None:
+        """写入向量库和关键词索引"""
+        with VectorStoreRegistry.writing():
+            cls._store(classification_id).vector_store.add(nodes)
+            LexicalIndex.add(nodes)
+            CorpusVersion.bump()
+
+    @classmethod
+    def _delete_document_nodes(cls, document_name: str, classification_id: int) -> None:
+        """从向量库和关键词索引中删除文档的全部文本块"""
+        with VectorStoreRegistry.writing():
+            cls._store(classification_id).collection.delete(where={"file_name": document_name})
+            LexicalIndex.delete_document(document_name)
+            DocumentIndex.delete(document_name)
+            CorpusVersion.bump()
+
+    @classmethod
+    def _delete_nodes(cls, node_ids: List[str], classification_id: int) -> None:
+        """从向量库和关键词索引中删除文本块"""
+        with VectorStoreRegistry.writing():
+            cls._store(classification_id).collection.delete(ids=node_ids)
+            LexicalIndex.delete_nodes(node_ids)
+            CorpusVersion.bump()
+
+    @staticmethod
+    def _insert_document(classification_id: int, document_name: str, chapter_titles: List[str]) -> int:
+        """在同一个事务中写入文档记录和章节标题"""
+        with DBHelper.transaction() as conn:
+            document_id = DBHelper.insert(
+                "documents",
+                {
+                    'classification_id': classification_id,
+                    'name': document_name,
+                },
+                conn=conn
+            )
+            DBHelper.insert_many(
+                "document_titles",
+                [{"document_id": document_id, "title": title} for title in chapter_titles],
+                conn=conn
+            )
+        CorpusVersion.bump()
+        return document_id
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f.read(), 'html.parser')
+    @classmethod
+    def _update_document(
+            cls,
+            document_id: int,
+            document_name: str,
+            classification_id: int,
+            previous_classification_id: int,
+            nodes: List[BaseNode],
+            chapter_titles: List[str],
+            report: Callable[[Dict[str, Any]], None]
+    ) -> int:
+        """
+        增量更新已存在的文档
+        内容哈希未变的文本块保留原向量，只向量化并写入新增或修改的文本块，删除已不存在的文本块，
+        章节标题按差异增删。按分类分片且文档换了分类时，全部文本块写入新分片，原分片中的全部删除
 
-        # 清理HTML标签
-        for element in soup(['script', 'style', 'header', 'footer', 'nav']):
-            element.decompose()
+        参数:
+            previous_classification_id: 文档原来的分类id
 
-        text = soup.get_text(strip=True)
+        返回:
+            文档id
+        """
+        collection = cls._store(classification_id).collection
+        previous_collection = cls._store(previous_classification_id).collection
+        stored = previous_collection.get(where={"file_name": document_name}, include=["metadatas"])
+        # 按内容哈希匹配已存储的文本块，相同内容可能出现多次
+        stored_ids = defaultdict(list)
+        if previous_collection is collection:
+            for node_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                stored_ids[(metadata or {}).get("content_hash")].append(node_id)
+        else:
+            stored_ids[None] = list(stored["ids"])
 
-        nodes = cls._node_parser.split_text(text)
+        changed_nodes = []
         for node in nodes:
-            node.metadata.update({
-                **metadata,
-                "file_path": str(file_path),
-                "file_type": file_path.suffix,
-                "document_title": soup.title.string if soup.title else "Untitled"
-            })
+            ids = stored_ids.get(node.metadata["content_hash"])
+            if ids:
+                ids.pop()
+            else:
+                changed_nodes.append(node)
+        removed_ids = [node_id for ids in stored_ids.values() for node_id in ids]
+
+        start = time.perf_counter()
+        changed_nodes = cls.embed_nodes(changed_nodes)
+        report({"embed_seconds": time.perf_counter() - start, "embedded_count": len(changed_nodes)})
+
+        start = time.perf_counter()
+        stored_titles = {
+            row["title"] for row in DBHelper.query_by_sql(
+                "SELECT title FROM document_titles WHERE document_id=?", (document_id,)
+            )
+        }
+        try:
+            if changed_nodes:
+                cls._add_nodes(changed_nodes, classification_id)
+
+            with DBHelper.transaction() as conn:
+                DBHelper.update(
+                    "documents",
+                    {
+                        "classification_id": classification_id,
+                        "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    },
+                    "id=?",
+                    (document_id,),
+                    conn=conn
+                )
+                DBHelper.execute_many(
+                    "DELETE FROM document_titles WHERE document_id=? AND title=?",
+                    [(document_id, title) for title in stored_titles.difference(chapter_titles)],
+                    conn=conn
+                )
+                DBHelper.insert_many(
+                    "document_titles",
+                    [{"document_id": document_id, "title": title}
+                     for title in chapter_titles if title not in stored_titles],
+                    conn=conn
+                )
+        except Exception:
+            if changed_nodes:
+                cls._delete_nodes([node.node_id for node in changed_nodes], classification_id)
+            raise
+
+        if removed_ids:
+            cls._delete_nodes(removed_ids, previous_classification_id)
+        DocumentIndex.refresh(collection, document_name)
+        CorpusVersion.bump()
+        report({"write_seconds": time.perf_counter() - start, "removed_count": len(removed_ids)})
+        logger.info(f"增量更新文档：{document_name}，新增或修改{len(changed_nodes)}个文本块，删除{len(removed_ids)}个")
+
+        return document_id
 
-        return nodes
+    @classmethod
+    def get_supported_formats(cls) -> List[str]:
+        """获取支持的文档格式列表"""
+        return cls._default_ext + cls._custom_support_ext
 
     @classmethod
-    def _process_json(cls, file_path: Path, metadata: Dict) -> List[LlamaindexDocument]:
-        """处理JSON文件"""
-        pass
+    def _process_generic(
+            cls,
+            classification_name: str,
+            file_path: Path,
+            node_parser: Optional[SentenceSplitter] = None
+    ) -> Tuple[List[BaseNode], List[str]]:
+        """
+        处理默认的通用文档格式
+
+        参数:
+            node_parser: 文本切分器，为空时使用初始化时创建的切分器
+
+        返回:
+            (待向量化的节点, 文档的全部章节标题)
+        """
+        node_parser = node_parser or cls._node_parser
+        chapter_extractor = ChapterExtractor.for_file_type(file_path.suffix)
+        reader = SimpleDirectoryReader(input_files=[str(file_path)])
+        documents = reader.load_data()
+        nodes = node_parser.get_nodes_from_documents(documents)
+
+        chapter_state = {"current": None, "all": {}}
+        cls._annotate_chapters(nodes, classification_name, chapter_extractor, chapter_state)
+        return nodes, list(chapter_state["all"])
 
     @staticmethod
-    def _extract_chapters(text: str) -> List[str]:
-        """从文本中提取章节结构"""
-        # 支持多级标题检测
-        patterns = [
-            re.compile(r'^(#+)\s+(.+)$', re.MULTILINE),  # Markdown
-            re.compile(r'^(\d+(?:\.\d+)*)\s+(.+)$', re.MULTILINE),
-            # 数字标题
-            re.compile(r'^([A-Z][A-Z0-9 ]+)$', re.MULTILINE),  # 全大写标题
-            re.compile(r'^第[一二三四五六七八九十]+章\s+.+$', re.MULTILINE)  # 中文章节
-        ]
-
-        chapters = []
-        lines = text.split('\n')
-
-        for line in lines:
-            for pattern in patterns:
-                match = pattern.match(line)
-                if match:
-                    chapters.append(line)
-
-        return chapters
+    def _annotate_chapters(nodes: List[BaseNode], classification_name: str, chapter_extractor: ChapterExtractor,
+                           chapter_state: Dict[str, Any]) -> None:
+        """
+        识别文本块中的章节并写入元数据
+
+        参数:
+            chapter_state: current为当前所在的章节，即之前的文本块中最后出现的章节；
+                           all为已识别的全部章节标题（有序去重）。分批处理时跨批次传入同一个状态
+        """
+        # 一个文本块跨越多个章节时，所有章节都记录在同一个节点的元数据中，不再复制节点
+        for node in nodes:
+            chapter_title = chapter_state["current"]
+            chapter_titles = [x.title for x in chapter_extractor.extract(node.text)]
+            node_chapter_titles = list(dict.fromkeys(([chapter_title] if chapter_title else []) + chapter_titles))
+
+            if chapter_titles:
+                chapter_state["current"] = chapter_titles[-1]
+                chapter_state["all"].update(dict.fromkeys(chapter_titles))
+
+            node.metadata.update(chapter_titles_to_metadata(node_chapter_titles))
+            node.metadata["classification"] = classification_name
+            node.excluded_embed_metadata_keys = node.excluded_embed_metadata_keys + EXTRA_CHAPTER_TITLE_KEYS
+            node.excluded_llm_metadata_keys = node.excluded_llm_metadata_keys + EXTRA_CHAPTER_TITLE_KEYS
@@ -0,0 +1,245 @@
+import asyncio
+from typing import List, Optional, Dict, Any, Tuple, Iterable
+
+import numpy as np
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterOperator, FilterCondition
+
+from utils.classification_shards import ClassificationShards
+from utils.logger import logger
+from utils.vector_store_registry import VectorStoreRegistry
+
+
+class DocumentIndex:
+    """
+    文档级向量索引
+    每个文档一个向量（全部文本块向量的归一化均值），连同文档的文件属性存放在单独的Chroma集合中，
+    与文本块一起写入和删除。查询时先在文档级选出候选文档，再只在这些文档的文本块中检索；
+    只关心文件名、分类、日期的元数据查询可以直接由文档级回答
+    """
+
+    _collection = None
+    # 写入文档级的文本块元数据，文本块的章节等其他元数据不写入
+    _metadata_keys = ("file_name", "classification", "file_type", "file_size", "creation_date", "last_modified_date")
+
+    @classmethod
+    def initialize(cls, collection_name: str = "documents", persist_dir: Optional[str] = None) -> None:
+        """
+        打开文档级集合，使用余弦距离
+        :param collection_name: 文本块集合名，文档级集合名为其后加 _documents
+        :param persist_dir: 持久化目录
+        """
+        cls._collection = VectorStoreRegistry.get_collection(
+            f"{collection_name}_documents", persist_dir, metadata={"hnsw:space": "cosine"}
+        )
+
+    @classmethod
+    def count(cls) -> int:
+        """已索引的文档数量"""
+        return cls._collection.count()
+
+    @classmethod
+    def refresh(cls, chunk_collection, document_name: str) -> None:
+        """
+        按文本块重新计算文档向量，文档已没有文本块时删除
+        :param chunk_collection: 文本块集合
+        :param document_name: 文档名
+        """
+        entries = cls._aggregate(chunk_collection, where={"file_name": document_name})
+        if entries:
+            cls._upsert(entries)
+        else:
+            cls.delete(document_name)
+
+    @classmethod
+    def rebuild(cls, chunk_collections: List, batch_size: int = 5000) -> int:
+        """
+        按全部文本块重建文档级索引
+        :param chunk_collections: 存放文本块的集合
+        :param batch_size: 每批读取的文本块数量
+        :return: 索引的文档数量
+        """
+        entries = {}
+        for chunk_collection in chunk_collections:
+            entries.update(cls._aggregate(chunk_collection, batch_size=batch_size))
+        stale = set(cls._collection.get(include=[])["ids"]).difference(entries)
+        if stale:
+            cls._collection.delete(ids=list(stale))
+        cls._upsert(entries, batch_size)
+        logger.info(f"文档级索引重建完成，共{len(entries)}个文档")
+        return len(entries)
+
+    @classmethod
+    def delete(cls, document_name: str) -> None:
+        """删除文档"""
+        cls._collection.delete(ids=[document_name])
+
+    @classmethod
+    def update_classification(cls, old: str, new: str) -> int:
+        """
+        把分类为old的文档改为new
+        :return: 更新的文档数量
+        """
+        stored = cls._collection.get(where={"classification": old}, include=["metadatas"])
+        if not stored["ids"]:
+            return 0
+        for metadata in stored["metadatas"]:
+            metadata["classification"] = new
+        cls._collection.update(ids=stored["ids"], metadatas=stored["metadatas"])
+        return len(stored["ids"])
+
+    @classmethod
+    def search(
+            cls,
+            embedding: Embedding,
+            limit: int,
+            where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        按查询向量检索文档
+        :param embedding: 查询向量
+        :param limit: 返回的最大数量
+        :param where: Chroma的元数据过滤条件，只能使用文档级的元数据
+        :return: (文档名, 余弦相似度, 文档元数据)列表，相似度高的在前
+        """
+        result = cls._collection.query(
+            query_embeddings=[embedding], n_results=limit, where=where or None, include=["metadatas", "distances"]
+        )
+        return [
+            (document_name, 1.0 - distance, metadata)
+            for document_name, distance, metadata in zip(result["ids"][0], result["distances"][0],
+                                                         result["metadatas"][0])
+        ]
+
+    @classmethod
+    def where(cls, filters: Optional[MetadataFilters]) -> Optional[Dict[str, Any]]:
+        """
+        从文本块的过滤器中取出文档级能使用的条件（顶层AND条件中的文件属性），转换为Chroma的where条件
+        其余条件只在文本块检索时应用，因此文档级的结果是满足全部条件的文档的超集
+        """
+        if filters is None or (filters.condition or FilterCondition.AND) != FilterCondition.AND:
+            return None
+        conditions = [
+            {item.key: {"$in" if item.operator == FilterOperator.IN else "$eq": item.value}}
+            for item in filters.filters
+            if isinstance(item, MetadataFilter) and item.key in cls._metadata_keys
+            and item.operator in (FilterOperator.IN, FilterOperator.EQ)
+        ]
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    @classmethod
+    def _aggregate(cls, chunk_collection, where: Optional[Dict[str, Any]] = None,
+                   batch_size: int = 5000) -> Dict[str, Dict[str, Any]]:
+        """
+        分批读取文本块向量，按文档累加，返回 文档名 -> {sum, count, metadata}
+        分类分片中的文本块以所在分片的分类为准
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        classification = ClassificationShards.classification_name(chunk_collection)
+        offset = 0
+        while True:
+            batch = chunk_collection.get(
+                where=where, limit=batch_size, offset=offset, include=["embeddings", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+            for embedding, metadata in zip(batch["embeddings"], batch["metadatas"]):
+                metadata = metadata or {}
+                name = metadata.get("file_name", "")
+                entry = entries.get(name)
+                if entry is None:
+                    entry = entries[name] = {
+                        "sum": np.zeros(len(embedding), dtype=np.float64),
+                        "count": 0,
+                        "metadata": {key: metadata[key] for key in cls._metadata_keys
+                                     if metadata.get(key) is not None},
+                    }
+                    if classification is not None:
+                        entry["metadata"]["classification"] = classification
+                entry["sum"] += embedding
+                entry["count"] += 1
+            offset += len(batch["ids"])
+        return entries
+
+    @classmethod
+    def _upsert(cls, entries: Dict[str, Dict[str, Any]], batch_size: int = 5000) -> None:
+        """写入文档向量（归一化的均值）和元数据"""
+        names = list(entries)
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            embeddings = []
+            for name in batch:
+                vector = entries[name]["sum"]
+                norm = np.linalg.norm(vector)
+                embeddings.append((vector / norm if norm else vector).tolist())
+            cls._collection.upsert(
+                ids=batch,
+                embeddings=embeddings,
+                metadatas=[{**entries[name]["metadata"], "chunk_count": entries[name]["count"]} for name in batch]
+            )
+
+
+class DocumentRoutedRetriever(BaseRetriever):
+    """
+    两级检索器
+    先在文档级选出最相似的若干文档，再只在这些文档的文本块中做向量检索。
+    文档总数不超过候选数量时路由没有意义，直接检索全部文本块
+    """
+
+    def __init__(
+            self,
+            index: VectorStoreIndex,
+            embed_model: BaseEmbedding,
+            top_k: int,
+            candidates: int,
+            filters: Optional[MetadataFilters] = None
+    ):
+        """
+        :param index: 文本块索引
+        :param embed_model: 查询向量模型，文档级和文本块检索共用同一个查询向量
+        :param top_k: 返回的最大数量
+        :param candidates: 文档级选出的候选文档数
+        :param filters: 本次查询的过滤器
+        """
+        super().__init__()
+        self._index = index
+        self._embed_model = embed_model
+        self._top_k = top_k
+        self._candidates = candidates
+        self._filters = filters
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        document_names = self._route(query_bundle.embedding)
+        if document_names == []:
+            return []
+        return self._chunk_retriever(document_names).retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        document_names = await asyncio.to_thread(self._route, query_bundle.embedding)
+        if document_names == []:
+            return []
+        return await self._chunk_retriever(document_names).aretrieve(query_bundle)
+
+    def _route(self, embedding: Embedding) -> Optional[List[str]]:
+        """候选文档名，不需要路由时为None"""
+        if DocumentIndex.count() <= self._candidates:
+            return None
+        return [name for name, _, _ in DocumentIndex.search(embedding, self._candidates,
+                                                            DocumentIndex.where(self._filters))]
+
+    def _chunk_retriever(self, document_names: Optional[Iterable[str]]) -> BaseRetriever:
+        """在候选文档范围内检索文本块的检索器"""
+        filters = self._filters
+        if document_names is not None:
+            routed = MetadataFilter(key="file_name", operator=FilterOperator.IN, value=list(document_names))
+            filters = MetadataFilters(filters=[filters, routed] if filters is not None else [routed])
+        return self._index.as_retriever(similarity_top_k=self._top_k, filters=filters)
@@ -1,56 +1,301 @@
+import asyncio
 import os
-from typing import List, Optional, Dict, Any
-
-import chromadb
-from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterOperator
-from llama_index.embeddings.dashscope import DashScopeEmbedding, DashScopeTextEmbeddingModels
-from llama_index.llms.deepseek import DeepSeek
-from llama_index.vector_stores.chroma import ChromaVectorStore
+import threading
+from typing import List, Optional, Dict, Any, Tuple, Callable
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import Embedding
+from llama_index.core.base.response.schema import AsyncStreamingResponse
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.response_synthesizers import ResponseMode
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterOperator, FilterCondition
 
 from schemas.agent_schemas import DocumentMetadataFilters
+from schemas.retrieval_mode import RetrievalMode
+from utils.chapter_extractor import CHAPTER_TITLE_KEYS
+from utils.classification_shards import ClassificationShards
+from utils.corpus_version import CorpusVersion
+from utils.document_index import DocumentIndex, DocumentRoutedRetriever
+from utils.hybrid_retriever import LexicalRetriever, HybridRetriever, ShardedRetriever, reciprocal_rank_fusion
+from utils.lexical_index import LexicalIndex
+from utils.logger import logger
+from utils.model_provider import ModelProvider
+from utils.vector_store_registry import VectorStoreRegistry, VectorStoreHandle, to_chroma_where
 
 
 class DocumentQueryEngine:
-    """文档查询引擎"""
+    """
+    文档查询引擎
+    查询引擎和检索器按(top_k, 响应模式)创建一次后复用，元数据过滤在每次调用时单独应用。
+    工作流中使用a开头的异步方法，向量化、向量检索和LLM调用都不会阻塞事件循环。
+
+    检索方式见RetrievalMode，默认由环境变量 RETRIEVAL_MODE 指定（默认vector），也可在每次调用时指定。
+    设置 ROUTE_DOCUMENTS 后向量检索先在文档级索引中选出这么多个候选文档，再检索其中的文本块。
+    Chroma带过滤条件的检索比直接检索慢得多，默认为0不路由，语料很大、直接检索的召回率下降时再启用。
+    按分类分片（见ClassificationShards）时分类过滤条件用于选择分片，文档级路由不生效
+    """
 
     _client = None
     _collection = None
+    _collection_name = "documents"
+    _persist_dir: Optional[str] = None
     _embedding_fn = None
 
+    _query_engines: Dict[Tuple[int, ResponseMode, bool], RetrieverQueryEngine] = {}
+    _retrievers: Dict[int, BaseRetriever] = {}
+    # 分类分片集合名 -> 索引
+    _shard_indexes: Dict[str, VectorStoreIndex] = {}
+    _registry_lock = threading.RLock()
+
+    _retrieval_mode = os.getenv("RETRIEVAL_MODE", RetrievalMode.VECTOR)
+    # query_metadatas中向量检索结果的相似度下限
+    _metadata_score_threshold = 0.55
+    # 向量检索时文档级选出的候选文档数
+    _route_documents = int(os.getenv("ROUTE_DOCUMENTS", "0"))
+    # query_documents中文档向量的余弦相似度下限，以及与最相似文档的相似度之比下限
+    _document_score_threshold = 0.3
+    _document_score_ratio = 0.9
+
     @classmethod
     def initialize(
             cls,
             collection_name: str = "documents",
-            persist_dir: Optional[str] = None
+            persist_dir: Optional[str] = None,
+            retrieval_mode: Optional[str] = None,
+            route_documents: Optional[int] = None,
+            shard_by_classification: Optional[bool] = None
     ):
-        """初始化查询引擎(只需调用一次)"""
-        if not persist_dir:
-            # 获取当前文件的目录，然后返回上一级目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)
-            persist_dir = os.path.join(parent_dir, "chroma_db")
-            cls._client = chromadb.PersistentClient(path=persist_dir)
-        else:
-            cls._client = chromadb.PersistentClient(path=persist_dir)
+        """
+        初始化查询引擎(只需调用一次)
 
-        cls._collection = cls._client.get_or_create_collection(name=collection_name)
+        参数:
+            retrieval_mode: 默认的检索方式
+            route_documents: 向量检索时文档级选出的候选文档数，为0时直接检索全部文本块
+            shard_by_classification: 是否按分类分片，为空时使用环境变量配置
+        """
+        if route_documents is not None:
+            cls._route_documents = route_documents
+        if retrieval_mode:
+            if retrieval_mode not in RetrievalMode.ALL:
+                raise ValueError(f"不支持的检索方式: {retrieval_mode}")
+            cls._retrieval_mode = retrieval_mode
+
+        cls._collection_name = collection_name
+        cls._persist_dir = persist_dir
+        DocumentIndex.initialize(collection_name, persist_dir)
+        ClassificationShards.configure(shard_by_classification, collection_name, persist_dir)
+
+        cls._query_embed_model = ModelProvider.get_embed_model(text_type="query")
+        # 所有查询共用一个LLM客户端
+        cls._llm = ModelProvider.get_llm(temperature=0.1)
+
+        # 与DocumentEmbedding共用同一个客户端和向量存储
+        cls._bind(VectorStoreRegistry.get(collection_name, persist_dir))
+
+        # 启用分片前写入的文本块移动到分片集合
+        if ClassificationShards.enabled() and cls._collection.count() > 0:
+            ClassificationShards.migrate(cls._collection)
+
+        collections = cls._chunk_collections()
+        chunk_count = sum(x.count() for x in collections)
+        # 关键词索引与向量库不一致时（首次启用或异常中断）按向量库重建
+        if LexicalIndex.count() != chunk_count:
+            logger.info("关键词索引与向量库不一致，开始重建")
+            LexicalIndex.rebuild(collections)
+        # 首次启用文档级索引时按已有的文本块生成
+        if DocumentIndex.count() == 0 and chunk_count > 0:
+            logger.info("文档级索引为空，开始生成")
+            DocumentIndex.rebuild(collections)
 
-        cls._vector_store = ChromaVectorStore(chroma_collection=cls._collection)
+    @classmethod
+    def _bind(cls, handle: VectorStoreHandle) -> None:
+        """使用集合句柄查询并清空已创建的检索器和查询引擎，集合重建换入后重新调用"""
+        index = VectorStoreIndex.from_vector_store(
+            handle.vector_store,
+            embed_model=cls._query_embed_model,
+            storage_context=handle.storage_context
+        )
+        with cls._registry_lock:
+            cls._client = handle.client
+            cls._collection = handle.collection
+            cls._vector_store = handle.vector_store
+            cls._storage_context = handle.storage_context
+            cls._index = index
+            cls._query_engines = {}
+            cls._retrievers = {}
+            cls._shard_indexes = {}
 
-        cls._storage_context = StorageContext.from_defaults(vector_store=cls._vector_store)
+    @classmethod
+    async def aembed_query(cls, query_text: str) -> Embedding:
+        """查询向量，与检索共用查询向量缓存"""
+        return await cls._query_embed_model.aget_query_embedding(query_text)
 
-        cls._query_embed_model = DashScopeEmbedding(
-            model_name=DashScopeTextEmbeddingModels.TEXT_EMBEDDING_V3,
-            text_type="query",
-            embed_batch_size=5,
-        )
+    @classmethod
+    def _chunk_collections(cls) -> List[Any]:
+        """存放文本块的全部集合"""
+        if ClassificationShards.enabled():
+            return [handle.collection for _, handle in ClassificationShards.shards()]
+        return [cls._collection]
+
+    @staticmethod
+    def _split_classification(filters: Optional[MetadataFilters]) -> Tuple[List[str], Optional[MetadataFilters]]:
+        """分片时从过滤器中取出分类条件用于选择分片，返回(分类名列表, 其余过滤条件)"""
+        if filters is None:
+            return [], None
+        names, rest = [], []
+        for item in filters.filters:
+            if isinstance(item, MetadataFilter) and item.key == "classification":
+                names.extend(item.value if isinstance(item.value, list) else [item.value])
+            else:
+                rest.append(item)
+        return names, MetadataFilters(filters=rest, condition=filters.condition) if rest else None
 
-        cls._index = VectorStoreIndex.from_vector_store(
-            cls._vector_store,
-            embed_model=cls._query_embed_model,
-            storage_context=cls._storage_context
-        )
+    @classmethod
+    def _shard_index(cls, handle: VectorStoreHandle) -> VectorStoreIndex:
+        """分片集合的索引，首次使用时创建"""
+        index = cls._shard_indexes.get(handle.collection.name)
+        if index is None:
+            with cls._registry_lock:
+                index = cls._shard_indexes.get(handle.collection.name)
+                if index is None:
+                    index = cls._shard_indexes[handle.collection.name] = VectorStoreIndex.from_vector_store(
+                        handle.vector_store,
+                        embed_model=cls._query_embed_model,
+                        storage_context=handle.storage_context
+                    )
+        return index
+
+    @classmethod
+    def _get_vector_retriever(cls, top_k: int, filters: Optional[MetadataFilters] = None) -> BaseRetriever:
+        """
+        获取向量检索器，启用文档级路由时先选出候选文档；无过滤条件的检索器按top_k复用
+
+        参数:
+            top_k: 文档向量查询结果数量
+            filters: 本次查询的过滤器
+        """
+        if ClassificationShards.enabled():
+            names, filters = cls._split_classification(filters)
+            return ShardedRetriever(
+                [
+                    (name, cls._shard_index(handle).as_retriever(similarity_top_k=top_k, filters=filters))
+                    for name, handle in ClassificationShards.shards(names)
+                ],
+                top_k,
+                embed_model=cls._query_embed_model
+            )
+        if cls._route_documents > 0:
+            return DocumentRoutedRetriever(cls._index, cls._query_embed_model, top_k, cls._route_documents, filters)
+        if filters is not None:
+            return cls._index.as_retriever(similarity_top_k=top_k, filters=filters)
+
+        retriever = cls._retrievers.get(top_k)
+        if retriever is None:
+            with cls._registry_lock:
+                retriever = cls._retrievers.get(top_k)
+                if retriever is None:
+                    retriever = cls._retrievers[top_k] = cls._index.as_retriever(similarity_top_k=top_k)
+        return retriever
+
+    @classmethod
+    def _get_lexical_retriever(
+            cls,
+            top_k: int,
+            filters: Optional[MetadataFilters] = None,
+            match_all: bool = False,
+            fallback: Optional[BaseRetriever] = None
+    ) -> BaseRetriever:
+        """获取关键词检索器"""
+        if ClassificationShards.enabled():
+            names, filters = cls._split_classification(filters)
+            where = to_chroma_where(filters) if filters is not None else None
+            return ShardedRetriever(
+                [
+                    (name, LexicalRetriever(handle.collection, top_k, where or None, match_all=match_all,
+                                             classification=name))
+                    for name, handle in ClassificationShards.shards(names)
+                ],
+                top_k,
+                fallback=fallback
+            )
+        where = to_chroma_where(filters) if filters is not None else None
+        return LexicalRetriever(cls._collection, top_k, where or None, match_all=match_all, fallback=fallback)
+
+    @classmethod
+    def resolve_mode(cls, query_text: str, mode: Optional[str] = None) -> str:
+        """确定本次查询实际使用的检索方式，auto按查询是否为关键词式选择关键词检索或混合检索"""
+        mode = mode or cls._retrieval_mode
+        if mode == RetrievalMode.AUTO:
+            return RetrievalMode.LEXICAL if LexicalIndex.is_keyword_query(query_text) else RetrievalMode.HYBRID
+        return mode
+
+    @classmethod
+    def _get_retriever(
+            cls,
+            query_text: str,
+            top_k: int,
+            filters: Optional[MetadataFilters] = None,
+            mode: Optional[str] = None
+    ) -> BaseRetriever:
+        """
+        按检索方式获取检索器
+
+        参数:
+            query_text: 查询内容
+            top_k: 文档向量查询结果数量
+            filters: 本次查询的过滤器
+            mode: 检索方式，为空时使用默认配置
+        """
+        resolved = cls.resolve_mode(query_text, mode)
+        if resolved == RetrievalMode.VECTOR:
+            return cls._get_vector_retriever(top_k, filters)
+
+        hybrid = None
+        if resolved == RetrievalMode.HYBRID or (mode or cls._retrieval_mode) == RetrievalMode.AUTO:
+            hybrid = HybridRetriever(
+                cls._get_vector_retriever(top_k, filters), cls._get_lexical_retriever(top_k, filters), top_k
+            )
+        if resolved == RetrievalMode.HYBRID:
+            return hybrid
+        # auto模式下只接受包含全部查询词项的关键词检索结果，没有这样的文本块时退回混合检索
+        match_all = hybrid is not None
+        return cls._get_lexical_retriever(top_k, filters, match_all=match_all, fallback=hybrid)
+
+    @classmethod
+    def _get_query_engine(
+            cls,
+            top_k: int,
+            response_mode: ResponseMode,
+            retriever: BaseRetriever,
+            streaming: bool = False
+    ) -> RetrieverQueryEngine:
+        """
+        获取查询引擎，响应合成器按(top_k, 响应模式, 是否流式)创建一次，每次查询换用本次的检索器
+
+        参数:
+            top_k: 文档向量查询结果数量
+            response_mode: 响应模式
+            retriever: 本次查询的检索器
+            streaming: 是否流式输出
+        """
+        key = (top_k, response_mode, streaming)
+        query_engine = cls._query_engines.get(key)
+        if query_engine is None:
+            with cls._registry_lock:
+                query_engine = cls._query_engines.get(key)
+                if query_engine is None:
+                    query_engine = cls._query_engines[key] = RetrieverQueryEngine.from_args(
+                        cls._get_vector_retriever(top_k),
+                        llm=cls._llm,
+                        response_mode=response_mode,
+                        streaming=streaming
+                    )
+
+        if retriever is not query_engine.retriever:
+            query_engine = query_engine.with_retriever(retriever)
+        return query_engine
 
     @classmethod
     def _assembly_metadata_filters(
@@ -73,8 +318,15 @@ class DocumentQueryEngine:
                 metadata_filters.classification or metadata_filters.file_name or metadata_filters.last_modified_date):
             filter_list = []
             if metadata_filters.chapter_title:
+                # 文本块的多个章节分别存放在不同的键中，任意一个命中即可
                 filter_list.append(
-                    MetadataFilter(key="chapter_title", operator=FilterOperator.IN, value=metadata_filters.chapter_title)
+                    MetadataFilters(
+                        filters=[
+                            MetadataFilter(key=key, operator=FilterOperator.IN, value=metadata_filters.chapter_title)
+                            for key in CHAPTER_TITLE_KEYS
+                        ],
+                        condition=FilterCondition.OR
+                    )
                 )
             if metadata_filters.creation_date:
                 filter_list.append(
@@ -105,7 +357,9 @@ class DocumentQueryEngine:
             cls,
             query_text: str,
             metadata_filters: Optional[DocumentMetadataFilters] = None,
-            top_k=5
+            top_k=5,
+            response_mode: ResponseMode = ResponseMode.COMPACT,
+            mode: Optional[str] = None
     ) -> str:
         """
         直接通过查询回答问题
@@ -114,19 +368,16 @@ class DocumentQueryEngine:
             query_text: 查询内容
             top_k: 文档向量查询结果数量
             metadata_filters: 元数据过滤
+            response_mode: 响应模式
+            mode: 检索方式，为空时使用默认配置
 
         返回:
             输出结果
         """
         filters = cls._assembly_metadata_filters(metadata_filters)
 
-        _llm = DeepSeek("deepseek-chat", temperature=0.1)
-
-        query_engine = cls._index.as_query_engine(
-            llm=_llm,
-            similarity_top_k=top_k,
-            filters=filters
-        )
+        retriever = cls._get_retriever(query_text, top_k, filters, mode)
+        query_engine = cls._get_query_engine(top_k, response_mode, retriever)
 
         llm_response = query_engine.query(query_text)
 
@@ -137,7 +388,8 @@ class DocumentQueryEngine:
             cls,
             query_text: str,
             metadata_filters: Optional[DocumentMetadataFilters] = None,
-            top_k=3
+            top_k=3,
+            mode: Optional[str] = None
     ) -> str:
         """
         通过查询返回相关片段
@@ -146,13 +398,14 @@ class DocumentQueryEngine:
             query_text: 查询内容
             top_k: 文档向量查询结果数量
             metadata_filters: 元数据过滤
+            mode: 检索方式，为空时使用默认配置
 
         返回:
             输出结果
         """
         filters = cls._assembly_metadata_filters(metadata_filters)
 
-        retriever = cls._index.as_retriever(similarity_top_k=top_k, filters=filters)
+        retriever = cls._get_retriever(query_text, top_k, filters, mode)
 
         retrieved_nodes = retriever.retrieve(query_text)
         result = '\n\n'.join([x.text for x in retrieved_nodes])
@@ -165,41 +418,304 @@ class DocumentQueryEngine:
             query_text: str,
             metadata_filters: Optional[DocumentMetadataFilters] = None,
             top_k=3,
+            mode: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         通过查询返回相关元数据
+        向量检索结果只保留相似度足够高的文本块，关键词检索结果需包含全部查询词项
 
         参数:
             query_text: 查询内容
             top_k: 文档向量查询结果数量
             metadata_filters: 元数据过滤
+            mode: 检索方式，为空时使用默认配置
 
         返回:
             输出结果
         """
         filters = cls._assembly_metadata_filters(metadata_filters)
+        resolved = cls.resolve_mode(query_text, mode)
 
-        retriever = cls._index.as_retriever(similarity_top_k=top_k, filters=filters)
+        lexical_nodes = []
+        if resolved != RetrievalMode.VECTOR:
+            lexical_nodes = cls._get_lexical_retriever(top_k, filters, match_all=True).retrieve(query_text)
+            if cls._lexical_only(resolved, mode, lexical_nodes):
+                return [x.metadata for x in lexical_nodes]
 
-        retrieved_nodes = retriever.retrieve(query_text)
-        result = [x.metadata for x in retrieved_nodes if x.score > 0.55]
+        vector_nodes = cls._get_vector_retriever(top_k, filters).retrieve(query_text)
+        return [x.metadata for x in cls._fuse_metadata_nodes(vector_nodes, lexical_nodes, top_k)]
+
+    @classmethod
+    def _lexical_only(cls, resolved: str, mode: Optional[str], lexical_nodes: List[NodeWithScore]) -> bool:
+        """只使用关键词检索结果：指定了关键词检索，或auto模式下关键词检索有命中"""
+        return resolved == RetrievalMode.LEXICAL and (
+                bool(lexical_nodes) or (mode or cls._retrieval_mode) == RetrievalMode.LEXICAL
+        )
+
+    @classmethod
+    def _fuse_metadata_nodes(
+            cls,
+            vector_nodes: List[NodeWithScore],
+            lexical_nodes: List[NodeWithScore],
+            top_k: int
+    ) -> List[NodeWithScore]:
+        """过滤低相似度的向量检索结果后与关键词检索结果融合"""
+        vector_nodes = [x for x in vector_nodes if x.score > cls._metadata_score_threshold]
+        return reciprocal_rank_fusion([vector_nodes, lexical_nodes], top_k)
+
+    @classmethod
+    async def asimple_query(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=5,
+            response_mode: ResponseMode = ResponseMode.COMPACT,
+            mode: Optional[str] = None
+    ) -> str:
+        """
+        simple_query的异步版本
+
+        参数:
+            query_text: 查询内容
+            top_k: 文档向量查询结果数量
+            metadata_filters: 元数据过滤
+            response_mode: 响应模式
+            mode: 检索方式，为空时使用默认配置
+
+        返回:
+            输出结果
+        """
+        filters = cls._assembly_metadata_filters(metadata_filters)
+
+        retriever = cls._get_retriever(query_text, top_k, filters, mode)
+        query_engine = cls._get_query_engine(top_k, response_mode, retriever)
+
+        llm_response = await query_engine.aquery(query_text)
+
+        return llm_response.response
+
+    @classmethod
+    async def astream_query(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=5,
+            response_mode: ResponseMode = ResponseMode.COMPACT,
+            mode: Optional[str] = None
+    ) -> AsyncStreamingResponse:
+        """
+        流式回答问题，检索完成后立即返回，回答通过async_response_gen逐个token输出
+
+        参数:
+            query_text: 查询内容
+            top_k: 文档向量查询结果数量
+            metadata_filters: 元数据过滤
+            response_mode: 响应模式
+            mode: 检索方式，为空时使用默认配置
+
+        返回:
+            流式响应，source_nodes为检索到的文本块
+        """
+        filters = cls._assembly_metadata_filters(metadata_filters)
+
+        retriever = cls._get_retriever(query_text, top_k, filters, mode)
+        query_engine = cls._get_query_engine(top_k, response_mode, retriever, streaming=True)
+
+        return await query_engine.aquery(query_text)
+
+    @classmethod
+    async def asimple_retriever(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=3,
+            mode: Optional[str] = None
+    ) -> str:
+        """
+        simple_retriever的异步版本
+
+        参数:
+            query_text: 查询内容
+            top_k: 文档向量查询结果数量
+            metadata_filters: 元数据过滤
+            mode: 检索方式，为空时使用默认配置
+
+        返回:
+            输出结果
+        """
+        filters = cls._assembly_metadata_filters(metadata_filters)
+
+        retriever = cls._get_retriever(query_text, top_k, filters, mode)
+
+        retrieved_nodes = await retriever.aretrieve(query_text)
+        result = '\n\n'.join([x.text for x in retrieved_nodes])
 
         return result
 
     @classmethod
-    def update_metadata(cls, old: str, new: str):
-        wait_update_node = cls._collection.get(
-            where={"classification": old}
-        )
-        if wait_update_node["ids"]:
-            for node_id in wait_update_node["ids"]:
-                node_data = cls._collection.get(ids=node_id)
-                node_data["metadatas"][0]["classification"] = new
-                cls._collection.update(
-                    ids=node_id,
-                    metadatas=node_data["metadatas"],
-                )
+    async def aquery_metadatas(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=3,
+            mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        query_metadatas的异步版本
+
+        参数:
+            query_text: 查询内容
+            top_k: 文档向量查询结果数量
+            metadata_filters: 元数据过滤
+            mode: 检索方式，为空时使用默认配置
+
+        返回:
+            输出结果
+        """
+        filters = cls._assembly_metadata_filters(metadata_filters)
+        resolved = cls.resolve_mode(query_text, mode)
+        vector_retriever = cls._get_vector_retriever(top_k, filters)
+
+        if resolved == RetrievalMode.VECTOR:
+            vector_nodes, lexical_nodes = await vector_retriever.aretrieve(query_text), []
+        elif resolved == RetrievalMode.HYBRID:
+            vector_nodes, lexical_nodes = await asyncio.gather(
+                vector_retriever.aretrieve(query_text),
+                cls._get_lexical_retriever(top_k, filters, match_all=True).aretrieve(query_text)
+            )
+        else:
+            lexical_nodes = await cls._get_lexical_retriever(top_k, filters, match_all=True).aretrieve(query_text)
+            if cls._lexical_only(resolved, mode, lexical_nodes):
+                return [x.metadata for x in lexical_nodes]
+            vector_nodes = await vector_retriever.aretrieve(query_text)
+
+        return [x.metadata for x in cls._fuse_metadata_nodes(vector_nodes, lexical_nodes, top_k)]
+
+    @classmethod
+    def query_documents(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=20
+    ) -> List[Dict[str, Any]]:
+        """
+        只在文档级索引中检索相关文档，返回文档的文件属性，不包含章节
+        保留相似度不低于 _document_score_threshold 且与最相似文档的相似度之比不低于 _document_score_ratio 的文档，
+        章节过滤条件不生效
+
+        参数:
+            query_text: 查询内容
+            metadata_filters: 元数据过滤
+            top_k: 最多返回的文档数量
+
+        返回:
+            文档元数据列表，相似度高的在前
+        """
+        embedding = cls._query_embed_model.get_query_embedding(query_text)
+        return cls._select_documents(embedding, metadata_filters, top_k)
 
     @classmethod
-    def delete_document(cls, document_name: str):
-        cls._collection.delete(where={"file_name": document_name})
+    async def aquery_documents(
+            cls,
+            query_text: str,
+            metadata_filters: Optional[DocumentMetadataFilters] = None,
+            top_k=20
+    ) -> List[Dict[str, Any]]:
+        """
+        query_documents的异步版本
+
+        参数:
+            query_text: 查询内容
+            metadata_filters: 元数据过滤
+            top_k: 最多返回的文档数量
+
+        返回:
+            文档元数据列表，相似度高的在前
+        """
+        embedding = await cls._query_embed_model.aget_query_embedding(query_text)
+        return await asyncio.to_thread(cls._select_documents, embedding, metadata_filters, top_k)
+
+    @classmethod
+    def _select_documents(
+            cls,
+            embedding: Embedding,
+            metadata_filters: Optional[DocumentMetadataFilters],
+            top_k: int
+    ) -> List[Dict[str, Any]]:
+        """文档级检索并按相对相似度截断"""
+        where = DocumentIndex.where(cls._assembly_metadata_filters(metadata_filters))
+        hits = DocumentIndex.search(embedding, top_k, where)
+        if not hits:
+            return []
+        min_score = max(hits[0][1] * cls._document_score_ratio, cls._document_score_threshold)
+        return [metadata for _, score, metadata in hits if score >= min_score]
+
+    @classmethod
+    def update_metadata(
+            cls,
+            old: str,
+            new: str,
+            batch_size: int = 5000,
+            progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        把分类为old的文本块批量改为new
+        先查出属于old的全部文本块id，再按id分批更新，每批更新的文本块固定，不依赖更新后的文本块
+        不再匹配过滤条件；中途失败后用相同参数重新调用即可从剩余部分继续。
+        按分类分片时文本块的分类以所在集合为准，只更新文档级索引
+
+        参数:
+            old: 原分类名
+            new: 新分类名
+            batch_size: 每批更新的文本块数量
+            progress: 进度回调，参数为(已更新数量, 总数量)
+
+        返回:
+            更新的文本块数量
+        """
+        if old == new:
+            return 0
+        if ClassificationShards.enabled():
+            DocumentIndex.update_classification(old, new)
+            CorpusVersion.bump()
+            return 0
+
+        batch_size = min(batch_size, cls._client.get_max_batch_size())
+        ids = cls._collection.get(where={"classification": old}, include=[])["ids"]
+
+        updated = 0
+        for start in range(0, len(ids), batch_size):
+            with VectorStoreRegistry.writing():
+                # 查出id后被删除的文本块不会返回
+                batch = cls._collection.get(ids=ids[start:start + batch_size], include=["metadatas"])
+                if batch["ids"]:
+                    for metadata in batch["metadatas"]:
+                        metadata["classification"] = new
+                    cls._collection.update(ids=batch["ids"], metadatas=batch["metadatas"])
+                    CorpusVersion.bump()
+
+            updated += len(batch["ids"])
+            if progress:
+                progress(updated, len(ids))
+        DocumentIndex.update_classification(old, new)
+        return updated
+
+    @classmethod
+    def delete_document(cls, document_name: str, classification_id: Optional[int] = None):
+        """
+        删除文档的全部文本块
+
+        参数:
+            document_name: 文档名
+            classification_id: 文档分类id，按分类分片时用于确定所在集合，为空时从全部分片中删除
+        """
+        if ClassificationShards.enabled() and classification_id is not None:
+            collections = [ClassificationShards.handle(classification_id).collection]
+        else:
+            collections = cls._chunk_collections()
+        with VectorStoreRegistry.writing():
+            for collection in collections:
+                collection.delete(where={"file_name": document_name})
+            LexicalIndex.delete_document(document_name)
+            DocumentIndex.delete(document_name)
+            CorpusVersion.bump()
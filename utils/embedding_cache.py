@@ -0,0 +1,449 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from utils.db_helper import ConnectionPool
+from utils.logger import logger
+
+
+class EmbeddingCache:
+    """
+    持久化的文本向量缓存
+    以(模型, 维度, 文本哈希)为键存储在独立的SQLite文件中，超过容量时淘汰最久未使用的向量。
+    命中时的最近使用时间先记在内存中，攒够一批或间隔足够久、以及写入新向量时再批量更新，查询不单独提交写事务
+    """
+
+    # 获取当前文件的目录，然后返回上一级目录，再拼接 db 文件名
+    _current_dir = os.path.dirname(os.path.abspath(__file__))
+    _parent_dir = os.path.dirname(_current_dir)
+    _db_path = os.path.join(_parent_dir, "embedding_cache.db")
+
+    _max_entries = 500000
+    _pool: Optional[ConnectionPool] = None
+    _lock = threading.Lock()
+    _count: Optional[int] = None
+    _hits = 0
+    _misses = 0
+
+    # 待更新的最近使用时间：(namespace, text_hash) -> 时间
+    _touches: Dict[Tuple[str, str], float] = {}
+    _touch_batch = 1000
+    _touch_interval = 60.0
+    _touched_at = 0.0
+
+    _schema = """
+              CREATE TABLE IF NOT EXISTS embedding_cache
+              (
+                  namespace TEXT not null,
+                  text_hash TEXT not null,
+                  vector    BLOB not null,
+                  last_used REAL not null,
+                  constraint embedding_cache_pk
+                      primary key (namespace, text_hash)
+              );
+              CREATE INDEX IF NOT EXISTS embedding_cache_last_used_index
+                  on embedding_cache (last_used);
+              """
+
+    @classmethod
+    def configure(cls, db_path: Optional[str] = None, max_entries: Optional[int] = None) -> None:
+        """
+        修改缓存配置
+        :param db_path: 缓存文件路径
+        :param max_entries: 最多缓存的向量数量
+        """
+        cls.close()
+        with cls._lock:
+            if db_path:
+                cls._db_path = db_path
+            if max_entries:
+                cls._max_entries = max_entries
+
+    @classmethod
+    def close(cls) -> None:
+        """写入待更新的最近使用时间并关闭缓存连接"""
+        if cls._pool:
+            with cls._pool.connection() as conn:
+                cls._flush_touches(conn)
+                conn.commit()
+        with cls._lock:
+            if cls._pool:
+                cls._pool.close()
+                cls._pool = None
+                cls._count = None
+
+    @classmethod
+    def _get_pool(cls) -> ConnectionPool:
+        """获取连接池，首次使用时创建缓存表"""
+        if cls._pool is None:
+            with cls._lock:
+                if cls._pool is None:
+                    pool = ConnectionPool(cls._db_path, max_size=4)
+                    with pool.connection() as conn:
+                        conn.executescript(cls._schema)
+                        cls._count = conn.execute("SELECT count(*) FROM embedding_cache").fetchone()[0]
+                    cls._pool = pool
+        return cls._pool
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """文本哈希"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_many(cls, namespace: str, texts: List[str]) -> List[Optional[Embedding]]:
+        """
+        批量查询缓存
+        :param namespace: 模型及维度标识
+        :param texts: 文本列表
+        :return: 与texts一一对应的向量，未命中的为None
+        """
+        if not texts:
+            return []
+
+        hashes = [cls.hash_text(x) for x in texts]
+        unique_hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with cls._get_pool().connection() as conn:
+            # 分批查询，避免超过SQLite的参数数量上限
+            for i in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE namespace=? AND text_hash IN ({','.join(['?'] * len(batch))})",
+                    (namespace, *batch)
+                ).fetchall()
+                for row in rows:
+                    found[row["text_hash"]] = array("f", row["vector"]).tolist()
+
+        now = time.time()
+        with cls._lock:
+            for text_hash in found:
+                cls._touches[(namespace, text_hash)] = now
+            flush = len(cls._touches) >= cls._touch_batch or now - cls._touched_at >= cls._touch_interval
+        if flush:
+            with cls._get_pool().connection() as conn:
+                cls._flush_touches(conn)
+                conn.commit()
+
+        result = [found.get(x) for x in hashes]
+        hits = sum(1 for x in result if x is not None)
+        with cls._lock:
+            cls._hits += hits
+            cls._misses += len(result) - hits
+        return result
+
+    @classmethod
+    def _flush_touches(cls, conn) -> None:
+        """
+        批量更新最近使用时间，由调用方提交
+        只影响淘汰顺序，数据库繁忙时放弃本批更新，不影响查询
+        """
+        with cls._lock:
+            touches, cls._touches = cls._touches, {}
+            cls._touched_at = time.time()
+        if not touches:
+            return
+        try:
+            conn.executemany(
+                "UPDATE embedding_cache SET last_used=? WHERE namespace=? AND text_hash=?",
+                [(last_used, namespace, text_hash) for (namespace, text_hash), last_used in touches.items()]
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"向量缓存最近使用时间更新失败，已跳过{len(touches)}条: {e}")
+
+    @classmethod
+    def put_many(cls, namespace: str, texts: List[str], embeddings: List[Embedding]) -> None:
+        """
+        批量写入缓存，超过容量时淘汰最久未使用的向量
+        :param namespace: 模型及维度标识
+        :param texts: 文本列表
+        :param embeddings: 与texts一一对应的向量
+        """
+        if not texts:
+            return
+
+        now = time.time()
+        rows = [
+            (namespace, cls.hash_text(text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with cls._get_pool().connection() as conn:
+            # 淘汰前先写入最近使用时间，避免淘汰刚命中的向量
+            cls._flush_touches(conn)
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (namespace, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            inserted = conn.total_changes - before
+
+            with cls._lock:
+                cls._count += inserted
+                overflow = cls._count - cls._max_entries
+                if overflow > 0:
+                    cls._count -= overflow
+
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM embedding_cache WHERE rowid IN "
+                    "(SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+            conn.commit()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = cls._hits + cls._misses
+        return {
+            "entries": cls._count,
+            "max_entries": cls._max_entries,
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "hit_rate": cls._hits / total if total else 0.0,
+        }
+
+
+class QueryEmbeddingCache:
+    """
+    进程内的查询向量缓存
+    以(模型, 规范化后的查询文本)为键，按最近最少使用淘汰，超过有效期的向量视为未命中，
+    总内存超过上限时淘汰最久未使用的向量。位于持久化缓存之前，热门问题无需访问SQLite和向量化接口
+    """
+
+    _max_bytes = 64 * 1024 * 1024
+    _ttl = 3600.0
+    # 每个缓存项除向量和键之外的固定开销估计
+    _entry_overhead = 200
+
+    _entries: "OrderedDict[Tuple[str, str], Tuple[array, float, int]]" = OrderedDict()
+    _bytes = 0
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+    _expired = 0
+    _evictions = 0
+
+    @classmethod
+    def configure(cls, max_bytes: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        """
+        修改缓存配置并清空缓存
+        :param max_bytes: 缓存占用内存的上限（字节）
+        :param ttl: 向量的有效期（秒）
+        """
+        with cls._lock:
+            if max_bytes:
+                cls._max_bytes = max_bytes
+            if ttl:
+                cls._ttl = ttl
+            cls._entries = OrderedDict()
+            cls._bytes = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化查询文本：全角转半角、英文转小写、合并空白"""
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    @classmethod
+    def get(cls, namespace: str, text: str) -> Optional[Embedding]:
+        """
+        查询缓存
+        :param namespace: 模型及维度标识
+        :param text: 查询文本
+        :return: 向量，未命中或已过期时为None
+        """
+        key = (namespace, cls.normalize(text))
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                cls._misses += 1
+                return None
+            vector, expires_at, size = entry
+            if expires_at < time.monotonic():
+                del cls._entries[key]
+                cls._bytes -= size
+                cls._expired += 1
+                cls._misses += 1
+                return None
+            cls._entries.move_to_end(key)
+            cls._hits += 1
+        return vector.tolist()
+
+    @classmethod
+    def put(cls, namespace: str, text: str, embedding: Embedding) -> None:
+        """
+        写入缓存，超过内存上限时淘汰最久未使用的向量
+        :param namespace: 模型及维度标识
+        :param text: 查询文本
+        :param embedding: 向量
+        """
+        key = (namespace, cls.normalize(text))
+        vector = array("f", embedding)
+        size = vector.itemsize * len(vector) + sys.getsizeof(key[1]) + cls._entry_overhead
+        with cls._lock:
+            old = cls._entries.pop(key, None)
+            if old is not None:
+                cls._bytes -= old[2]
+            cls._entries[key] = (vector, time.monotonic() + cls._ttl, size)
+            cls._bytes += size
+            while cls._bytes > cls._max_bytes and cls._entries:
+                _, (_, _, evicted_size) = cls._entries.popitem(last=False)
+                cls._bytes -= evicted_size
+                cls._evictions += 1
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = cls._hits + cls._misses
+        return {
+            "entries": len(cls._entries),
+            "bytes": cls._bytes,
+            "max_bytes": cls._max_bytes,
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "expired": cls._expired,
+            "evictions": cls._evictions,
+            "hit_rate": cls._hits / total if total else 0.0,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    带持久化缓存的向量模型
+    包装实际的向量模型，只有缓存未命中的文本才会调用向量化接口。
+    查询向量先查进程内的QueryEmbeddingCache，再查持久化缓存
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _namespace: str = PrivateAttr()
+    _memory_cache: bool = PrivateAttr()
+    _blocking_async: bool = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, dimension: Optional[int] = None, memory_cache: bool = False,
+                 blocking_async: bool = False, **kwargs):
+        """
+        :param embed_model: 实际的向量模型
+        :param dimension: 向量维度，为空时使用模型的默认维度
+        :param memory_cache: 查询向量是否使用进程内缓存
+        :param blocking_async: 实际模型的异步接口内部是否仍为同步调用，是则在线程中调用同步接口，避免阻塞事件循环
+        """
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs
+        )
+        self._embed_model = embed_model
+        # 同一模型的文档向量和查询向量不同，需要区分
+        text_type = getattr(embed_model, "text_type", "") or ""
+        self._namespace = f"{embed_model.class_name()}:{embed_model.model_name}:{text_type}:{dimension or 'default'}"
+        self._memory_cache = memory_cache
+        self._blocking_async = blocking_async
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        """实际的向量模型"""
+        return self._embed_model
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        cached = self._get_cached_query_embedding(query)
+        if cached is not None:
+            return cached
+        embedding = self._embed_model.get_query_embedding(query)
+        self._put_query_embedding(query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        # 进程内缓存直接查询，持久化缓存的读写在线程中执行，不阻塞事件循环
+        cached = self._get_memory_query_embedding(query)
+        if cached is not None:
+            return cached
+        cached = await asyncio.to_thread(self._get_persisted_query_embedding, query)
+        if cached is not None:
+            return cached
+        if self._blocking_async:
+            embedding = await asyncio.to_thread(self._embed_model.get_query_embedding, query)
+        else:
+            embedding = await self._embed_model.aget_query_embedding(query)
+        if self._memory_cache:
+            QueryEmbeddingCache.put(self._namespace, query, embedding)
+        await asyncio.to_thread(EmbeddingCache.put_many, self._namespace, [query], [embedding])
+        return embedding
+
+    def _get_cached_query_embedding(self, query: str) -> Optional[Embedding]:
+        """依次查询进程内缓存和持久化缓存"""
+        cached = self._get_memory_query_embedding(query)
+        if cached is not None:
+            return cached
+        return self._get_persisted_query_embedding(query)
+
+    def _get_memory_query_embedding(self, query: str) -> Optional[Embedding]:
+        """查询进程内缓存"""
+        if self._memory_cache:
+            return QueryEmbeddingCache.get(self._namespace, query)
+        return None
+
+    def _get_persisted_query_embedding(self, query: str) -> Optional[Embedding]:
+        """查询持久化缓存，命中时回填进程内缓存"""
+        cached = EmbeddingCache.get_many(self._namespace, [query])[0]
+        if cached is not None and self._memory_cache:
+            QueryEmbeddingCache.put(self._namespace, query, cached)
+        return cached
+
+    def _put_query_embedding(self, query: str, embedding: Embedding) -> None:
+        """写入新计算的查询向量"""
+        if self._memory_cache:
+            QueryEmbeddingCache.put(self._namespace, query, embedding)
+        EmbeddingCache.put_many(self._namespace, [query], [embedding])
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        embeddings = EmbeddingCache.get_many(self._namespace, texts)
+        missing = self._missing_texts(texts, embeddings)
+        if missing:
+            computed = self._embed_model.get_text_embedding_batch(missing)
+            return self._merge(texts, embeddings, missing, computed)
+        return embeddings
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        embeddings = await asyncio.to_thread(EmbeddingCache.get_many, self._namespace, texts)
+        missing = self._missing_texts(texts, embeddings)
+        if missing:
+            if self._blocking_async:
+                computed = await asyncio.to_thread(self._embed_model.get_text_embedding_batch, missing)
+            else:
+                computed = await self._embed_model.aget_text_embedding_batch(missing)
+            return await asyncio.to_thread(self._merge, texts, embeddings, missing, computed)
+        return embeddings
+
+    @staticmethod
+    def _missing_texts(texts: List[str], embeddings: List[Optional[Embedding]]) -> List[str]:
+        """未命中缓存的文本（去重）"""
+        return list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+
+    def _merge(self, texts: List[str], embeddings: List[Optional[Embedding]], missing: List[str],
+               computed: List[Embedding]) -> List[Embedding]:
+        """写入新计算的向量，并按原顺序合并结果"""
+        EmbeddingCache.put_many(self._namespace, missing, computed)
+        computed_map = dict(zip(missing, computed))
+        return [embedding if embedding is not None else computed_map[text] for text, embedding in zip(texts, embeddings)]
@@ -0,0 +1,197 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from utils.lexical_index import LexicalIndex
+
+
+def reciprocal_rank_fusion(result_lists: List[List[NodeWithScore]], top_k: int, k: int = 60) -> List[NodeWithScore]:
+    """
+    倒数排名融合：文本块的得分为其在各结果列表中 1/(k+排名) 之和
+    :param result_lists: 各检索方式的结果，按相关度排序
+    :param top_k: 返回的最大数量
+    :param k: 平滑常数，越大越弱化排名靠前的优势
+    :return: 融合后的结果，score为融合得分
+    """
+    scores: Dict[str, float] = {}
+    nodes: Dict[str, NodeWithScore] = {}
+    for results in result_lists:
+        for rank, node in enumerate(results, start=1):
+            scores[node.node.node_id] = scores.get(node.node.node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node.node.node_id, node)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [NodeWithScore(node=nodes[node_id].node, score=scores[node_id]) for node_id in ranked]
+
+
+class LexicalRetriever(BaseRetriever):
+    """
+    关键词检索器
+    从本地倒排索引中按BM25取候选文本块，再从Chroma读取文本和元数据并应用元数据过滤，不调用向量化接口
+    """
+
+    # 有过滤条件时多取的候选数量倍数，弥补被过滤掉的文本块
+    _filtered_candidate_factor = 10
+
+    def __init__(
+            self,
+            collection,
+            top_k: int,
+            where: Optional[Dict[str, Any]] = None,
+            match_all: bool = False,
+            fallback: Optional[BaseRetriever] = None,
+            classification: Optional[str] = None
+    ):
+        """
+        :param collection: Chroma集合
+        :param top_k: 返回的最大数量
+        :param where: Chroma的元数据过滤条件
+        :param match_all: 是否要求包含全部查询词项
+        :param fallback: 没有命中时改用的检索器
+        :param classification: 集合只包含该分类的文本块（分类分片），候选文本块在关键词索引中按分类过滤
+        """
+        super().__init__()
+        self._collection = collection
+        self._top_k = top_k
+        self._where = where
+        self._match_all = match_all
+        self._fallback = fallback
+        self._classification = classification
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = self._search(query_bundle.query_str)
+        if not nodes and self._fallback is not None:
+            return self._fallback.retrieve(query_bundle)
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await asyncio.to_thread(self._search, query_bundle.query_str)
+        if not nodes and self._fallback is not None:
+            return await self._fallback.aretrieve(query_bundle)
+        return nodes
+
+    def _search(self, query_text: str) -> List[NodeWithScore]:
+        """检索候选文本块并读取其内容"""
+        limit = self._top_k * (self._filtered_candidate_factor if self._where else 1)
+        hits = LexicalIndex.search(
+            query_text, limit=limit, match_all=self._match_all,
+            classifications=[self._classification] if self._classification else None
+        )
+        if not hits:
+            return []
+
+        stored = self._collection.get(
+            ids=[node_id for node_id, _ in hits],
+            where=self._where,
+            include=["documents", "metadatas"]
+        )
+        nodes = {
+            node_id: self._to_node(node_id, text, metadata)
+            for node_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        # 索引中存在但向量库中已删除或不满足过滤条件的文本块被跳过
+        return [
+            NodeWithScore(node=nodes[node_id], score=score) for node_id, score in hits if node_id in nodes
+        ][:self._top_k]
+
+    @staticmethod
+    def _to_node(node_id: str, text: str, metadata: Dict[str, Any]) -> TextNode:
+        """与ChromaVectorStore一致，从元数据中恢复节点"""
+        try:
+            node = metadata_dict_to_node(metadata)
+            node.set_content(text)
+        except Exception:
+            node = TextNode(id_=node_id, text=text, metadata=metadata or {})
+        return node
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    混合检索器
+    向量检索和关键词检索的结果按倒数排名融合
+    """
+
+    def __init__(self, vector_retriever: BaseRetriever, lexical_retriever: BaseRetriever, top_k: int):
+        """
+        :param vector_retriever: 向量检索器
+        :param lexical_retriever: 关键词检索器
+        :param top_k: 返回的最大数量
+        """
+        super().__init__()
+        self._vector_retriever = vector_retriever
+        self._lexical_retriever = lexical_retriever
+        self._top_k = top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return reciprocal_rank_fusion(
+            [self._vector_retriever.retrieve(query_bundle), self._lexical_retriever.retrieve(query_bundle)],
+            self._top_k
+        )
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        results = await asyncio.gather(
+            self._vector_retriever.aretrieve(query_bundle),
+            self._lexical_retriever.aretrieve(query_bundle)
+        )
+        return reciprocal_rank_fusion(list(results), self._top_k)
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    分片检索器
+    并行检索各分类分片，结果按得分合并，文本块的分类以所在分片为准
+    """
+
+    # 同步检索时各分片共用的线程池
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="shard-retriever")
+
+    def __init__(
+            self,
+            shards: List[Tuple[str, BaseRetriever]],
+            top_k: int,
+            embed_model: Optional[BaseEmbedding] = None,
+            fallback: Optional[BaseRetriever] = None
+    ):
+        """
+        :param shards: (分类名, 该分片的检索器)列表
+        :param top_k: 返回的最大数量
+        :param embed_model: 查询向量模型，向量检索时先算好查询向量供各分片共用，关键词检索时为空
+        :param fallback: 没有命中时改用的检索器
+        """
+        super().__init__()
+        self._shards = shards
+        self._top_k = top_k
+        self._embed_model = embed_model
+        self._fallback = fallback
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if self._embed_model is not None and query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        results = list(self._executor.map(lambda shard: shard[1].retrieve(query_bundle), self._shards))
+        nodes = self._merge(results)
+        if not nodes and self._fallback is not None:
+            return self._fallback.retrieve(query_bundle)
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if self._embed_model is not None and query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        results = await asyncio.gather(*(retriever.aretrieve(query_bundle) for _, retriever in self._shards))
+        nodes = self._merge(list(results))
+        if not nodes and self._fallback is not None:
+            return await self._fallback.aretrieve(query_bundle)
+        return nodes
+
+    def _merge(self, results: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+        """标注分类后按得分合并"""
+        merged = []
+        for (classification, _), nodes in zip(self._shards, results):
+            for node in nodes:
+                node.node.metadata["classification"] = classification
+            merged.extend(nodes)
+        merged.sort(key=lambda x: x.score or 0.0, reverse=True)
+        return merged[:self._top_k]
@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, List, Any
+
+from schemas.hnsw_profile import HnswProfile, IndexRebuildProgress
+from utils.classification_shards import ClassificationShards
+from utils.document_embedding import DocumentEmbedding
+from utils.document_query import DocumentQueryEngine
+from utils.logger import logger
+from utils.vector_store_registry import VectorStoreRegistry, VectorStoreHandle
+
+
+class IndexRebuilder:
+    """
+    文本块向量索引重建
+    把文本块集合（按分类分片时为全部分片集合）逐个复制到新集合后换入，用于更换HNSW索引参数，
+    或清理删除文档后留下的索引碎片。同一时间只运行一个重建任务
+    """
+
+    _tasks: Dict[str, IndexRebuildProgress] = {}
+    _running: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def _collection_names() -> List[str]:
+        """要重建的文本块集合"""
+        if ClassificationShards.enabled():
+            return [handle.collection.name for _, handle in ClassificationShards.shards()]
+        return [DocumentQueryEngine._collection_name]
+
+    @classmethod
+    def status(cls) -> List[Dict[str, Any]]:
+        """文本块集合的数量和当前索引参数"""
+        collections = []
+        for name in cls._collection_names():
+            collection = VectorStoreRegistry.get(name, DocumentQueryEngine._persist_dir).collection
+            collections.append({
+                "name": name,
+                "count": collection.count(),
+                "profile": HnswProfile.from_configuration(collection.configuration_json).model_dump(),
+            })
+        return collections
+
+    @classmethod
+    def _on_swap(cls, handle: VectorStoreHandle) -> None:
+        """新集合换入后，入库和查询换用新句柄"""
+        if handle.collection.name == DocumentQueryEngine._collection_name:
+            DocumentEmbedding._bind(handle)
+        DocumentQueryEngine._bind(
+            VectorStoreRegistry.get(DocumentQueryEngine._collection_name, DocumentQueryEngine._persist_dir)
+        )
+
+    @classmethod
+    def rebuild(
+            cls,
+            profile: Optional[HnswProfile] = None,
+            progress: Optional[IndexRebuildProgress] = None
+    ) -> IndexRebuildProgress:
+        """
+        重建全部文本块集合
+
+        参数:
+            profile: 新集合的索引参数，为空时沿用各集合原来的参数
+            progress: 进度对象，为空时新建
+
+        返回:
+            重建进度
+        """
+        progress = progress or IndexRebuildProgress(task_id=uuid.uuid4().hex, profile=profile)
+        progress.started_at = cls._now()
+
+        def report(count: int):
+            progress.copied += count
+
+        try:
+            for name in cls._collection_names():
+                handle = VectorStoreRegistry.rebuild(
+                    name, DocumentQueryEngine._persist_dir, profile, progress=report, on_swap=cls._on_swap
+                )
+                progress.collections[name] = handle.collection.count()
+            progress.status = "finished"
+        except Exception as e:
+            progress.status = "failed"
+            progress.error = str(e)
+            logger.error(f"向量索引重建失败：{e}")
+        finally:
+            progress.finished_at = cls._now()
+        return progress
+
+    @classmethod
+    def is_running(cls) -> bool:
+        """是否有正在运行的重建任务"""
+        return bool(cls._running)
+
+    @classmethod
+    def submit(cls, profile: Optional[HnswProfile] = None) -> IndexRebuildProgress:
+        """
+        在后台发起重建，需在事件循环中调用
+
+        返回:
+            重建进度
+        """
+        progress = IndexRebuildProgress(task_id=uuid.uuid4().hex, profile=profile)
+        cls._tasks[progress.task_id] = progress
+        task = asyncio.create_task(asyncio.to_thread(cls.rebuild, profile, progress))
+        cls._running[progress.task_id] = task
+        task.add_done_callback(lambda _: cls._running.pop(progress.task_id, None))
+        return progress
+
+    @classmethod
+    def get_progress(cls, task_id: str) -> Optional[IndexRebuildProgress]:
+        """查询重建进度"""
+        return cls._tasks.get(task_id)
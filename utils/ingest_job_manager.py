@@ -0,0 +1,213 @@
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+from schemas.ingest_job import IngestJobStatus
+from utils.async_db_helper import AsyncDBHelper
+from utils.db_helper import DBHelper
+from utils.document_embedding import DocumentEmbedding
+from utils.logger import logger
+
+
+class IngestJobManager:
+    """
+    文档入库任务管理
+    上传的文档先落盘并登记任务，由后台线程池按并发上限依次完成解析、向量化和写入
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def initialize(
+            cls,
+            upload_dir: Optional[str] = None,
+            max_workers: int = 2,
+            max_pending: int = 50
+    ):
+        """
+        初始化任务线程池，并恢复上次退出时未完成的任务(只需调用一次)
+
+        参数:
+            upload_dir: 待处理文档的存放目录
+            max_workers: 同时处理的任务数量
+            max_pending: 允许排队和处理中的任务总数
+        """
+        if not upload_dir:
+            # 获取当前文件的目录，然后返回上一级目录
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            parent_dir = os.path.dirname(current_dir)
+            upload_dir = os.path.join(parent_dir, "uploads")
+        os.makedirs(upload_dir, exist_ok=True)
+
+        cls._upload_dir = upload_dir
+        cls._max_pending = max_pending
+        cls._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+
+        cls._recover()
+
+    @classmethod
+    def shutdown(cls):
+        """停止接收新任务，等待处理中的任务完成，排队中的任务在下次启动时恢复"""
+        if cls._executor:
+            cls._executor.shutdown(wait=True, cancel_futures=True)
+            cls._executor = None
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    async def is_full(cls) -> bool:
+        """排队和处理中的任务是否已达到上限"""
+        return await cls.count_active() >= cls._max_pending
+
+    @staticmethod
+    async def count_active() -> int:
+        """排队和处理中的任务数量"""
+        result = await AsyncDBHelper.query_by_sql(
+            "SELECT count(*) AS total FROM ingest_jobs WHERE status IN (?, ?)",
+            IngestJobStatus.ACTIVE
+        )
+        return result[0]["total"]
+
+    @staticmethod
+    async def has_active_job(document_name: str) -> bool:
+        """同名文档是否有排队或处理中的任务"""
+        return await AsyncDBHelper.query_one(
+            "ingest_jobs",
+            "document_name=? AND status IN (?, ?)",
+            (document_name,) + IngestJobStatus.ACTIVE
+        ) is not None
+
+    @classmethod
+    def create_job_dir(cls) -> Tuple[str, str]:
+        """
+        创建任务及其文档存放目录
+
+        返回:
+            (任务id, 目录路径)
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = cls._job_dir(job_id)
+        os.makedirs(job_dir)
+        return job_id, job_dir
+
+    @classmethod
+    def _job_dir(cls, job_id: str) -> str:
+        """任务的文档存放目录"""
+        return os.path.join(cls._upload_dir, job_id)
+
+    @staticmethod
+    def _in_job_dir(file_path: str, job_dir: str) -> bool:
+        """文档是否直接位于任务目录下"""
+        return os.path.dirname(os.path.realpath(file_path)) == os.path.realpath(job_dir)
+
+    @classmethod
+    async def submit(cls, job_id: str, classification_id: int, file_path: str,
+                     file_info: Optional[Dict[str, Any]] = None) -> str:
+        """
+        登记任务并提交到后台处理
+
+        参数:
+            job_id: 任务id，由create_job_dir生成
+            classification_id: 文档分类id
+            file_path: 已落盘的文档路径，须位于任务目录下，文件名即文档名
+            file_info: 文件大小和内容哈希
+
+        返回:
+            任务id
+        """
+        job_dir = cls._job_dir(job_id)
+        if not cls._in_job_dir(file_path, job_dir):
+            raise ValueError(f"文档不在任务目录中: {file_path}")
+        await AsyncDBHelper.insert(
+            "ingest_jobs",
+            {
+                "id": job_id,
+                "classification_id": classification_id,
+                "document_name": os.path.basename(file_path),
+                "file_path": file_path,
+                "job_dir": job_dir,
+                "status": IngestJobStatus.PENDING,
+                **(file_info or {}),
+            }
+        )
+        cls._executor.submit(cls._run, job_id)
+        return job_id
+
+    @staticmethod
+    async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务"""
+        return await AsyncDBHelper.query_one("ingest_jobs", "id=?", (job_id,))
+
+    @classmethod
+    def _recover(cls):
+        """重新提交上次退出时排队或处理中的任务"""
+        jobs = DBHelper.query_by_sql(
+            "SELECT id, file_path, job_dir FROM ingest_jobs WHERE status IN (?, ?) ORDER BY created_at",
+            IngestJobStatus.ACTIVE
+        )
+        for job in jobs:
+            if not cls._in_job_dir(job["file_path"], job["job_dir"] or cls._job_dir(job["id"])):
+                DBHelper.update(
+                    "ingest_jobs",
+                    {"status": IngestJobStatus.FAILED, "error": "文档不在任务目录中", "finished_at": cls._now()},
+                    "id=?",
+                    (job["id"],)
+                )
+            elif os.path.exists(job["file_path"]):
+                DBHelper.update("ingest_jobs", {"status": IngestJobStatus.PENDING}, "id=?", (job["id"],))
+                cls._executor.submit(cls._run, job["id"])
+            else:
+                DBHelper.update(
+                    "ingest_jobs",
+                    {"status": IngestJobStatus.FAILED, "error": "文档文件已丢失", "finished_at": cls._now()},
+                    "id=?",
+                    (job["id"],)
+                )
+        if jobs:
+            logger.info(f"恢复入库任务{len(jobs)}个。")
+
+    @classmethod
+    def _run(cls, job_id: str):
+        """执行入库任务"""
+        job = DBHelper.query_one("ingest_jobs", "id=?", (job_id,))
+        DBHelper.update(
+            "ingest_jobs",
+            {"status": IngestJobStatus.RUNNING, "started_at": cls._now()},
+            "id=?",
+            (job_id,)
+        )
+        try:
+            classification = DBHelper.query_one("classification", "id=?", (job["classification_id"],))
+            if not classification:
+                raise ValueError(f"分类不存在: {job['classification_id']}")
+
+            document_id = DocumentEmbedding.vectorize_document(
+                job["classification_id"],
+                classification["name"],
+                job["file_path"],
+                stage_callback=lambda stats: DBHelper.update("ingest_jobs", stats, "id=?", (job_id,))
+            )
+
+            DBHelper.update(
+                "ingest_jobs",
+                {"status": IngestJobStatus.SUCCEEDED, "document_id": document_id, "finished_at": cls._now()},
+                "id=?",
+                (job_id,)
+            )
+            logger.info(f"入库任务完成：{job['document_name']}")
+        except Exception as e:
+            logger.error(f"入库任务失败：{job['document_name']}，{e}")
+            DBHelper.update(
+                "ingest_jobs",
+                {"status": IngestJobStatus.FAILED, "error": str(e), "finished_at": cls._now()},
+                "id=?",
+                (job_id,)
+            )
+        finally:
+            # 只删除登记的任务目录，旧版本登记的任务没有该字段，按任务id定位
+            shutil.rmtree(job["job_dir"] or cls._job_dir(job_id), ignore_errors=True)
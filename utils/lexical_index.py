@@ -0,0 +1,173 @@
+import re
+import sqlite3
+import unicodedata
+from typing import List, Optional, Tuple, Iterable
+
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from utils.db_helper import DBHelper
+from utils.logger import logger
+
+
+class LexicalIndex:
+    """
+    文本块的本地倒排索引
+    文本块按中日韩字符的单字和二元组、英文单词和数字切分为词项，存放在SQLite的FTS5索引中，
+    检索时按BM25排序。与向量库一起写入和删除，用于关键词检索和混合检索
+    """
+
+    # 中日韩字符（汉字、假名、谚文）
+    _cjk_pattern = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+    # 英文单词、数字及型号编码，如 abc-123、v2.0
+    _word_pattern = re.compile(r"[a-z0-9]+(?:[._-][a-z0-9]+)*")
+    # 提问用语，出现时不视为关键词查询
+    _question_words = ("什么", "哪", "怎么", "如何", "为什么", "为何", "是否", "吗", "呢", "介绍", "总结", "解释")
+    _keyword_separator = re.compile(r"[\s,，、;；|/]+")
+
+    # 检索时最多使用的查询词项数
+    _max_query_terms = 64
+    # 关键词查询的最多关键词数和单个关键词的最大长度
+    _max_keywords = 4
+    _max_keyword_length = 16
+
+    @classmethod
+    def tokenize(cls, text: str, unigrams: bool = True) -> List[str]:
+        """
+        切分词项
+        :param text: 文本
+        :param unigrams: 中日韩字符是否同时输出单字，查询时只使用二元组以提高精度
+        :return: 词项列表
+        """
+        text = unicodedata.normalize("NFKC", text).lower()
+        terms = []
+        position = 0
+        for match in cls._cjk_pattern.finditer(text):
+            terms.extend(cls._word_pattern.findall(text, position, match.start()))
+            run = match.group()
+            if len(run) == 1 or unigrams:
+                terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            position = match.end()
+        terms.extend(cls._word_pattern.findall(text, position))
+        return terms
+
+    @classmethod
+    def is_keyword_query(cls, query_text: str) -> bool:
+        """
+        是否为关键词式查询：不超过4个较短的关键词，且不含问句
+        :param query_text: 查询文本
+        """
+        text = unicodedata.normalize("NFKC", query_text).strip()
+        if not text or "?" in text or any(x in text for x in cls._question_words):
+            return False
+        keywords = [x for x in cls._keyword_separator.split(text) if x]
+        return len(keywords) <= cls._max_keywords and all(len(x) <= cls._max_keyword_length for x in keywords)
+
+    @classmethod
+    def add(cls, nodes: Iterable[BaseNode], conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        写入文本块的词项
+        :param nodes: 文本块
+        :param conn: 外部事务的连接，为空时单独提交
+        :return: 写入的文本块数量
+        """
+        return DBHelper.insert_many(
+            "chunks",
+            [
+                {
+                    "node_id": node.node_id,
+                    "document_name": node.metadata.get("file_name", ""),
+                    "terms": " ".join(cls.tokenize(node.get_content(metadata_mode=MetadataMode.NONE))),
+                }
+                for node in nodes
+            ],
+            conn=conn
+        )
+
+    @staticmethod
+    def delete_document(document_name: str, conn: Optional[sqlite3.Connection] = None) -> int:
+        """删除文档的全部文本块"""
+        return DBHelper.delete("chunks", "document_name=?", (document_name,), conn=conn)
+
+    @staticmethod
+    def delete_nodes(node_ids: List[str], conn: Optional[sqlite3.Connection] = None) -> int:
+        """按文本块id删除"""
+        return DBHelper.execute_many("DELETE FROM chunks WHERE node_id=?", [(x,) for x in node_ids], conn=conn)
+
+    @staticmethod
+    def count() -> int:
+        """已索引的文本块数量"""
+        return DBHelper.query_by_sql("SELECT count(*) AS total FROM chunks")[0]["total"]
+
+    @classmethod
+    def rebuild(cls, collections: List, batch_size: int = 5000) -> int:
+        """
+        按向量库中的文本块重建索引
+        :param collections: 存放文本块的Chroma集合
+        :param batch_size: 每批读取的文本块数量
+        :return: 索引的文本块数量
+        """
+        total = 0
+        with DBHelper.transaction() as conn:
+            DBHelper.delete("chunks", conn=conn)
+            for collection in collections:
+                total += cls._rebuild_collection(collection, batch_size, conn)
+        logger.info(f"关键词索引重建完成，共{total}个文本块")
+        return total
+
+    @classmethod
+    def _rebuild_collection(cls, collection, batch_size: int, conn: sqlite3.Connection) -> int:
+        """写入一个集合的全部文本块，返回文本块数量"""
+        total = 0
+        while True:
+            batch = collection.get(limit=batch_size, offset=total, include=["documents", "metadatas"])
+            if not batch["ids"]:
+                break
+            DBHelper.insert_many(
+                "chunks",
+                [
+                    {
+                        "node_id": node_id,
+                        "document_name": (metadata or {}).get("file_name", ""),
+                        "terms": " ".join(cls.tokenize(text or "")),
+                    }
+                    for node_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"])
+                ],
+                conn=conn
+            )
+            total += len(batch["ids"])
+        return total
+
+    @classmethod
+    def search(cls, query_text: str, limit: int = 20, match_all: bool = False,
+               classifications: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        BM25检索
+        :param query_text: 查询文本
+        :param limit: 返回的最大数量
+        :param match_all: 是否要求包含全部查询词项，否则包含任意一个即可
+        :param classifications: 只检索这些分类的文档，按文档记录的分类过滤，为空时不限分类
+        :return: (文本块id, BM25得分)列表，得分高的在前
+        """
+        terms = list(dict.fromkeys(cls.tokenize(query_text, unigrams=False)))[:cls._max_query_terms]
+        if not terms:
+            return []
+
+        # 每个词项作为FTS5字符串短语，避免其中的特殊字符被解析为查询语法
+        match_expression = (" AND " if match_all else " OR ").join('"' + x.replace('"', '""') + '"' for x in terms)
+        condition, params = "", ()
+        if classifications:
+            condition = (
+                "AND chunks.document_name IN (SELECT documents.name FROM documents "
+                "JOIN classification ON classification.id = documents.classification_id "
+                f"WHERE classification.name IN ({','.join('?' * len(classifications))})) "
+            )
+            params = tuple(classifications)
+        # FTS5的bm25()越小越相关，取相反数作为得分
+        rows = DBHelper.query_by_sql(
+            "SELECT chunks.node_id, -bm25(chunks_fts) AS score FROM chunks_fts "
+            "JOIN chunks ON chunks.id = chunks_fts.rowid "
+            f"WHERE chunks_fts MATCH ? {condition}ORDER BY bm25(chunks_fts) LIMIT ?",
+            (match_expression, *params, limit)
+        )
+        return [(row["node_id"], row["score"]) for row in rows]
@@ -1,5 +1,5 @@
 from schemas.agent_schemas import DocumentMetadataFilters
-from utils.db_helper import DBHelper
+from utils.async_db_helper import AsyncDBHelper
 
 
 class MetadataFiltersHandler:
@@ -7,7 +7,7 @@ class MetadataFiltersHandler:
     元数据过滤条件处理
     """
     @staticmethod
-    def handle(metadata_filters: DocumentMetadataFilters) -> DocumentMetadataFilters:
+    async def handle(metadata_filters: DocumentMetadataFilters) -> DocumentMetadataFilters:
         if not metadata_filters:
             return DocumentMetadataFilters(
                 chapter_title=None,
@@ -18,22 +18,15 @@ class MetadataFiltersHandler:
             )
 
         if metadata_filters.file_name:
-            condition = ""
-            filename = metadata_filters.file_name.pop()
-            condition += f"name like '%{filename}%' "
-            while metadata_filters.file_name:
-                filename = metadata_filters.file_name.pop()
-                condition += f"or name like '%{filename}%'"
-            filename_query_result = DBHelper.query_many("documents", condition)
+            filename_query_result = await AsyncDBHelper.full_text_search(
+                "documents", "name", metadata_filters.file_name
+            )
             metadata_filters.file_name = [x["name"] for x in filename_query_result]
         if metadata_filters.chapter_title:
-            condition = ""
-            chapter_title = metadata_filters.chapter_title.pop()
-            condition += f"title like '%{chapter_title}%' "
-            while metadata_filters.chapter_title:
-                chapter_title = metadata_filters.chapter_title.pop()
-                condition += f"or title like '%{chapter_title}%'"
-            chapter_title_query_result = DBHelper.query_many("document_titles", f"title like '%{metadata_filters.chapter_title}%'")
-            metadata_filters.chapter_title = [x["title"] for x in chapter_title_query_result]
+            chapter_title_query_result = await AsyncDBHelper.full_text_search(
+                "document_titles", "title", metadata_filters.chapter_title
+            )
+            # 不同文档可能存在同名章节，去重并保持相关度顺序
+            metadata_filters.chapter_title = list(dict.fromkeys(x["title"] for x in chapter_title_query_result))
 
-        return metadata_filters
\ No newline at end of file
+        return metadata_filters
@@ -0,0 +1,155 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+import httpx
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import LLM
+
+from utils.embedding_cache import CachedEmbedding
+
+
+class ModelProvider:
+    """
+    模型提供者
+    按配置创建向量模型和LLM，默认使用在线服务，离线开发和基准测试时可切换为本地替身：
+
+    - EMBED_PROVIDER: dashscope（默认）或 hashing
+    - LLM_PROVIDER: deepseek（默认）或 scripted
+    - DEEPSEEK_API_BASE: DeepSeek接口地址，可指向兼容OpenAI接口的本地服务
+    - HASHING_EMBED_LATENCY_MS: 哈希向量模型每次调用注入的延迟
+    - SCRIPTED_LLM_FIRST_TOKEN_MS / SCRIPTED_LLM_TOKEN_MS: 脚本化LLM的首字延迟和每个token的延迟
+
+    Agent在导入时创建LLM，需要在导入Agent之前完成配置。
+    所有DeepSeek客户端共用同一组保持长连接的HTTP连接池，避免每个请求重新建立TLS连接
+    """
+
+    _embed_provider = os.getenv("EMBED_PROVIDER", "dashscope")
+    _llm_provider = os.getenv("LLM_PROVIDER", "deepseek")
+    _embed_latency_ms = float(os.getenv("HASHING_EMBED_LATENCY_MS", "0"))
+    _first_token_ms = float(os.getenv("SCRIPTED_LLM_FIRST_TOKEN_MS", "0"))
+    _token_ms = float(os.getenv("SCRIPTED_LLM_TOKEN_MS", "0"))
+    _llm_api_base = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
+
+    # LLM接口的HTTP连接池
+    _http_limits = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+    _http_timeout = httpx.Timeout(60.0, connect=10.0)
+    _http_client: Optional[httpx.Client] = None
+    _async_http_client: Optional[httpx.AsyncClient] = None
+    _lock = threading.Lock()
+
+    # 脚本化LLM的回复规则，与各Agent的提示词对应，保证离线时每个工作流都能走完
+    _scripted_rules = [
+        ("工作流选择专家", "general_query"),
+        ("过滤条件生成助手", "{}"),
+    ]
+    _scripted_default_response = "根据检索到的文档内容，相关信息如下：这是离线模式下的模拟回答，用于评估检索与工作流本身的耗时。"
+
+    @classmethod
+    def configure(
+            cls,
+            embed_provider: Optional[str] = None,
+            llm_provider: Optional[str] = None,
+            embed_latency_ms: Optional[float] = None,
+            first_token_ms: Optional[float] = None,
+            token_ms: Optional[float] = None,
+            llm_api_base: Optional[str] = None
+    ) -> None:
+        """
+        修改模型配置，只影响之后创建的模型
+        :param embed_provider: dashscope 或 hashing
+        :param llm_provider: deepseek 或 scripted
+        :param embed_latency_ms: 哈希向量模型每次调用注入的延迟
+        :param first_token_ms: 脚本化LLM的首字延迟
+        :param token_ms: 脚本化LLM每个token的延迟
+        :param llm_api_base: DeepSeek接口地址
+        """
+        if embed_provider:
+            cls._embed_provider = embed_provider
+        if llm_provider:
+            cls._llm_provider = llm_provider
+        if embed_latency_ms is not None:
+            cls._embed_latency_ms = embed_latency_ms
+        if first_token_ms is not None:
+            cls._first_token_ms = first_token_ms
+        if token_ms is not None:
+            cls._token_ms = token_ms
+        if llm_api_base:
+            cls._llm_api_base = llm_api_base
+
+    @classmethod
+    def get_embed_model(cls, text_type: str = "document") -> BaseEmbedding:
+        """
+        创建带缓存的向量模型
+        :param text_type: document 或 query
+        """
+        blocking_async = False
+        if cls._embed_provider == "hashing":
+            from utils.offline_models import HashingEmbedding
+
+            embed_model = HashingEmbedding(text_type=text_type, latency=cls._embed_latency_ms / 1000)
+        elif cls._embed_provider == "dashscope":
+            from llama_index.embeddings.dashscope import DashScopeEmbedding, DashScopeTextEmbeddingModels
+
+            embed_model = DashScopeEmbedding(
+                model_name=DashScopeTextEmbeddingModels.TEXT_EMBEDDING_V3,
+                text_type=text_type,
+                embed_batch_size=5,
+            )
+            # DashScopeEmbedding的异步接口直接调用同步的HTTP请求
+            blocking_async = True
+        else:
+            raise ValueError(f"不支持的向量模型: {cls._embed_provider}")
+
+        # 查询向量重复率高，额外使用进程内缓存
+        return CachedEmbedding(embed_model, memory_cache=text_type == "query", blocking_async=blocking_async)
+
+    @classmethod
+    def get_llm(cls, temperature: float = 0) -> LLM:
+        """
+        创建LLM
+        :param temperature: 温度
+        """
+        if cls._llm_provider == "scripted":
+            from utils.offline_models import ScriptedLLM
+
+            return ScriptedLLM(
+                rules=cls._scripted_rules,
+                default_response=cls._scripted_default_response,
+                first_token_latency=cls._first_token_ms / 1000,
+                token_latency=cls._token_ms / 1000,
+            )
+        if cls._llm_provider == "deepseek":
+            from llama_index.llms.deepseek import DeepSeek
+
+            http_client, async_http_client = cls._get_http_clients()
+            return DeepSeek(
+                "deepseek-chat",
+                api_base=cls._llm_api_base,
+                temperature=temperature,
+                http_client=http_client,
+                async_http_client=async_http_client,
+            )
+
+        raise ValueError(f"不支持的LLM: {cls._llm_provider}")
+
+    @classmethod
+    def _get_http_clients(cls) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """获取共用的同步和异步HTTP客户端，首次使用时创建"""
+        if cls._http_client is None:
+            with cls._lock:
+                if cls._http_client is None:
+                    cls._async_http_client = httpx.AsyncClient(limits=cls._http_limits, timeout=cls._http_timeout)
+                    cls._http_client = httpx.Client(limits=cls._http_limits, timeout=cls._http_timeout)
+        return cls._http_client, cls._async_http_client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """关闭共用的HTTP连接池"""
+        with cls._lock:
+            http_client, async_http_client = cls._http_client, cls._async_http_client
+            cls._http_client = cls._async_http_client = None
+        if http_client:
+            http_client.close()
+        if async_http_client:
+            await async_http_client.aclose()
@@ -0,0 +1,208 @@
+"""
+离线模型
+
+不依赖外部服务的向量模型和LLM，用于离线开发、基准测试和回归测试。
+向量与回复都是确定的，可以注入固定延迟来模拟网络服务。
+"""
+
+import asyncio
+import math
+import time
+import zlib
+from typing import Any, List, Optional, Sequence, Tuple, Dict
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.base.llms.generic_utils import (
+    completion_response_to_chat_response,
+    stream_completion_response_to_chat_response,
+)
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+from llama_index.core.types import PydanticProgramMode
+from pydantic import Field
+
+
+class HashingEmbedding(BaseEmbedding):
+    """
+    哈希向量模型
+    将文本的单字和二元字组哈希到固定维度并归一化，相同文本的向量总是相同，字面相近的文本向量相近
+    """
+
+    dimension: int = Field(default=1024, description="向量维度")
+    text_type: str = Field(default="document", description="文本类型，与DashScopeEmbedding一致，只用于区分缓存")
+    latency: float = Field(default=0.0, description="每次调用注入的延迟（秒）")
+
+    def __init__(self, model_name: str = "hashing", embed_batch_size: int = 10, **kwargs: Any):
+        super().__init__(model_name=model_name, embed_batch_size=embed_batch_size, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def _embed(self, text: str) -> Embedding:
+        vector = [0.0] * self.dimension
+        for n in (1, 2):
+            for i in range(len(text) - n + 1):
+                value = zlib.crc32(text[i:i + n].encode("utf-8"))
+                # 低位决定维度，最高位决定符号，减少哈希冲突带来的偏差
+                vector[value % self.dimension] += -1.0 if value & 0x80000000 else 1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._get_text_embeddings([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return (await self._aget_text_embeddings([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+
+class ScriptedLLM(FunctionCallingLLM):
+    """
+    脚本化LLM
+    按提示词中的关键字返回预设的回复，不调用任何工具。
+    延迟按 首字延迟 + 每个token延迟 × token数 模拟，流式输出时逐个token产出
+    """
+
+    model_name: str = Field(default="scripted", description="模型名称")
+    rules: List[Tuple[str, str]] = Field(default_factory=list, description="(提示词关键字, 回复)，按顺序取第一条命中的规则")
+    default_response: str = Field(default="未检索到任何内容。", description="没有规则命中时的回复")
+    first_token_latency: float = Field(default=0.0, description="首个token的延迟（秒）")
+    token_latency: float = Field(default=0.0, description="之后每个token的延迟（秒）")
+    # 结构化输出按文本解析，不走工具调用
+    pydantic_program_mode: PydanticProgramMode = PydanticProgramMode.LLM
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScriptedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model_name, is_function_calling_model=True)
+
+    def respond(self, prompt: str) -> str:
+        """按规则生成回复"""
+        for keyword, response in self.rules:
+            if keyword in prompt:
+                return response
+        return self.default_response
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        """按两个字符一个token近似切分"""
+        return [text[i:i + 2] for i in range(0, len(text), 2)] or [""]
+
+    def _latency(self, tokens: List[str]) -> float:
+        return self.first_token_latency + self.token_latency * (len(tokens) - 1)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = self.respond(prompt)
+        time.sleep(self._latency(self._tokens(text)))
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        tokens = self._tokens(self.respond(prompt))
+
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for i, token in enumerate(tokens):
+                time.sleep(self.first_token_latency if i == 0 else self.token_latency)
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+
+        return gen()
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = self.respond(prompt)
+        await asyncio.sleep(self._latency(self._tokens(text)))
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False,
+                               **kwargs: Any) -> CompletionResponseAsyncGen:
+        tokens = self._tokens(self.respond(prompt))
+
+        async def gen() -> CompletionResponseAsyncGen:
+            text = ""
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(self.first_token_latency if i == 0 else self.token_latency)
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+
+        return gen()
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return completion_response_to_chat_response(self.complete(self.messages_to_prompt(messages), formatted=True))
+
+    @llm_chat_callback()
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return stream_completion_response_to_chat_response(
+            self.stream_complete(self.messages_to_prompt(messages), formatted=True)
+        )
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        response = await self.acomplete(self.messages_to_prompt(messages), formatted=True)
+        return completion_response_to_chat_response(response)
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        completions = await self.astream_complete(self.messages_to_prompt(messages), formatted=True)
+
+        async def gen() -> ChatResponseAsyncGen:
+            async for completion in completions:
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=completion.text),
+                    delta=completion.delta,
+                )
+
+        return gen()
+
+    def _prepare_chat_with_tools(
+            self,
+            tools: Sequence[Any],
+            user_msg: Optional[Any] = None,
+            chat_history: Optional[List[ChatMessage]] = None,
+            verbose: bool = False,
+            allow_parallel_tool_calls: bool = False,
+            **kwargs: Any,
+    ) -> Dict[str, Any]:
+        messages = list(chat_history or [])
+        if user_msg:
+            messages.append(user_msg if isinstance(user_msg, ChatMessage) else ChatMessage(role=MessageRole.USER,
+                                                                                             content=user_msg))
+        return {"messages": messages}
+
+    def get_tool_calls_from_response(self, response: ChatResponse, error_on_no_tool_call: bool = True,
+                                     **kwargs: Any) -> List[ToolSelection]:
+        if error_on_no_tool_call:
+            raise ValueError("ScriptedLLM不会调用工具")
+        return []
@@ -0,0 +1,260 @@
+"""
+流式文档读取
+
+按块读取.json、.html、.xlsx文件并逐段产出纯文本，内存占用与文件大小无关。
+章节标题统一输出为Markdown标题行（# 标题），以便沿用通用的章节识别。
+"""
+
+import json
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Any, Dict, Optional
+from xml.etree.ElementTree import iterparse
+
+# 每次从文件读取的字符数
+_READ_SIZE = 64 * 1024
+
+
+def _json_to_text(value: Any, prefix: str = "") -> List[str]:
+    """将JSON值展开为“路径: 值”的文本行"""
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            lines.extend(_json_to_text(item, f"{prefix}.{key}" if prefix else str(key)))
+        return lines
+    if isinstance(value, list):
+        lines = []
+        for index, item in enumerate(value):
+            lines.extend(_json_to_text(item, f"{prefix}[{index}]"))
+        return lines
+    if value is None:
+        return []
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return [f"{prefix}: {text}" if prefix else text]
+
+
+def _iter_json_values(file_path: Path) -> Iterator[Any]:
+    """
+    逐个解析JSON值
+    顶层为数组时逐个产出数组元素；否则按连续的JSON值（如JSON Lines）逐个产出
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = f.read(_READ_SIZE).lstrip("﻿")
+        in_array = buffer.lstrip().startswith("[")
+        if in_array:
+            buffer = buffer.lstrip()[1:]
+
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if in_array and buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
+            if in_array and buffer.startswith("]"):
+                return
+            if not buffer and eof:
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # 当前缓冲区不足以解析出一个完整的值，继续读取，按缓冲区大小倍增以减少重复解析
+                if eof:
+                    raise
+                chunk = f.read(max(_READ_SIZE, len(buffer)))
+                eof = not chunk
+                buffer += chunk
+                continue
+
+            # 数字可能被缓冲区截断，值恰好在缓冲区末尾时先补充读取再确认
+            if end == len(buffer) and not eof:
+                chunk = f.read(_READ_SIZE)
+                eof = not chunk
+                if chunk:
+                    buffer += chunk
+                    continue
+
+            yield value
+            buffer = buffer[end:]
+
+
+def iter_json_text(file_path: Path) -> Iterator[str]:
+    """逐条产出JSON记录的文本，记录之间以空行分隔"""
+    for value in _iter_json_values(file_path):
+        lines = _json_to_text(value)
+        if lines:
+            yield "\n".join(lines) + "\n\n"
+
+
+class _HtmlTextParser(HTMLParser):
+    """增量HTML文本提取，跳过脚本、样式和页眉页脚导航，h1~h6转为Markdown标题"""
+
+    _skip_tags = {"script", "style", "header", "footer", "nav", "noscript", "template"}
+    _heading_tags = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    _block_tags = {
+        "p", "div", "section", "article", "li", "tr", "br", "table", "ul", "ol",
+        "blockquote", "pre", "dd", "dt", "title",
+    } | _heading_tags
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._heading_level = 0
+        self._line: List[str] = []
+        self.output: List[str] = []
+
+    def _end_line(self):
+        text = " ".join("".join(self._line).split())
+        self._line = []
+        if text:
+            if self._heading_level:
+                text = f"{'#' * self._heading_level} {text}"
+            self.output.append(text + "\n")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._skip_tags:
+            self._skip_depth += 1
+        elif not self._skip_depth and tag in self._block_tags:
+            self._end_line()
+            if tag in self._heading_tags:
+                self._heading_level = int(tag[1])
+
+    def handle_endtag(self, tag):
+        if tag in self._skip_tags:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif not self._skip_depth and tag in self._block_tags:
+            self._end_line()
+            if tag in self._heading_tags:
+                self._heading_level = 0
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._line.append(data)
+
+    def close(self):
+        super().close()
+        self._end_line()
+
+
+def iter_html_text(file_path: Path) -> Iterator[str]:
+    """分块解析HTML，逐段产出正文文本"""
+    parser = _HtmlTextParser()
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(_READ_SIZE):
+            parser.feed(chunk)
+            if parser.output:
+                yield "".join(parser.output)
+                parser.output.clear()
+    parser.close()
+    if parser.output:
+        yield "".join(parser.output)
+
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _xlsx_shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    """读取共享字符串表"""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{_XLSX_NS}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{_XLSX_NS}t")))
+                elem.clear()
+    return strings
+
+
+def _xlsx_sheets(archive: zipfile.ZipFile) -> List[Dict[str, str]]:
+    """按工作簿顺序返回工作表名称及其在压缩包中的路径"""
+    targets = {}
+    with archive.open("xl/_rels/workbook.xml.rels") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{_PKG_REL_NS}Relationship":
+                target = elem.get("Target").lstrip("/")
+                targets[elem.get("Id")] = target if target.startswith("xl/") else f"xl/{target}"
+
+    sheets = []
+    with archive.open("xl/workbook.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{_XLSX_NS}sheet":
+                sheets.append({"name": elem.get("name"), "path": targets[elem.get(f"{_REL_NS}id")]})
+    return sheets
+
+
+def _xlsx_cell_value(cell, shared_strings: List[str]) -> Optional[str]:
+    """解析单元格的值"""
+    cell_type = cell.get("t")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{_XLSX_NS}t"))
+    value = cell.find(f"{_XLSX_NS}v")
+    if value is None or value.text is None:
+        return None
+    if cell_type == "s":
+        return shared_strings[int(value.text)]
+    if cell_type == "b":
+        return "TRUE" if value.text == "1" else "FALSE"
+    return value.text
+
+
+def _xlsx_column_index(reference: str) -> int:
+    """单元格引用（如C12）转为从0开始的列号"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def iter_xlsx_text(file_path: Path) -> Iterator[str]:
+    """
+    逐行读取xlsx，每个工作表以“# 工作表名”开头，首行作为表头，其余每行输出为“表头: 值 | ...”
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        shared_strings = _xlsx_shared_strings(archive)
+        for sheet in _xlsx_sheets(archive):
+            yield f"# {sheet['name']}\n"
+            header = None
+            with archive.open(sheet["path"]) as f:
+                sheet_data = None
+                for event, elem in iterparse(f, events=("start", "end")):
+                    if event == "start":
+                        if elem.tag == f"{_XLSX_NS}sheetData":
+                            sheet_data = elem
+                        continue
+                    if elem.tag != f"{_XLSX_NS}row":
+                        continue
+
+                    values = {}
+                    for position, cell in enumerate(elem.iter(f"{_XLSX_NS}c")):
+                        value = _xlsx_cell_value(cell, shared_strings)
+                        if value not in (None, ""):
+                            reference = cell.get("r")
+                            values[_xlsx_column_index(reference) if reference else position] = value
+                    # 已处理的行从树中移除，内存占用与行数无关
+                    if sheet_data is not None:
+                        sheet_data.clear()
+                    else:
+                        elem.clear()
+
+                    if not values:
+                        continue
+                    if header is None:
+                        header = values
+                        continue
+                    yield " | ".join(
+                        f"{header[i]}: {value}" if i in header else value
+                        for i, value in sorted(values.items())
+                    ) + "\n"
+
+
+STREAM_READERS = {
+    ".json": iter_json_text,
+    ".html": iter_html_text,
+    ".xlsx": iter_xlsx_text,
+}
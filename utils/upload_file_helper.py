@@ -0,0 +1,74 @@
+import hashlib
+import os
+from typing import Dict, Any, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"文件超过大小限制: {max_size} 字节")
+        self.max_size = max_size
+
+
+class UploadFileHelper:
+    """上传文件落盘工具，按固定大小分块写入，内存占用与文件大小无关"""
+
+    _chunk_size = 1024 * 1024  # 每次读取1MB
+    _max_size = 512 * 1024 * 1024  # 单个文件最大512MB
+
+    @classmethod
+    def configure(cls, max_size: Optional[int] = None, chunk_size: Optional[int] = None) -> None:
+        """
+        修改上传配置
+        :param max_size: 单个文件最大字节数
+        :param chunk_size: 每次读取的字节数
+        """
+        if max_size:
+            cls._max_size = max_size
+        if chunk_size:
+            cls._chunk_size = chunk_size
+
+    @staticmethod
+    def sanitize_filename(filename: Optional[str]) -> Optional[str]:
+        """
+        校验上传的文件名，文件名会作为任务目录下的文件名和文档名
+        :param filename: 客户端提供的文件名
+        :return: 文件名，为空、为.或..、或包含路径分隔符时返回None
+        """
+        name = os.path.basename(filename or "")
+        if not name or name in (".", "..") or name != filename or "\\" in name or "\0" in name:
+            return None
+        return name
+
+    @classmethod
+    def get_max_size(cls) -> int:
+        """单个文件最大字节数"""
+        return cls._max_size
+
+    @classmethod
+    async def save(cls, file: UploadFile, target_path: str) -> Dict[str, Any]:
+        """
+        分块保存上传文件，同时计算内容哈希和文件大小
+        超过大小限制时抛出UploadTooLargeError，已写入的内容由调用方清理
+        :param file: 上传的文件
+        :param target_path: 保存路径
+        :return: {"file_size": 文件字节数, "content_hash": sha256}
+        """
+        if file.size is not None and file.size > cls._max_size:
+            raise UploadTooLargeError(cls._max_size)
+
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(target_path, "wb") as f:
+            while chunk := await file.read(cls._chunk_size):
+                size += len(chunk)
+                if size > cls._max_size:
+                    raise UploadTooLargeError(cls._max_size)
+                sha256.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+
+        return {"file_size": size, "content_hash": sha256.hexdigest()}
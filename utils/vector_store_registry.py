@@ -0,0 +1,329 @@
+import asyncio
+import dataclasses
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple, Callable, Iterator
+
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
+from chromadb.api.shared_system_client import SharedSystemClient
+from llama_index.core import StorageContext
+from llama_index.core.vector_stores import MetadataFilters, FilterCondition
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryResult
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from llama_index.vector_stores.chroma.base import _transform_chroma_filter_condition, _transform_chroma_filter_operator
+
+from schemas.hnsw_profile import HnswProfile, HNSW_PROFILES
+from utils.logger import logger
+
+
+def to_chroma_where(filters: MetadataFilters) -> Dict[str, Any]:
+    """
+    把元数据过滤器转换为Chroma的where条件，支持嵌套的过滤器组（如章节标题的OR条件）
+    ChromaVectorStore自带的转换不支持嵌套
+    """
+    conditions = []
+    for item in filters.filters:
+        if isinstance(item, MetadataFilters):
+            condition = to_chroma_where(item)
+            if condition:
+                conditions.append(condition)
+        else:
+            conditions.append({item.key: {_transform_chroma_filter_operator(item.operator): item.value}})
+
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {_transform_chroma_filter_condition(filters.condition or FilterCondition.AND): conditions}
+
+
+class ThreadedChromaVectorStore(ChromaVectorStore):
+    """
+    ChromaVectorStore的异步查询直接调用同步查询，这里改为在线程中执行，避免阻塞事件循环；
+    元数据过滤器由to_chroma_where转换
+    """
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            kwargs["where"] = to_chroma_where(query.filters) or None
+            query = dataclasses.replace(query, filters=None)
+        return super().query(query, **kwargs)
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return await asyncio.to_thread(self.query, query, **kwargs)
+
+
+@dataclasses.dataclass(frozen=True)
+class VectorStoreHandle:
+    """一个集合的Chroma集合、向量存储和存储上下文，入库和查询共用"""
+    client: ClientAPI
+    collection: Collection
+    vector_store: ThreadedChromaVectorStore
+    storage_context: StorageContext
+
+
+class VectorStoreRegistry:
+    """
+    向量库注册表
+    每个持久化目录只打开一个Chroma客户端，每个集合只创建一组集合句柄、向量存储和存储上下文，
+    文档入库和查询共用，写入后查询立即可见。
+    生命周期：open 打开客户端，warm 把各集合的HNSW索引加载到内存，close 释放客户端
+
+    文本块集合按环境变量 HNSW_PROFILE 指定的索引参数（见HNSW_PROFILES）创建。
+    rebuild 把集合复制到新集合后换入，用于更换索引参数或清理删除留下的碎片；
+    写入文本块集合时需在 writing() 中进行，重建换入前会等待进行中的写入完成
+    """
+
+    _clients: Dict[str, ClientAPI] = {}
+    _handles: Dict[Tuple[str, str], VectorStoreHandle] = {}
+    _collections: Dict[Tuple[str, str], Collection] = {}
+    _lock = threading.RLock()
+
+    _hnsw_profile = os.getenv("HNSW_PROFILE", "default")
+    # 写入与重建换入互斥，写入计数用于判断复制期间是否有写入
+    _write_lock = threading.RLock()
+    _write_count = 0
+
+    # 重建时新集合和被换下的原集合的名称后缀
+    _rebuild_suffix = "__rebuild"
+    _retired_suffix = "__retired"
+
+    @staticmethod
+    def default_persist_dir() -> str:
+        """项目目录下的 chroma_db"""
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chroma_db")
+
+    @classmethod
+    def configure(cls, hnsw_profile: Optional[str] = None) -> None:
+        """
+        修改配置
+        :param hnsw_profile: 新建文本块集合时的索引参数名
+        """
+        if hnsw_profile:
+            if hnsw_profile not in HNSW_PROFILES:
+                raise ValueError(f"不支持的索引参数: {hnsw_profile}")
+            cls._hnsw_profile = hnsw_profile
+
+    @classmethod
+    def profile(cls) -> HnswProfile:
+        """新建文本块集合时的索引参数"""
+        return HNSW_PROFILES[cls._hnsw_profile]
+
+    @classmethod
+    def open(cls, persist_dir: Optional[str] = None) -> ClientAPI:
+        """
+        获取持久化目录的客户端，首次调用时打开
+        :param persist_dir: 持久化目录，为空时使用项目目录下的 chroma_db
+        """
+        persist_dir = os.path.abspath(persist_dir or cls.default_persist_dir())
+        with cls._lock:
+            client = cls._clients.get(persist_dir)
+            if client is None:
+                client = cls._clients[persist_dir] = chromadb.PersistentClient(path=persist_dir)
+                logger.info(f"向量库已打开：{persist_dir}")
+            return client
+
+    @classmethod
+    def get_collection(
+            cls,
+            collection_name: str,
+            persist_dir: Optional[str] = None,
+            metadata: Optional[Dict[str, Any]] = None
+    ) -> Collection:
+        """
+        获取集合，不存在时按metadata创建
+        :param collection_name: 集合名
+        :param persist_dir: 持久化目录
+        :param metadata: 创建集合时的元数据，如 hnsw:space
+        """
+        persist_dir = os.path.abspath(persist_dir or cls.default_persist_dir())
+        key = (persist_dir, collection_name)
+        with cls._lock:
+            collection = cls._collections.get(key)
+            if collection is None:
+                client = cls.open(persist_dir)
+                cls._recover(client, collection_name)
+                collection = cls._collections[key] = client.get_or_create_collection(
+                    name=collection_name, metadata=metadata
+                )
+            return collection
+
+    @classmethod
+    def _recover(cls, client: ClientAPI, collection_name: str) -> None:
+        """
+        重建换入中途退出时恢复集合：原集合已改名时新集合已复制完成，改为原名；
+        新集合改名也已完成时删除剩下的原集合
+        """
+        names = {collection.name for collection in client.list_collections()}
+        rebuild_name = f"{collection_name}{cls._rebuild_suffix}"
+        retired_name = f"{collection_name}{cls._retired_suffix}"
+        if collection_name not in names and retired_name in names:
+            recovered = rebuild_name if rebuild_name in names else retired_name
+            client.get_collection(recovered).modify(name=collection_name)
+            logger.warning(f"集合{collection_name}重建换入未完成，已恢复为{recovered}")
+            names = {collection.name for collection in client.list_collections()}
+        if collection_name in names and retired_name in names:
+            client.delete_collection(retired_name)
+
+    @classmethod
+    def get(cls, collection_name: str = "documents", persist_dir: Optional[str] = None) -> VectorStoreHandle:
+        """
+        获取文本块集合的句柄
+        :param collection_name: 集合名
+        :param persist_dir: 持久化目录
+        """
+        persist_dir = os.path.abspath(persist_dir or cls.default_persist_dir())
+        key = (persist_dir, collection_name)
+        with cls._lock:
+            handle = cls._handles.get(key)
+            if handle is None:
+                collection = cls.get_collection(collection_name, persist_dir, cls.profile().metadata())
+                handle = cls._handles[key] = cls._new_handle(cls.open(persist_dir), collection)
+            return handle
+
+    @staticmethod
+    def _new_handle(client: ClientAPI, collection: Collection) -> VectorStoreHandle:
+        vector_store = ThreadedChromaVectorStore(chroma_collection=collection)
+        return VectorStoreHandle(
+            client=client,
+            collection=collection,
+            vector_store=vector_store,
+            storage_context=StorageContext.from_defaults(vector_store=vector_store),
+        )
+
+    @classmethod
+    @contextmanager
+    def writing(cls) -> Iterator[None]:
+        """写入文本块集合，重建换入期间等待"""
+        with cls._write_lock:
+            try:
+                yield
+            finally:
+                cls._write_count += 1
+
+    @classmethod
+    def rebuild(
+            cls,
+            collection_name: str = "documents",
+            persist_dir: Optional[str] = None,
+            profile: Optional[HnswProfile] = None,
+            batch_size: int = 5000,
+            progress: Optional[Callable[[int], None]] = None,
+            on_swap: Optional[Callable[[VectorStoreHandle], None]] = None
+    ) -> VectorStoreHandle:
+        """
+        把文本块集合复制到按profile新建的集合，再换入原集合名，向量不重新计算
+        复制时不阻塞写入，复制期间有写入时在写锁内按原集合重新同步一遍后换入；
+        换入后原集合被删除，之前取得的原集合句柄不能再使用，持有句柄的调用方在on_swap中换用新句柄
+
+        :param collection_name: 集合名
+        :param persist_dir: 持久化目录
+        :param profile: 新集合的索引参数，为空时沿用原集合的参数（只清理碎片）
+        :param batch_size: 每批复制的文本块数量
+        :param progress: 进度回调，参数为本批复制的文本块数量
+        :param on_swap: 换入后在写锁内调用，参数为新集合的句柄
+        :return: 新集合的句柄
+        """
+        persist_dir = os.path.abspath(persist_dir or cls.default_persist_dir())
+        client = cls.open(persist_dir)
+        source = cls.get(collection_name, persist_dir).collection
+        profile = profile or HnswProfile.from_configuration(source.configuration_json)
+        batch_size = min(batch_size, client.get_max_batch_size())
+
+        rebuild_name = f"{collection_name}{cls._rebuild_suffix}"
+        if rebuild_name in {collection.name for collection in client.list_collections()}:
+            client.delete_collection(rebuild_name)
+        target = client.create_collection(
+            name=rebuild_name, metadata={**(source.metadata or {}), **profile.metadata()}
+        )
+
+        try:
+            write_count = cls._write_count
+            cls._copy(source, target, batch_size, progress)
+            with cls._write_lock:
+                if cls._write_count != write_count:
+                    logger.info(f"集合{collection_name}复制期间有写入，重新同步")
+                    stale = set(target.get(include=[])["ids"]).difference(source.get(include=[])["ids"])
+                    for start in range(0, len(stale), batch_size):
+                        target.delete(ids=list(stale)[start:start + batch_size])
+                    cls._copy(source, target, batch_size)
+
+                source.modify(name=f"{collection_name}{cls._retired_suffix}")
+                target.modify(name=collection_name)
+
+                key = (persist_dir, collection_name)
+                with cls._lock:
+                    cls._collections[key] = target
+                    handle = cls._handles[key] = cls._new_handle(client, target)
+                if on_swap:
+                    on_swap(handle)
+                client.delete_collection(f"{collection_name}{cls._retired_suffix}")
+        except Exception:
+            # 新集合换入前失败时恢复原集合名并删除新集合
+            if target.name == rebuild_name:
+                if source.name != collection_name:
+                    source.modify(name=collection_name)
+                client.delete_collection(rebuild_name)
+            raise
+
+        logger.info(f"集合{collection_name}重建完成，共{target.count()}个文本块，索引参数：{profile.model_dump()}")
+        return handle
+
+    @staticmethod
+    def _copy(
+            source: Collection,
+            target: Collection,
+            batch_size: int,
+            progress: Optional[Callable[[int], None]] = None
+    ) -> None:
+        """按批把source的全部文本块写入target"""
+        offset = 0
+        while True:
+            batch = source.get(
+                limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+            target.upsert(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"]
+            )
+            offset += len(batch["ids"])
+            if progress:
+                progress(len(batch["ids"]))
+
+    @classmethod
+    def warm(cls) -> Dict[str, int]:
+        """
+        对已打开的每个非空集合做一次查询，使Chroma在启动时而不是首个请求时加载HNSW索引
+        :return: 集合名 -> 向量数量
+        """
+        with cls._lock:
+            collections = dict(cls._collections)
+
+        counts = {}
+        for (_, collection_name), collection in collections.items():
+            counts[collection_name] = collection.count()
+            if counts[collection_name]:
+                sample = collection.peek(limit=1)
+                collection.query(query_embeddings=sample["embeddings"][:1], n_results=1, include=[])
+        return counts
+
+    @classmethod
+    def close(cls) -> None:
+        """释放全部客户端，之后再次使用时重新打开"""
+        with cls._lock:
+            clients = cls._clients
+            cls._clients, cls._handles, cls._collections = {}, {}, {}
+
+        for persist_dir, client in clients.items():
+            # Chroma按持久化目录缓存底层的System，需要从缓存中移除并停止，才能释放文件句柄和内存
+            system = SharedSystemClient._identifier_to_system.pop(client.get_settings().persist_directory, None)
+            if system is not None:
+                system.stop()
+            logger.info(f"向量库已关闭：{persist_dir}")
@@ -13,15 +13,19 @@ from llama_index.core.workflow import (
 from agent.filters_generate_agent import FiltersGenerateAgent
 from agent.metadata_summary_agent import MetadataSummaryAgent
 from schemas.agent_schemas import DocumentMetadataFilters
+from utils.chapter_extractor import chapter_titles_from_metadata
 from utils.document_query import DocumentQueryEngine
 from utils.metadata_filters_handler import MetadataFiltersHandler
 from utils.logger import logger
-from workflow.events import GenerateFiltersEvent, MetadataFiltersHandleEvent, MetadataQueryEvent, MetadataSummaryEvent
+from workflow.events import GenerateFiltersEvent, MetadataFiltersHandleEvent, MetadataQueryEvent, \
+    MetadataSummaryEvent, write_progress
 
 
 class DocumentMetaRetrievalWorkflow(Workflow):
     """
     文档元数据检索工作流
+    默认检索文本块后汇总元数据；工作流选择为document_query（document_level=True）且没有章节过滤条件时，
+    问题只涉及文件属性，直接由文档级索引回答
     """
 
     @step
@@ -30,6 +34,9 @@ class DocumentMetaRetrievalWorkflow(Workflow):
         启动
         """
         await ctx.set("query_text", ev.query_text)
+        # 流式调用时逐个token写入事件流
+        await ctx.set("streaming", ev.get("streaming", False))
+        await ctx.set("document_level", ev.get("document_level", False))
 
         return GenerateFiltersEvent(classification=ev.get("classification_filters", None))
 
@@ -56,8 +63,9 @@ class DocumentMetaRetrievalWorkflow(Workflow):
         """
         元数据过滤器处理
         """
-        filters = MetadataFiltersHandler.handle(ev.filters)
+        filters = await MetadataFiltersHandler.handle(ev.filters)
         logger.info(f"元数据过滤器处理结果：{filters}")
+        write_progress(ctx, "filters", "元数据过滤条件已生成", filters=filters.model_dump(exclude_none=True))
         return MetadataQueryEvent(filters=filters)
 
     @step
@@ -66,37 +74,44 @@ class DocumentMetaRetrievalWorkflow(Workflow):
         根据用户查询和元数据过滤再次查询符合条件的元数据
         """
         query_text = await ctx.get("query_text")
-
-        metadata_query_result = DocumentQueryEngine.query_metadatas(
-            query_text=query_text,
-            metadata_filters=ev.filters,
-            top_k=100
-        )
+        # 文档级索引没有文本块和章节，有章节过滤条件时即使只问文件属性也要检索文本块
+        document_level = await ctx.get("document_level") and not ev.filters.chapter_title
+        logger.info(f"元数据查询使用{'文档级索引' if document_level else '文本块'}：{query_text}")
+
+        if document_level:
+            metadata_query_result = await DocumentQueryEngine.aquery_documents(
+                query_text=query_text,
+                metadata_filters=ev.filters
+            )
+            write_progress(ctx, "retrieved", f"检索到{len(metadata_query_result)}个相关文档",
+                           tier="documents", documents=len(metadata_query_result))
+        else:
+            metadata_query_result = await DocumentQueryEngine.aquery_metadatas(
+                query_text=query_text,
+                metadata_filters=ev.filters,
+                top_k=100
+            )
+            write_progress(ctx, "retrieved", f"检索到{len(metadata_query_result)}个相关片段",
+                           tier="chunks", chunks=len(metadata_query_result))
 
         if not metadata_query_result:
             return StopEvent(result="未检索到任何内容。")
 
-        filename_set = set()
-        classification_set = set()
-        creation_date_set = set()
-        last_modified_date_set = set()
-        chapter_title_set = set()
-
-        for metadata in metadata_query_result:
-            filename_set.add(metadata["file_name"])
-            classification_set.add(metadata["classification"])
-            creation_date_set.add(metadata["creation_date"])
-            last_modified_date_set.add(metadata["last_modified_date"])
-            chapter_title_set.add(metadata["chapter_title"])
-
         metadata_result = {
-            "file_name": filename_set,
-            "classification": classification_set,
-            "creation_date": creation_date_set,
-            "last_modified_date": last_modified_date_set,
-            "chapter_title": chapter_title_set
+            "file_name": set(),
+            "classification": set(),
+            "creation_date": set(),
+            "last_modified_date": set(),
+            "chapter_title": set()
         }
 
+        for metadata in metadata_query_result:
+            # 文档级结果不含值为空的键（如没有日期的文档）
+            for key in ("file_name", "classification", "creation_date", "last_modified_date"):
+                if metadata.get(key) is not None:
+                    metadata_result[key].add(metadata[key])
+            metadata_result["chapter_title"].update(chapter_titles_from_metadata(metadata))
+
         return MetadataSummaryEvent(metadata=metadata_result)
 
     @step
@@ -105,7 +120,8 @@ class DocumentMetaRetrievalWorkflow(Workflow):
         生成元数据的总结
         """
         query_text = await ctx.get("query_text")
-        result = await MetadataSummaryAgent.run(ev.metadata, query_text)
+        streaming = await ctx.get("streaming")
+        result = await MetadataSummaryAgent.run(ev.metadata, query_text, ctx if streaming else None)
         return StopEvent(result=result)
 
 
@@ -1,7 +1,8 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 from llama_index.core.workflow import (
     Event,
+    Context,
 )
 
 from schemas.agent_schemas import DocumentMetadataFilters
@@ -38,4 +39,31 @@ class SimpleQueryEvent(Event):
     """
     简单查询事件
     """
-    filters: Optional[DocumentMetadataFilters]
\ No newline at end of file
+    filters: Optional[DocumentMetadataFilters]
+
+
+class ProgressEvent(Event):
+    """
+    工作流进度事件，写入事件流供流式接口推送
+    """
+    stage: str
+    message: str
+    data: Dict[str, Any] = {}
+
+
+class TokenEvent(Event):
+    """
+    LLM生成的token，写入事件流供流式接口推送
+    """
+    delta: str
+
+
+def write_progress(ctx: Context, stage: str, message: str, **data) -> None:
+    """
+    向事件流写入进度事件
+    :param ctx: 工作流上下文
+    :param stage: 阶段名
+    :param message: 进度说明
+    :param data: 附加数据
+    """
+    ctx.write_event_to_stream(ProgressEvent(stage=stage, message=message, data=data))
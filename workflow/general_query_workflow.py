@@ -15,7 +15,8 @@ from schemas.agent_schemas import DocumentMetadataFilters
 from utils.document_query import DocumentQueryEngine
 from utils.metadata_filters_handler import MetadataFiltersHandler
 from utils.logger import logger
-from workflow.events import GenerateFiltersEvent, MetadataFiltersHandleEvent, SimpleQueryEvent
+from workflow.events import GenerateFiltersEvent, MetadataFiltersHandleEvent, SimpleQueryEvent, TokenEvent, \
+    write_progress
 
 
 class GeneralQueryWorkflow(Workflow):
@@ -29,6 +30,8 @@ class GeneralQueryWorkflow(Workflow):
         启动
         """
         await ctx.set("query_text", ev.query_text)
+        # 流式调用时逐个token写入事件流
+        await ctx.set("streaming", ev.get("streaming", False))
 
         return GenerateFiltersEvent(classification=ev.get("classification_filters", None))
 
@@ -55,8 +58,9 @@ class GeneralQueryWorkflow(Workflow):
         """
         元数据过滤器处理
         """
-        filters = MetadataFiltersHandler.handle(ev.filters)
+        filters = await MetadataFiltersHandler.handle(ev.filters)
         logger.info(f"元数据过滤器处理结果：{filters}")
+        write_progress(ctx, "filters", "元数据过滤条件已生成", filters=filters.model_dump(exclude_none=True))
         return SimpleQueryEvent(filters=filters)
 
     @step
@@ -65,7 +69,17 @@ class GeneralQueryWorkflow(Workflow):
         进行通用查询
         """
         query_text = await ctx.get("query_text")
-        result = DocumentQueryEngine.simple_query(query_text, ev.filters)
+        if not await ctx.get("streaming"):
+            result = await DocumentQueryEngine.asimple_query(query_text, ev.filters)
+            return StopEvent(result=result)
+
+        response = await DocumentQueryEngine.astream_query(query_text, ev.filters)
+        write_progress(ctx, "retrieved", f"检索到{len(response.source_nodes)}个相关片段",
+                       chunks=len(response.source_nodes))
+        result = ""
+        async for delta in response.async_response_gen():
+            ctx.write_event_to_stream(TokenEvent(delta=delta))
+            result += delta
         return StopEvent(result=result)
 
 
@@ -7,6 +7,7 @@ from llama_index.core.workflow import (
     StopEvent,
     Workflow,
     step,
+    Context,
 )
 
 from agent.simple_query_agent import SimpleQueryAgent
@@ -18,11 +19,11 @@ class SimpleQueryWorkflow(Workflow):
     """
 
     @step
-    async def start(self, ev: StartEvent) -> StopEvent:
+    async def start(self, ctx: Context, ev: StartEvent) -> StopEvent:
         """
         启动
         """
-        result = await SimpleQueryAgent.run(ev.query_text)
+        result = await SimpleQueryAgent.run(ev.query_text, ctx if ev.get("streaming", False) else None)
         return StopEvent(result=result)
 
 